@@ -0,0 +1,8 @@
+"""Reproducible benchmarks of the headless EDI parsing pipeline
+
+    python -m benchmarks [--dialect cummins] [--size 1MB --size 50MB] [--seed 1] [--output VÝSLEDKY.json]
+
+``benchmarks.generator`` writes valid synthetic DELFOR interchanges of a given
+size for each dialect; ``benchmarks.runner`` times detection, parsing,
+statistics and Excel export on them.
+"""
@@ -0,0 +1,154 @@
+"""Seedable generator of synthetic DELFOR interchanges in each dialect
+
+The same (dialect, size, seed) always produces the same bytes. Interchanges
+are written segment by segment, so 500 MB files are generated without holding
+them in memory. Part numbers and names avoid the substrings used by dialect
+detection (CMI, MBM, ...), so every file is detected as its own dialect.
+"""
+import io
+import random
+from datetime import date, timedelta
+
+DIALECTS = ('cummins', 'minebea', 'trwkob')
+
+# Odesílatel v UNB určuje rozpoznaný dialekt
+SENDERS = {
+    'cummins': 'CUMMINS',
+    'minebea': 'MINEBEA',
+    'trwkob': 'TRWKOB',
+}
+
+# Počet LIN skupin v jedné zprávě Cummins
+PARTS_PER_MESSAGE = 50
+
+UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text):
+    """'1KB', '50MB' or a plain byte count -> number of bytes"""
+    text = str(text).strip().upper()
+    for suffix, factor in UNITS.items():
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def format_size(size):
+    for suffix, factor in sorted(UNITS.items(), key=lambda item: -item[1]):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{suffix}"
+    return str(size)
+
+
+class InterchangeWriter:
+    """Writes one interchange; segments are terminated by an apostrophe and a newline"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes = 0
+        self.message_segments = 0
+
+    def segment(self, text):
+        data = text + "'\n"
+        self.stream.write(data)
+        self.bytes += len(data)
+        self.message_segments += 1
+
+
+def _cummins_message(out, rng, start, target_bytes, line_numbers):
+    """One Cummins message (backlog, firm and forecast per LIN) with up to PARTS_PER_MESSAGE parts"""
+    out.segment("UNH+1+DELFOR:D:97A:UN")
+    out.segment(f"BGM+241+REL{rng.randrange(1000000):06d}+5")
+    out.segment(f"DTM+137:{start:%Y%m%d}:102")
+    out.segment("NAD+SU+SUP1::92++Supplier Name+Street 1+City")
+    out.segment("NAD+ST+PLANT1::92++Engine Plant+500 Jackson Street+Columbus")
+    for _ in range(PARTS_PER_MESSAGE):
+        if out.bytes >= target_bytes:
+            break
+        line_number = next(line_numbers)
+        # Unique per LIN so the QTY+3 cumulative figures reconcile
+        part = 5300000 + line_number
+        out.segment(f"LIN+{line_number}++{part}:IN")
+        out.segment(f"IMD+F++:::PART {part}")
+        out.segment(f"LOC+11+DOCK{rng.randrange(1, 9)}")
+        out.segment(f"RFF+ON:45{rng.randrange(10 ** 8):08d}")
+        out.segment(f"RFF+RE:R{rng.randrange(1000):03d}")
+        cumulative = rng.randrange(0, 50000)
+        if rng.random() < 0.3:
+            quantity = rng.randrange(1, 500)
+            cumulative += quantity
+            out.segment("SCC+10")
+            out.segment(f"QTY+1:{quantity}")
+            out.segment(f"DTM+2:{start - timedelta(days=rng.randrange(1, 14)):%Y%m%d}:102")
+        weeks = rng.randrange(8, 40)
+        firm_weeks = min(weeks, rng.randrange(2, 6))
+        day = start
+        for week in range(weeks):
+            if week == 0:
+                out.segment("SCC+1")
+            elif week == firm_weeks:
+                out.segment("SCC+4")
+            quantity = rng.randrange(0, 1000)
+            cumulative += quantity
+            out.segment(f"QTY+1:{quantity}")
+            if week == 0:
+                out.segment(f"QTY+3:{cumulative}")
+            out.segment(f"DTM+2:{day:%Y%m%d}:102")
+            day += timedelta(days=7)
+
+
+def _planned_message(out, rng, start):
+    """One Minebea/TRWKOB message with QTY+113/SCC/DTM+63/DTM+64 blocks for a single part"""
+    out.segment("UNH+1+DELFOR:D:97A:UN")
+    out.segment(f"BGM+241+M{rng.randrange(1000000):06d}+9")
+    out.segment("NAD+BY+BUY1::92++Buyer+Street+City")
+    out.segment("NAD+SE+SUP::92++Seller+Street")
+    out.segment(f"NAD+CN+CN{rng.randrange(1, 9)}::92++Consignee+Dock {rng.randrange(1, 9)}")
+    out.segment(f"LIN+1++{rng.randrange(10 ** 7):07d}:IN")
+    out.segment(f"PIA+1+{rng.randrange(10 ** 6):06d}:BP")
+    day = start
+    for week in range(rng.randrange(8, 52)):
+        out.segment(f"QTY+113:{rng.randrange(0, 5000)}:PCE")
+        out.segment("SCC+1" if week < 4 else "SCC+4")
+        out.segment(f"DTM+63:{day + timedelta(days=6):%Y%m%d}:102")
+        out.segment(f"DTM+64:{day:%Y%m%d}:102")
+        day += timedelta(days=7)
+
+
+def write_interchange(stream, dialect, target_bytes, seed=0):
+    """Write an interchange of about target_bytes (at least one message) to a text stream"""
+    if dialect not in SENDERS:
+        raise ValueError(f"Neznámý dialekt: {dialect}")
+    rng = random.Random(f"{dialect}:{target_bytes}:{seed}")
+    start = date(2024, 1, 1) + timedelta(weeks=rng.randrange(0, 100))
+    out = InterchangeWriter(stream)
+    out.segment("UNA:+.? ")
+    out.segment(f"UNB+UNOC:3+{SENDERS[dialect]}:ZZ+SUPPLIER:ZZ+{start:%y%m%d}:1030+{seed % 100000}")
+    messages = 0
+    line_numbers = iter(range(1, 1 << 62))
+    while True:
+        out.message_segments = 0
+        if dialect == 'cummins':
+            # Cummins puts many LIN groups into one message
+            _cummins_message(out, rng, start, target_bytes, line_numbers)
+        else:
+            _planned_message(out, rng, start)
+        out.segment(f"UNT+{out.message_segments + 1}+1")
+        messages += 1
+        if out.bytes >= target_bytes - 20:
+            break
+    out.segment(f"UNZ+{messages}+{seed % 100000}")
+    return out.bytes
+
+
+def generate_file(path, dialect, target_bytes, seed=0):
+    """Write an interchange to a file; returns the number of bytes written"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        return write_interchange(f, dialect, target_bytes, seed)
+
+
+def generate_text(dialect, target_bytes, seed=0):
+    """Interchange as a string (for small sizes)"""
+    buffer = io.StringIO()
+    write_interchange(buffer, dialect, target_bytes, seed)
+    return buffer.getvalue()
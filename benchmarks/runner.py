@@ -0,0 +1,174 @@
+"""Benchmark runner: times the headless pipeline on generated interchanges
+
+Each benchmark is timed ``--repeat`` times without tracing (the best run is
+reported) and then run once more under ``tracemalloc`` for its peak memory,
+so the tracing overhead does not distort the timings.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import edi_api
+from benchmarks.generator import DIALECTS, format_size, generate_file, parse_size
+
+BENCHMARKS = ('detect', 'parse', 'statistics', 'export')
+DEFAULT_SIZES = ('1KB', '1MB', '10MB')
+# Export přes openpyxl je pomalý; větší soubory se do Excelu neexportují
+EXPORT_LIMIT = parse_size('5MB')
+
+
+def data_path(data_dir, dialect, size, seed):
+    return os.path.join(data_dir, f"{dialect}_{format_size(size)}_{seed}.edi")
+
+
+def ensure_input(data_dir, dialect, size, seed):
+    """Generated interchange for (dialect, size, seed), reused from data_dir when present"""
+    path = data_path(data_dir, dialect, size, seed)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        generate_file(tmp_path, dialect, size, seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+def measure(func, repeat):
+    """Best wall time of repeat runs and peak traced memory of one more run"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def run_case(path, dialect, size_label, benchmarks, repeat, export_dir):
+    """Run the selected benchmarks on one input file; returns result dicts"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    content = data.decode('utf-8', errors='replace')
+    core_cls = edi_api.PARSER_CORES[dialect]
+    parsed = core_cls()
+    parsed.filepath = path
+    parsed.parse_bytes(data)
+    rows = len(parsed.delivery_schedules)
+
+    def parse():
+        parser = core_cls()
+        parser.parse_bytes(data)
+        return parser
+
+    def export():
+        return edi_api.export_to_excel(parsed, os.path.join(export_dir, f"{dialect}.xlsx"))
+
+    functions = {
+        'detect': lambda: edi_api.detect_file_type(path, content),
+        'parse': parse,
+        'statistics': parsed.statistics_text,
+        'export': export,
+    }
+    results = []
+    for name in benchmarks:
+        if name == 'export' and len(data) > EXPORT_LIMIT:
+            continue
+        seconds, peak, _ = measure(functions[name], repeat)
+        results.append({
+            'dialect': dialect,
+            'size': size_label,
+            'bytes': len(data),
+            'rows': rows,
+            'benchmark': name,
+            'seconds': seconds,
+            'peak_mb': peak / 1e6,
+            'rows_per_s': rows / seconds if seconds else None,
+            'mb_per_s': len(data) / 1e6 / seconds if seconds else None,
+        })
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(edi_api.__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def result_key(result):
+    return result['dialect'], result['size'], result['benchmark']
+
+
+def compare(results, baseline_path):
+    """Lines comparing the timings with an earlier JSON run"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+    lines = []
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old and old['seconds']:
+            ratio = result['seconds'] / old['seconds']
+            lines.append(f"{result['dialect']:8} {result['size']:>6} {result['benchmark']:10} "
+                         f"{old['seconds']:.4f} s -> {result['seconds']:.4f} s ({ratio:.2f}x)")
+    return lines
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmarky parsování EDI DELFOR")
+    arg_parser.add_argument('--dialect', action='append', choices=DIALECTS, help="dialekt (lze opakovat)")
+    arg_parser.add_argument('--size', action='append', help="velikost vstupu, např. 1KB, 50MB, 500MB")
+    arg_parser.add_argument('--benchmark', action='append', choices=BENCHMARKS, help="benchmark (lze opakovat)")
+    arg_parser.add_argument('--seed', type=int, default=1, help="seed generátoru")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="počet měřených opakování")
+    arg_parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'edi_bench_data'),
+                            help="adresář pro vygenerované vstupy")
+    arg_parser.add_argument('--output', help="uložit výsledky do JSON")
+    arg_parser.add_argument('--compare', metavar='JSON', help="porovnat s dřívějším během")
+    args = arg_parser.parse_args(argv)
+
+    dialects = args.dialect or DIALECTS
+    sizes = [parse_size(size) for size in (args.size or DEFAULT_SIZES)]
+    benchmarks = args.benchmark or BENCHMARKS
+
+    results = []
+    with tempfile.TemporaryDirectory() as export_dir:
+        for dialect in dialects:
+            for size in sizes:
+                path = ensure_input(args.data_dir, dialect, size, args.seed)
+                for result in run_case(path, dialect, format_size(size), benchmarks, args.repeat, export_dir):
+                    results.append(result)
+                    print(f"{dialect:8} {result['size']:>6} {result['benchmark']:10} "
+                          f"{result['seconds'] * 1000:10.2f} ms {result['peak_mb']:9.2f} MB "
+                          f"{result['rows_per_s'] or 0:12,.0f} řádků/s {result['mb_per_s'] or 0:8.2f} MB/s")
+
+    if args.compare:
+        print()
+        for line in compare(results, args.compare):
+            print(line)
+    if args.output:
+        report = {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
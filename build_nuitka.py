@@ -6,6 +6,7 @@ import sys
 import time
 from pathlib import Path
 from tqdm import tqdm
+from edi_registry import BUILTIN_DIALECTS
 
 def run_command(command, description="Running command"):
     """Helper function to run shell commands with progress"""
@@ -104,10 +105,13 @@ def main():
         f"--windows-icon-from-ico={icon_path}" if icon_path and os.path.exists(icon_path) else "",
         f"--include-package=tkinter",
         f"--include-package=openpyxl",
+        f"--include-package=numpy",
         "--enable-plugin=tk-inter",
         "--remove-output",
         "--assume-yes-for-downloads",
         "--follow-imports",
+        # Parser modules are imported on demand by the dialect registry
+        *[f"--include-module={info.module}" for info in BUILTIN_DIALECTS],
         script_name
     ]
     
@@ -0,0 +1,211 @@
+"""Demand evolution across many releases of one customer
+
+    python edi_analytics.py SOUBOR.edi [...] [--part POLOŽKA] [--xlsx VÝSTUP.xlsx] [--top 20]
+
+Parsed releases are loaded into a dense NumPy cube indexed by (release, part,
+week), where week is the Monday of the delivery date taken from the shared
+edi_calendar table. The rows of each release come from its columnar view
+(``parser.columns()``), so no per-row Python work is done; dates outside the
+calendar table (2000-2099) are left out and counted, which also bounds the
+week axis. Cells outside a release's
+horizon are NaN, so "not forecast" is kept apart from "forecast as zero". The
+waterfall of a part is a slice of the cube; release-to-release deltas and
+volatility metrics are array operations over all parts and weeks.
+
+The cube is float32: a year of weekly releases × 5000 parts × 104 weeks takes
+about 110 MB.
+"""
+import argparse
+import sys
+from collections import namedtuple
+import numpy as np
+import openpyxl
+
+import edi_api
+from edi_calendar import bucket, calendar_table, format_ordinal, parse_date_ordinal
+from edi_diff import EXCLUDED_TYPES
+
+Release = namedtuple('Release', 'ordinal number filepath')
+VOLATILITY_HEADERS = ("Položka", "Poslední release (ks)", "Prům. změna (ks)", "Relativní změna", "Max. změna (ks)")
+
+
+def _release_columns(parser, part_codes, table):
+    """Part codes, delivery-week Mondays and quantities of one release, and the rows dated outside the table"""
+    columns = parser.columns()
+    excluded = [code for code, value in enumerate(columns.types) if value in EXCLUDED_TYPES]
+    keep = ~np.isnan(columns.quantities) & ~np.isin(columns.type_codes, excluded)
+    dated = keep & (columns.dates > 0)
+    keep &= table.contains(columns.dates)
+    outside = int(np.count_nonzero(dated & ~keep))
+
+    # Kódy položek vydání -> společné kódy řady, v pořadí prvního výskytu
+    codes = columns.part_codes[keep]
+    present, first_row = np.unique(codes, return_index=True)
+    lookup = np.zeros(len(columns.parts) + 1, dtype=np.int64)
+    for code in present[np.argsort(first_row, kind='stable')].tolist():
+        # Kód -1 (řádek bez položky) ukazuje na poslední prvek
+        lookup[code] = part_codes.setdefault(columns.parts[code] if code >= 0 else '', len(part_codes))
+    return (lookup.take(codes), table.week_start(columns.dates[keep]),
+            columns.quantities[keep].astype(np.float32), outside)
+
+
+class DemandSeries:
+    """Dense (release, part, week) cube of demanded quantities"""
+
+    def __init__(self, parsers):
+        parsers = list(parsers)
+        if not parsers:
+            raise ValueError("Žádné releasy k analýze")
+        file_types = {parser.file_type for parser in parsers}
+        if len(file_types) > 1:
+            raise ValueError("Releasy musí být od stejného zákazníka")
+        self.file_type = file_types.pop()
+
+        releases = []
+        for parser in parsers:
+            ordinal = parse_date_ordinal(parser.release_date()) or 0
+            releases.append((Release(ordinal, parser.header_info.get('Číslo zprávy', ''),
+                                     parser.filepath or ''), parser))
+        releases.sort(key=lambda item: (item[0].ordinal, item[0].filepath))
+        self.releases = [release for release, _ in releases]
+
+        table = calendar_table()
+        part_codes = {}
+        columns = [_release_columns(parser, part_codes, table) for _, parser in releases]
+        self.parts = list(part_codes)
+        self.part_index = part_codes
+        # Řádky s datem mimo kalendářní tabulku (překlepy typu rok 9999) se do krychle nedostanou
+        self.outside_rows = sum(outside for _, _, _, outside in columns)
+
+        all_weeks = [weeks for _, weeks, _, _ in columns if len(weeks)]
+        release_mondays = table.week_start([release.ordinal for release in self.releases])
+        lows = [int(weeks.min()) for weeks in all_weeks] + [int(monday) for monday in release_mondays if monday]
+        highs = [int(weeks.max()) for weeks in all_weeks] + [int(monday) for monday in release_mondays if monday]
+        self.first_week = min(lows) if lows else 0
+        week_count = (max(highs) - self.first_week) // 7 + 1 if highs else 0
+        self.week_mondays = self.first_week + 7 * np.arange(week_count, dtype=np.int64)
+
+        self.cube = np.full((len(self.releases), len(self.parts), week_count), np.nan, dtype=np.float32)
+        for r, (release_monday, (parts, weeks, quantities, _)) in enumerate(zip(release_mondays.tolist(), columns)):
+            week_index = (weeks - self.first_week) // 7
+            # Horizon of the release: from its issue week (or earliest backlog) to its last delivery
+            start = week_index.min() if len(week_index) else week_count
+            if release_monday:
+                start = min(start, (release_monday - self.first_week) // 7)
+            end = week_index.max() + 1 if len(week_index) else start
+            self.cube[r, :, start:end] = 0
+            np.add.at(self.cube[r], (parts, week_index), quantities)
+
+    def week_labels(self):
+        iso_years, iso_weeks, _ = bucket(self.week_mondays)
+        return [f"{year}-W{week:02d}" for year, week in zip(iso_years.tolist(), iso_weeks.tolist())]
+
+    def release_labels(self):
+        return [" ".join(filter(None, (format_ordinal(release.ordinal), release.number)))
+                for release in self.releases]
+
+    def waterfall(self, part):
+        """Release × week matrix of one part (NaN outside a release's horizon)"""
+        return self.cube[:, self.part_index[part], :]
+
+    def release_deltas(self):
+        """Change of each (part, week) forecast from one release to the next"""
+        return np.diff(self.cube, axis=0)
+
+    def totals(self):
+        """Release × part total forecast quantity"""
+        return np.array([np.nansum(release, axis=1) for release in self.cube]).reshape(len(self.releases), -1)
+
+    def volatility(self):
+        """Per-part forecast stability metrics computed over consecutive releases
+
+        Returns a dict of arrays indexed like ``parts``: the total quantity in
+        the latest release, the mean and maximum absolute change of a week's
+        forecast between releases (weeks forecast by both releases only), and
+        the mean change relative to the mean forecast quantity.
+        """
+        part_count = len(self.parts)
+        delta_sum = np.zeros(part_count)
+        delta_count = np.zeros(part_count)
+        delta_max = np.zeros(part_count)
+        level_sum = np.zeros(part_count)
+        level_count = np.zeros(part_count)
+        # One vectorized step per release keeps the temporaries at part × week size
+        for r, release in enumerate(self.cube):
+            forecast = ~np.isnan(release)
+            level_sum += np.where(forecast, release, 0).sum(axis=1)
+            level_count += forecast.sum(axis=1)
+            if r == 0:
+                continue
+            delta = np.abs(release - self.cube[r - 1])
+            compared = ~np.isnan(delta)
+            delta = np.where(compared, delta, 0)
+            delta_sum += delta.sum(axis=1)
+            delta_count += compared.sum(axis=1)
+            delta_max = np.maximum(delta_max, delta.max(axis=1, initial=0))
+        mean_abs = delta_sum / np.maximum(delta_count, 1)
+        level = level_sum / np.maximum(level_count, 1)
+        relative = np.divide(mean_abs, level, out=np.zeros(part_count), where=level > 0)
+        return {
+            'latest_total': self.totals()[-1],
+            'mean_abs_delta': mean_abs,
+            'max_abs_delta': delta_max,
+            'relative_delta': relative,
+        }
+
+    def most_volatile(self, count=20):
+        """Parts ordered by relative forecast change, most volatile first"""
+        relative = self.volatility()['relative_delta']
+        return [self.parts[i] for i in np.argsort(-relative, kind='stable')[:count]]
+
+    def build_workbook(self, parts=None):
+        """Workbook with the waterfall (one row per part and release) and the volatility sheet"""
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Waterfall")
+        ws.append(["Položka", "Release"] + self.week_labels())
+        release_labels = self.release_labels()
+        for part in parts if parts is not None else self.parts:
+            matrix = self.waterfall(part)
+            for label, values in zip(release_labels, matrix.tolist()):
+                ws.append([part, label] + [None if value != value else value for value in values])
+
+        ws_volatility = wb.create_sheet("Volatilita")
+        ws_volatility.append(VOLATILITY_HEADERS)
+        metrics = self.volatility()
+        for i, part in enumerate(self.parts):
+            ws_volatility.append([part, float(metrics['latest_total'][i]), float(metrics['mean_abs_delta'][i]),
+                                  float(metrics['relative_delta'][i]), float(metrics['max_abs_delta'][i])])
+        return wb
+
+
+def load_series(filepaths, use_cache=True):
+    """Parse release files and build their demand cube"""
+    return DemandSeries(edi_api.parse_file(filepath, use_cache=use_cache) for filepath in filepaths)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Vývoj poptávky napříč releasy")
+    arg_parser.add_argument('files', nargs='+', help="releasy jednoho zákazníka")
+    arg_parser.add_argument('--part', action='append', help="položka pro waterfall (lze opakovat)")
+    arg_parser.add_argument('--xlsx', help="export waterfallu do Excelu")
+    arg_parser.add_argument('--top', type=int, default=20, help="počet nejvolatilnějších položek")
+    arg_parser.add_argument('--no-cache', action='store_true', help="nepoužívat cache výsledků")
+    args = arg_parser.parse_args(argv)
+
+    series = load_series(args.files, use_cache=not args.no_cache)
+    print(f"{series.file_type}: {len(series.releases)} releasů, {len(series.parts)} položek, "
+          f"{len(series.week_mondays)} týdnů, {series.cube.nbytes / 1e6:.1f} MB")
+    if series.outside_rows:
+        print(f"Vynecháno řádků s datem mimo kalendář: {series.outside_rows}", file=sys.stderr)
+    metrics = series.volatility()
+    for part in series.most_volatile(args.top):
+        i = series.part_index[part]
+        print(f"{part}: prům. změna {metrics['mean_abs_delta'][i]:,.0f} ks "
+              f"({metrics['relative_delta'][i]:.0%}), poslední release {metrics['latest_total'][i]:,.0f} ks")
+    if args.xlsx:
+        series.build_workbook(args.part).save(args.xlsx)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Headless parsing API and batch command line for EDI DELFOR files
+
+    python edi_api.py SOUBOR.edi [...] [--export ADRESÁŘ] [--no-cache] [--no-validate] [--profile | --memory]
+                      [--scc 1] [--weeks 8 | --since DD.MM.YYYY --until DD.MM.YYYY] [--part P] [--fields Položka,Množství]
+
+Files are checked by ``edi_validate`` before parsing; files with a broken
+envelope are skipped and reported. The selection options are pushed down into
+the parser (edi_dialect.Selection), so rejected records are never built.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import edi_cache
+import edi_registry
+from edi_dialect import Selection
+from edi_input import EDIInput, open_input
+from edi_validate import EDIValidationError, check_bytes, check_file
+
+# Jádra parserů podle dialektu; modul parseru se importuje až při prvním použití
+PARSER_CORES = edi_registry.CoreMapping(edi_registry.registry())
+
+
+def detect_file_type(filepath, content):
+    """Detect the DELFOR dialect from the file name and content"""
+    return edi_registry.registry().detect(filepath, content)
+
+
+def detect_bytes(name, data):
+    """Detect the dialect of an in-memory payload from its raw bytes, block by block"""
+    return edi_registry.registry().detect_chunks(name, EDIInput(buffer=data).chunks())
+
+
+def detect_file(filepath, use_cache=True, source=None):
+    """Detect the dialect of a file, skipping the read when a cache already knows it"""
+    if use_cache:
+        caches = [edi_cache.session_cache(), edi_cache.default_cache()]
+        for cache in caches:
+            file_type = cache.cached_file_type(filepath) if cache is not None else None
+            if file_type:
+                return file_type
+    if source is not None:
+        return edi_registry.registry().detect_chunks(filepath, source.chunks())
+    with open_input(filepath) as source:
+        return edi_registry.registry().detect_chunks(filepath, source.chunks())
+
+
+def has_cached_result(filepath, file_type, use_cache=True):
+    """True when the session or on-disk cache already holds the parsed result of the unchanged file"""
+    if not use_cache or file_type not in PARSER_CORES:
+        return False
+    if edi_cache.session_cache().get(filepath, file_type) is not None:
+        return True
+    cache = edi_cache.default_cache()
+    return cache is not None and cache.has_result(filepath, file_type,
+                                                  edi_cache.parser_version(PARSER_CORES[file_type]))
+
+
+def parse_file(filepath, file_type=None, use_cache=True, profile=False, validate=True, selection=None,
+               source=None):
+    """Parse a file headlessly and return the dialect core holding the result
+
+    With ``validate`` the envelope is checked first and EDIValidationError is
+    raised for a truncated or inconsistent interchange; the check is skipped
+    when the result comes from the cache, whose content was checked before. With ``profile`` the file is always parsed and ``parser.profile`` holds
+    the time per phase and per segment tag; ``profile='memory'`` records the
+    tracemalloc peak and retained bytes per stage instead (see edi_profile).
+    A ``selection`` (edi_dialect.Selection) keeps only the selected records
+    and fields; such a partial result bypasses the cache. An already opened
+    edi_input.EDIInput of the file can be passed as ``source`` so that
+    validation, detection and parsing share one read; it is left open.
+    """
+    if file_type is None:
+        file_type = detect_file(filepath, use_cache, source)
+    # Výsledek z cache se kontrolou už jednou prošel
+    from_cache = not profile and selection is None and has_cached_result(filepath, file_type, use_cache)
+    if validate and not from_cache:
+        if source is None:
+            check_file(filepath)
+        else:
+            check_bytes(source.read())
+    if file_type not in PARSER_CORES:
+        raise ValueError(f"Nepodporovaný typ souboru: {filepath}")
+    parser = PARSER_CORES[file_type]()
+    if profile:
+        parser.profiling = 'memory' if profile == 'memory' else 'time'
+    parser.selection = selection
+    parser.load_path(filepath, use_cache=use_cache, source=source)
+    return parser
+
+
+def export_to_excel(parser, output_path):
+    """Save the delivery workbook of a parsed result; returns False if there is no data"""
+    if not parser.delivery_schedules:
+        return False
+    with parser.profiled('export'):
+        parser.build_workbook().save(output_path)
+    return True
+
+
+def export_file(parser, directory):
+    """Export a parsed result into a directory as <file>_<type>.xlsx; returns the path or None"""
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.splitext(os.path.basename(parser.filepath or 'edi'))[0]
+    output_path = os.path.join(directory, f"{base}_{parser.file_type}.xlsx")
+    return output_path if export_to_excel(parser, output_path) else None
+
+
+def selection_from_args(args):
+    """Selection from the --scc/--since/--until/--weeks/--part/--fields options, or None"""
+    since, until = args.since, args.until
+    if args.weeks is not None:
+        today = datetime.date.today()
+        since, until = today, today + datetime.timedelta(weeks=args.weeks)
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+    if not (args.scc or since or until or args.part or fields):
+        return None
+    return Selection(scc=args.scc, since=since, until=until, parts=args.part, fields=fields)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Headless EDI DELFOR parser")
+    arg_parser.add_argument('files', nargs='+', help="EDI soubory ke zpracování")
+    arg_parser.add_argument('--export', metavar='DIR', help="adresář pro export do Excelu")
+    arg_parser.add_argument('--no-cache', action='store_true', help="nepoužívat cache výsledků")
+    arg_parser.add_argument('--no-validate', action='store_true', help="nekontrolovat strukturu obálky")
+    arg_parser.add_argument('--profile', action='store_true', help="vypsat čas po fázích a typech segmentů")
+    arg_parser.add_argument('--memory', action='store_true',
+                            help="vypsat špičku a zbývající paměť po fázích (tracemalloc)")
+    arg_parser.add_argument('--scc', action='append', help="jen dodávky s kódem SCC (1, 4, 10; lze opakovat)")
+    arg_parser.add_argument('--since', help="jen dodávky od data (DD.MM.YYYY)")
+    arg_parser.add_argument('--until', help="jen dodávky do data (DD.MM.YYYY)")
+    arg_parser.add_argument('--weeks', type=float, help="jen dodávky v příštích N týdnech")
+    arg_parser.add_argument('--part', action='append', help="jen položka (lze opakovat)")
+    arg_parser.add_argument('--fields', help="jen tato pole záznamů, oddělená čárkou")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        selection = selection_from_args(args)
+    except ValueError as e:
+        print(f"CHYBA: {e}", file=sys.stderr)
+        return 1
+    use_cache = not args.no_cache
+    failures = 0
+    invalid = []
+    for filepath in args.files:
+        start = time.perf_counter()
+        try:
+            parser = parse_file(filepath, use_cache=use_cache, validate=not args.no_validate,
+                                profile='memory' if args.memory else args.profile, selection=selection)
+            if args.export:
+                export_file(parser, args.export)
+        except EDIValidationError as e:
+            failures += 1
+            invalid.append(filepath)
+            print(f"{filepath}: NEPLATNÝ {e}", file=sys.stderr)
+            continue
+        except Exception as e:
+            failures += 1
+            print(f"{filepath}: CHYBA {e}", file=sys.stderr)
+            continue
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{filepath}: {parser.file_type}, {len(parser.delivery_schedules)} dodávek, {elapsed_ms:.1f} ms")
+        if parser.profile is not None:
+            print(parser.profile.summary_text())
+    if invalid:
+        print(f"Přeskočeno neplatných souborů: {len(invalid)}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""Persistent inverted index of an EDI archive: which files mention a part, order or partner
+
+    python edi_archive.py update [ADRESÁŘ] [--pattern *.edi] [--db CESTA]
+    python edi_archive.py find [--part 5301234] [--order 4500012345] [--release R] [--partner CUMMINS]
+                               [--since DD.MM.YYYY] [--until DD.MM.YYYY] [--db CESTA]
+
+Files are not parsed: one scan over the raw bytes picks part numbers (LIN,
+PIA), order and release references (RFF+ON, RFF+RE), partners (UNB sender,
+NAD codes and names, the detected dialect) and document dates (DTM+137, or the
+UNB date). The terms go into an SQLite table keyed by (kind, value, file), so
+a lookup is one index seek however large the archive is. ``update`` indexes
+only files whose size or mtime changed since the last run and drops files that
+disappeared; the watcher can index each file it processes (``--archive``).
+"""
+import argparse
+import datetime
+import fnmatch
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import nullcontext
+
+import edi_cache
+import edi_registry
+from edi_calendar import edi_date_ordinal, format_ordinal, parse_date_ordinal
+from edi_charset import detect_charset, make_decoder
+from edi_input import open_input
+from edi_offsets import line_part
+from edi_validate import starts_segment
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    file_type TEXT,
+    sender TEXT,
+    messages INTEGER NOT NULL,
+    first_date INTEGER,
+    last_date INTEGER,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    PRIMARY KEY (kind, value, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS terms_file ON terms (file_id);
+"""
+
+# Druhy hledaných hodnot
+KINDS = ('part', 'order', 'release', 'partner')
+# RFF kvalifikátor -> druh
+REFERENCE_KINDS = {'ON': 'order', 'RE': 'release'}
+# Hledá se jen značka; že stojí na začátku segmentu, ověří starts_segment
+SEGMENT = re.compile(rb"(UNB|UNH|LIN|PIA|RFF|NAD|DTM)\+([^']*)")
+# Po kolika souborech se při aktualizaci potvrdí transakce
+COMMIT_EVERY = 500
+
+
+def default_archive_path():
+    """Database path from EDI_PARSER_ARCHIVE_DB or next to the parsed-result cache"""
+    configured = os.environ.get('EDI_PARSER_ARCHIVE_DB')
+    if configured:
+        return configured
+    return os.path.join(os.path.dirname(edi_cache.default_cache_dir()), 'edi_archive.sqlite')
+
+
+def normalize(value):
+    return value.strip().upper()
+
+
+def extract_terms(data):
+    """(file info, set of (kind, value)) from raw interchange data (bytes or mmap)"""
+    decode = make_decoder(detect_charset(data[:4096]))
+    terms = set()
+    dates = []
+    info = {'sender': '', 'messages': 0}
+    unb_date = None
+    for match in SEGMENT.finditer(data):
+        if not starts_segment(data, match.start()):
+            continue
+        tag = match.group(1)
+        elements = match.group(2).split(b'+')
+        if tag == b'LIN':
+            part = line_part(match.group(2))
+            if part:
+                terms.add(('part', normalize(part)))
+        elif tag == b'RFF':
+            components = elements[0].split(b':')
+            kind = REFERENCE_KINDS.get(components[0].decode('ascii', 'replace'))
+            if kind and len(components) > 1 and components[1].strip():
+                terms.add((kind, normalize(decode(components[1]))))
+        elif tag == b'DTM':
+            components = elements[0].split(b':')
+            if components[0] == b'137' and len(components) > 2:
+                ordinal = edi_date_ordinal(components[1].decode('ascii', 'replace'),
+                                        components[2].decode('ascii', 'replace'))
+                if ordinal:
+                    dates.append(ordinal)
+        elif tag == b'PIA':
+            for element in elements[1:]:
+                code = element.split(b':')[0]
+                if code.strip():
+                    terms.add(('part', normalize(decode(code))))
+        elif tag == b'NAD':
+            if len(elements) > 1 and elements[1].split(b':')[0].strip():
+                terms.add(('partner', normalize(decode(elements[1].split(b':')[0]))))
+            if len(elements) > 3 and elements[3].strip():
+                terms.add(('partner', normalize(decode(elements[3]))))
+        elif tag == b'UNH':
+            info['messages'] += 1
+        elif tag == b'UNB':
+            if len(elements) > 1:
+                info['sender'] = decode(elements[1].split(b':')[0]).strip()
+                if info['sender']:
+                    terms.add(('partner', normalize(info['sender'])))
+            if len(elements) > 3:
+                unb_date = edi_date_ordinal(elements[3].split(b':')[0].decode('ascii', 'replace'), '101')
+    if not dates and unb_date:
+        dates.append(unb_date)
+    info['first_date'] = min(dates) if dates else None
+    info['last_date'] = max(dates) if dates else None
+    return info, terms
+
+
+def _parse_date_argument(text):
+    if not text:
+        return None
+    ordinal = parse_date_ordinal(text)
+    if ordinal is None:
+        raise ValueError(f"Neplatné datum: {text} (DD.MM.YYYY)")
+    return ordinal
+
+
+class ArchiveIndex:
+    """Inverted index {(kind, value): files} over the archive, stored in SQLite"""
+
+    def __init__(self, path=None):
+        self.path = path or default_archive_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _store(self, path, st, source=None):
+        """Index one file without committing; returns the number of terms"""
+        with open_input(path) if source is None else nullcontext(source) as source:
+            info, terms = extract_terms(source.read())
+            # Soubory bez zpráv (exporty, poznámky) se evidují jen kvůli inkrementální aktualizaci
+            file_type = None
+            if info['messages']:
+                file_type = (edi_cache.session_cache().cached_file_type(path)
+                             or edi_registry.registry().detect_chunks(path, source.chunks()))
+        if file_type:
+            terms.add(('partner', normalize(file_type)))
+        self.connection.execute('DELETE FROM files WHERE path = ?', (path,))
+        cursor = self.connection.execute(
+            'INSERT INTO files (path, size, mtime_ns, file_type, sender, messages, first_date, last_date, '
+            'indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (path, st.st_size, st.st_mtime_ns, file_type, info['sender'], info['messages'],
+             info['first_date'], info['last_date'], datetime.datetime.now().isoformat(timespec='seconds')))
+        file_id = cursor.lastrowid
+        self.connection.executemany('INSERT INTO terms VALUES (?, ?, ?)',
+                                    [(kind, value, file_id) for kind, value in terms])
+        return len(terms)
+
+    def index_file(self, filepath, source=None):
+        """Index (or re-index) one file; returns the number of terms
+
+        ``source`` is an already opened edi_input.EDIInput of the file, left open.
+        """
+        path = os.path.abspath(filepath)
+        with self.connection:
+            return self._store(path, os.stat(path), source)
+
+    def remove_file(self, filepath):
+        with self.connection:
+            self.connection.execute('DELETE FROM files WHERE path = ?', (os.path.abspath(filepath),))
+
+    def update(self, folder, pattern='*', recursive=True, errors=None):
+        """Index new and changed files under a folder and forget deleted ones
+
+        Returns (indexed, unchanged, removed); files that cannot be read are
+        skipped and appended to ``errors`` as (path, exception) if given.
+        """
+        folder = os.path.abspath(folder)
+        prefix = os.path.join(folder, '')
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in self.connection.execute(
+            'SELECT path, size, mtime_ns FROM files WHERE substr(path, 1, ?) = ?', (len(prefix), prefix))}
+        indexed = unchanged = 0
+        seen = set()
+        pending = 0
+        try:
+            for directory, subdirectories, filenames in os.walk(folder):
+                if not recursive:
+                    subdirectories.clear()
+                subdirectories[:] = [name for name in subdirectories if not name.startswith('.')]
+                for name in filenames:
+                    if name.startswith('.') or not fnmatch.fnmatch(name, pattern):
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    if known.get(path) == (st.st_size, st.st_mtime_ns):
+                        unchanged += 1
+                        continue
+                    try:
+                        self._store(path, st)
+                    except (OSError, ValueError) as e:
+                        if errors is not None:
+                            errors.append((path, e))
+                        continue
+                    indexed += 1
+                    pending += 1
+                    if pending >= COMMIT_EVERY:
+                        self.connection.commit()
+                        pending = 0
+            removed = [(path,) for path in known if path not in seen]
+            self.connection.executemany('DELETE FROM files WHERE path = ?', removed)
+        finally:
+            self.connection.commit()
+        return indexed, unchanged, len(removed)
+
+    def find(self, part=None, order=None, release=None, partner=None, since=None, until=None):
+        """Files matching all given terms (and overlapping the date range, as ordinals)
+
+        Returns rows (path, file type, sender, messages, first date, last date),
+        newest first.
+        """
+        criteria = [(kind, normalize(value)) for kind, value in
+                    (('part', part), ('order', order), ('release', release), ('partner', partner)) if value]
+        sql = 'SELECT path, file_type, sender, messages, first_date, last_date FROM files'
+        conditions = []
+        params = []
+        if criteria:
+            conditions.append('id IN (' + ' INTERSECT '.join(
+                ['SELECT file_id FROM terms WHERE kind = ? AND value = ?'] * len(criteria)) + ')')
+            for kind, value in criteria:
+                params.extend((kind, value))
+        if since is not None:
+            conditions.append('last_date >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('first_date <= ?')
+            params.append(until)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY last_date DESC, path'
+        return self.connection.execute(sql, params).fetchall()
+
+    def values(self, kind, prefix=''):
+        """Distinct indexed values of a kind, optionally starting with a prefix"""
+        prefix = normalize(prefix)
+        return [row[0] for row in self.connection.execute(
+            'SELECT DISTINCT value FROM terms WHERE kind = ? AND value >= ? AND value < ? ORDER BY value',
+            (kind, prefix, prefix + '\U0010ffff'))]
+
+    def file_count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Index archivu EDI souborů (položky, objednávky, partneři)")
+    arg_parser.add_argument('--db', help="cesta k databázi indexu")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    update_parser = commands.add_parser('update', help="zaindexovat nové a změněné soubory")
+    update_parser.add_argument('folder', nargs='?', default=r"M:\APLIKACE\Edirex\INArchiv", help="složka archivu")
+    update_parser.add_argument('--pattern', default='*', help="maska souborů (např. *.edi)")
+    update_parser.add_argument('--no-recursive', action='store_true', help="neprocházet podsložky")
+    find_parser = commands.add_parser('find', help="najít soubory")
+    find_parser.add_argument('--part', help="číslo položky (LIN, PIA)")
+    find_parser.add_argument('--order', help="číslo objednávky (RFF+ON)")
+    find_parser.add_argument('--release', help="číslo releasu (RFF+RE)")
+    find_parser.add_argument('--partner', help="partner (odesílatel UNB, kód nebo název NAD, dialekt)")
+    find_parser.add_argument('--since', help="dokumenty od data (DD.MM.YYYY)")
+    find_parser.add_argument('--until', help="dokumenty do data (DD.MM.YYYY)")
+    args = arg_parser.parse_args(argv)
+
+    with ArchiveIndex(args.db) as index:
+        start = time.perf_counter()
+        if args.command == 'update':
+            errors = []
+            indexed, unchanged, removed = index.update(args.folder, args.pattern, not args.no_recursive, errors)
+            for path, error in errors:
+                print(f"{path}: CHYBA {error}", file=sys.stderr)
+            print(f"{indexed} zaindexováno, {unchanged} beze změny, {removed} odstraněno, "
+                  f"{index.file_count()} souborů v indexu, {time.perf_counter() - start:.2f} s")
+            return 1 if errors else 0
+        try:
+            rows = index.find(args.part, args.order, args.release, args.partner,
+                              _parse_date_argument(args.since), _parse_date_argument(args.until))
+        except ValueError as e:
+            print(f"CHYBA: {e}", file=sys.stderr)
+            return 1
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for path, file_type, sender, messages, first_date, last_date in rows:
+            dates = format_ordinal(first_date) if first_date == last_date else \
+                f"{format_ordinal(first_date)}-{format_ordinal(last_date)}"
+            print(f"{dates}\t{file_type or ''}\t{sender}\t{messages}\t{path}")
+        print(f"{len(rows)} souborů, {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
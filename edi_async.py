@@ -0,0 +1,238 @@
+"""asyncio API for parsing and exporting many EDI files concurrently
+
+    python edi_async.py SOUBOR.edi [...] [--concurrency 4] [--export ADRESÁŘ] [--threads]
+
+    async with AsyncEDIParser(concurrency=4) as edi:
+        parser = await edi.parse_file(path)
+        async for result in edi.parse_many(paths):
+            ...
+
+Reading, validation, parsing and export run in an executor (a process pool by
+default, so a large Cummins file does not hold the event loop's GIL), never on
+the event loop. At most ``concurrency`` jobs run at once. ``parse_many`` takes
+the next file only when a slot is free, so a slow consumer holds back the
+producer instead of queueing results. A cancelled call releases its slot at
+once; a job that already started in a worker runs to the end and its result
+is discarded.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import edi_api
+from edi_cache import decode_state, encode_state
+from edi_validate import check_bytes
+
+ParseResult = namedtuple('ParseResult', 'path parser error seconds')
+
+
+# Výsledky se mezi procesy předávají zakódované jako v cache, po blocích řádků;
+# smyčka událostí je rozbaluje po blocích a mezi nimi předá řízení ostatním úlohám
+CHUNK_ROWS = 2000
+
+
+def _encode(state):
+    """(encoded state without deliveries, [encoded delivery chunks])"""
+    rows = state['delivery_schedules']
+    rest = {name: value for name, value in state.items() if name != 'delivery_schedules'}
+    return encode_state(rest), [encode_state({'delivery_schedules': rows[start:start + CHUNK_ROWS]})
+                                for start in range(0, len(rows), CHUNK_ROWS)]
+
+
+def _decode(encoded):
+    head, chunks = encoded
+    state = decode_state(head)
+    for chunk in chunks:
+        state['delivery_schedules'].extend(decode_state(chunk)['delivery_schedules'])
+    return state
+
+
+async def _decode_async(encoded):
+    """_decode that yields to the event loop after every chunk"""
+    head, chunks = encoded
+    state = decode_state(head)
+    for chunk in chunks:
+        state['delivery_schedules'].extend(decode_state(chunk)['delivery_schedules'])
+        await asyncio.sleep(0)
+    return state
+
+
+async def _encode_async(state):
+    rows = state['delivery_schedules']
+    rest = {name: value for name, value in state.items() if name != 'delivery_schedules'}
+    chunks = []
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunks.append(encode_state({'delivery_schedules': rows[start:start + CHUNK_ROWS]}))
+        await asyncio.sleep(0)
+    return encode_state(rest), chunks
+
+
+def _parse_job(filepath, file_type, use_cache, validate):
+    """Executor job: parse a file; returns (file_type, encoded state)"""
+    parser = edi_api.parse_file(filepath, file_type=file_type, use_cache=use_cache, validate=validate)
+    return parser.file_type, _encode(parser.get_state())
+
+
+def _parse_bytes_job(data, name, file_type, validate):
+    """Executor job: parse an in-memory payload"""
+    if validate:
+        check_bytes(data)
+    if file_type is None:
+        file_type = edi_api.detect_bytes(name, data)
+    if file_type not in edi_api.PARSER_CORES:
+        raise ValueError(f"Nepodporovaný typ souboru: {name}")
+    parser = edi_api.PARSER_CORES[file_type]()
+    parser.filepath = name
+    return file_type, _encode(parser.parse_bytes(data))
+
+
+def _export_job(file_type, filepath, encoded, directory):
+    """Executor job: rebuild a parsed result and export it"""
+    return edi_api.export_file(_restore(file_type, filepath, _decode(encoded)), directory)
+
+
+def _restore(file_type, filepath, state, core_cls=None):
+    parser = (core_cls or edi_api.PARSER_CORES[file_type])()
+    parser.filepath = filepath
+    parser.set_state(state)
+    return parser
+
+
+class AsyncEDIParser:
+    """Awaitable parse and export calls with bounded concurrency
+
+    ``executor`` may be any concurrent.futures executor; by default a process
+    pool with ``concurrency`` workers is created and shut down on ``close``.
+    """
+
+    def __init__(self, concurrency=4, executor=None, use_cache=True, validate=True):
+        self.concurrency = concurrency
+        self.use_cache = use_cache
+        self.validate = validate
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._slots = asyncio.Semaphore(concurrency)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.concurrency)
+        return self._executor
+
+    async def _run(self, func, *args):
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _restore(self, file_type, filepath, encoded):
+        # The first use of a dialect imports its parser module; keep that off the loop
+        core_cls = await asyncio.to_thread(edi_api.PARSER_CORES.__getitem__, file_type)
+        return _restore(file_type, filepath, await _decode_async(encoded), core_cls)
+
+    async def parse_file(self, filepath, file_type=None):
+        """Parse a file; returns the dialect core holding the result"""
+        file_type, encoded = await self._run(_parse_job, filepath, file_type, self.use_cache, self.validate)
+        return await self._restore(file_type, filepath, encoded)
+
+    async def parse_bytes(self, data, name='payload.edi', file_type=None):
+        """Parse an EDI payload received in memory; ``name`` helps detection"""
+        file_type, encoded = await self._run(_parse_bytes_job, bytes(data), name, file_type, self.validate)
+        return await self._restore(file_type, name, encoded)
+
+    async def export_file(self, parser, directory):
+        """Export a parsed result into a directory; returns the path or None"""
+        encoded = await _encode_async(parser.get_state())
+        return await self._run(_export_job, parser.file_type, parser.filepath, encoded, directory)
+
+    async def _parse_result(self, filepath):
+        start = time.perf_counter()
+        try:
+            parser = await self.parse_file(filepath)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return ParseResult(filepath, None, e, time.perf_counter() - start)
+        return ParseResult(filepath, parser, None, time.perf_counter() - start)
+
+    async def parse_many(self, filepaths):
+        """Parse files (an iterable or async iterable) and yield ParseResults as they finish
+
+        Failures are yielded with ``error`` set instead of stopping the batch.
+        """
+        if hasattr(filepaths, '__aiter__'):
+            source = filepaths.__aiter__()
+
+            async def next_path():
+                try:
+                    return await source.__anext__()
+                except StopAsyncIteration:
+                    return None
+        else:
+            source = iter(filepaths)
+
+            async def next_path():
+                return next(source, None)
+
+        pending = set()
+        try:
+            while True:
+                # Doplnit rozpracované úlohy do limitu; další soubor až po uvolnění místa
+                while len(pending) < self.concurrency:
+                    filepath = await next_path()
+                    if filepath is None:
+                        break
+                    pending.add(asyncio.ensure_future(self._parse_result(filepath)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def close(self):
+        if self._owns_executor and self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+async def _main(args):
+    executor = ThreadPoolExecutor(max_workers=args.concurrency) if args.threads else None
+    failures = 0
+    async with AsyncEDIParser(args.concurrency, executor=executor, use_cache=not args.no_cache) as edi:
+        async for result in edi.parse_many(args.files):
+            if result.error is not None:
+                failures += 1
+                print(f"{result.path}: CHYBA {result.error}", file=sys.stderr)
+                continue
+            output = await edi.export_file(result.parser, args.export) if args.export else None
+            print(f"{result.path}: {result.parser.file_type}, {len(result.parser.delivery_schedules)} dodávek, "
+                  f"{result.seconds * 1000:.1f} ms" + (f" -> {output}" if output else ""))
+    if executor is not None:
+        executor.shutdown()
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Souběžné parsování EDI DELFOR souborů (asyncio)")
+    arg_parser.add_argument('files', nargs='+', help="EDI soubory ke zpracování")
+    arg_parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 4,
+                            help="nejvýše souběžně zpracovaných souborů")
+    arg_parser.add_argument('--export', metavar='DIR', help="adresář pro export do Excelu")
+    arg_parser.add_argument('--no-cache', action='store_true', help="nepoužívat cache výsledků")
+    arg_parser.add_argument('--threads', action='store_true', help="vlákna místo procesů")
+    return asyncio.run(_main(arg_parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,442 @@
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import sys
+import zlib
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from edi_input import open_input
+
+# Zvýšit při změně formátu záznamů v cache
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_SESSION_MAX_BYTES = 256 * 1024 * 1024
+INDEX_NAME = 'index.json'
+# Soubory v cache, které podléhají vyřazování (výsledky, indexy pozic edi_offsets)
+CACHE_FILE_SUFFIXES = ('.bin', '.idx')
+# Moduly sdílené všemi parsery; jejich změna také zneplatní cache
+SHARED_PARSER_MODULES = ('edi_core', 'edi_dialect', 'edi_charset', 'edi_input', 'edi_calendar', 'edi_records')
+
+_version_cache = {}
+
+
+def default_cache_dir():
+    """Cache directory from EDI_PARSER_CACHE_DIR or the per-user default"""
+    configured = os.environ.get('EDI_PARSER_CACHE_DIR')
+    if configured:
+        return configured
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'EDI_Parser', 'cache')
+    return os.path.join(os.path.expanduser('~'), '.cache', 'edi_parser')
+
+
+def parser_version(parser_cls):
+    """Fingerprint of the parser code so cached results expire when it changes"""
+    module_name = parser_cls.__module__
+    version = _version_cache.get(module_name)
+    if version is None:
+        digest = hashlib.sha1(f"{CACHE_FORMAT_VERSION}:{module_name}".encode('utf-8'))
+        paths = [_module_path(name) for name in (module_name,) + SHARED_PARSER_MODULES]
+        for path in paths + [__file__]:
+            # Compiled builds (Nuitka) may not ship the sources; fall back to the format version
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            except (OSError, TypeError):
+                pass
+        version = digest.hexdigest()[:16]
+        _version_cache[module_name] = version
+    return version
+
+
+def _module_path(name):
+    """Source file of a module, also when it has not been imported yet"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return getattr(module, '__file__', None)
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    return spec.origin if spec else None
+
+
+def encode_state(state):
+    """Compact binary form: delivery dicts stored as key schemas plus value tuples"""
+    packed = dict(state)
+    schemas = {}
+    rows = []
+    for delivery in packed.pop('delivery_schedules', []):
+        schema_id = schemas.setdefault(tuple(delivery), len(schemas))
+        rows.append((schema_id, tuple(delivery.values())))
+    packed['_deliveries'] = (list(schemas), rows)
+    return zlib.compress(pickle.dumps(packed, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+def decode_state(blob):
+    """Inverse of encode_state"""
+    packed = pickle.loads(zlib.decompress(blob))
+    schemas, rows = packed.pop('_deliveries')
+    packed['delivery_schedules'] = [dict(zip(schemas[schema_id], values))
+                                    for schema_id, values in rows]
+    return packed
+
+
+def deep_sizeof(obj):
+    """Approximate memory footprint of an object graph of containers and strings"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__'):
+            stack.append(item.__dict__)
+    return total
+
+
+class ParseCache:
+    """On-disk cache of parsed results keyed by file identity and content hash
+
+    The index maps an absolute path to its (size, mtime, content hash, file type),
+    so an unchanged file is served without being read at all. Entries are named by
+    content hash, file type and parser version; files whose content matches a
+    cached entry (e.g. a copy in another folder) are hits as well. Least recently
+    used entries are evicted once the total size exceeds ``max_bytes``; index
+    records of files that were deleted or changed since are dropped when the
+    index is loaded.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or default_cache_dir()
+        if max_bytes is None:
+            max_mb = os.environ.get('EDI_PARSER_CACHE_MAX_MB')
+            max_bytes = int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+        self._index = None
+        self.hits = 0
+        self.misses = 0
+
+    # Index handling
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+            if self.prune_index():
+                try:
+                    self._save_index()
+                except OSError:
+                    pass
+        return self._index
+
+    def prune_index(self):
+        """Drop index records whose hash no longer describes the file; returns their number"""
+        stale = []
+        for path, record in self._index.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append(path)
+                continue
+            if record.get('size') != st.st_size or record.get('mtime_ns') != st.st_mtime_ns:
+                stale.append(path)
+        for path in stale:
+            del self._index[path]
+        return len(stale)
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def file_identity(filepath):
+        st = os.stat(filepath)
+        return os.path.abspath(filepath), st.st_size, st.st_mtime_ns
+
+    def _known_entry(self, filepath):
+        """Index record of the file if its size and mtime are unchanged"""
+        path, size, mtime_ns = self.file_identity(filepath)
+        index = self._load_index()
+        record = index.get(path)
+        if record and record.get('size') == size and record.get('mtime_ns') == mtime_ns:
+            return record
+        if record:
+            # Soubor se změnil; uložený hash už neplatí
+            del index[path]
+        return None
+
+    def _entry_path(self, content_hash, file_type, version):
+        return os.path.join(self.directory, f"{content_hash}_{file_type}_{version}.bin")
+
+    # Public API
+
+    def known_hash(self, filepath):
+        """Content hash recorded for an unchanged file, or None"""
+        try:
+            record = self._known_entry(filepath)
+        except OSError:
+            return None
+        return record.get('hash') if record else None
+
+    def record_hash(self, filepath, content_hash):
+        """Remember the content hash of a file so that unchanged files are not hashed again"""
+        path, size, mtime_ns = self.file_identity(filepath)
+        record = self._load_index().get(path)
+        if not (record and record.get('size') == size and record.get('mtime_ns') == mtime_ns
+                and record.get('hash') == content_hash):
+            self._index[path] = {'size': size, 'mtime_ns': mtime_ns, 'hash': content_hash}
+        try:
+            self._save_index()
+        except OSError:
+            pass
+
+    def cached_file_type(self, filepath):
+        """Detected file type recorded for an unchanged file, or None"""
+        try:
+            record = self._known_entry(filepath)
+        except OSError:
+            return None
+        return record.get('file_type') if record else None
+
+    def has_result(self, filepath, file_type, version):
+        """True when a parsed result for the content hash of an unchanged file is stored"""
+        try:
+            record = self._known_entry(filepath)
+        except OSError:
+            return False
+        return bool(record and record.get('hash')
+                    and os.path.isfile(self._entry_path(record['hash'], file_type, version)))
+
+    def get_or_parse(self, filepath, file_type, version, parse_bytes, source=None):
+        """Return the parsed state of a file, calling parse_bytes(source) only on a miss
+
+        ``source`` is the edi_input.EDIInput of the file (memory-mapped when large);
+        an already opened one can be passed in and is left open.
+        """
+        record = self._known_entry(filepath)
+        if record:
+            state = self._read_entry(self._entry_path(record['hash'], file_type, version))
+            if state is not None:
+                self.hits += 1
+                return state
+
+        with open_input(filepath) if source is None else nullcontext(source) as source:
+            if not source.reopenable:
+                # Rouru nelze přečíst dvakrát (pro hash a pro parsování)
+                self.misses += 1
+                return parse_bytes(source)
+            content_hash = source.content_hash()
+            entry_path = self._entry_path(content_hash, file_type, version)
+            state = self._read_entry(entry_path)
+            if state is None:
+                self.misses += 1
+                state = parse_bytes(source)
+                self._write_entry(entry_path, state)
+            else:
+                self.hits += 1
+
+        path, size, mtime_ns = self.file_identity(filepath)
+        self._load_index()[path] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'hash': content_hash,
+            'file_type': file_type,
+        }
+        try:
+            self._save_index()
+        except OSError:
+            pass
+        return state
+
+    def _read_entry(self, entry_path):
+        try:
+            with open(entry_path, 'rb') as f:
+                blob = f.read()
+            state = decode_state(blob)
+        except (OSError, ValueError, EOFError, zlib.error, pickle.UnpicklingError, KeyError):
+            return None
+        try:
+            # Touch the entry so eviction keeps recently used results
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return state
+
+    def _write_entry(self, entry_path, state):
+        self.write_file(entry_path, encode_state(state))
+
+    def write_file(self, path, blob):
+        """Atomically store a file in the cache directory (entries, offset indexes) and evict"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+            self.evict()
+        except OSError:
+            # A read-only or full cache directory must never break parsing
+            pass
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used entries until the cache fits into max_bytes"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(CACHE_FILE_SUFFIXES) and entry.is_file():
+                        st = entry.stat()
+                        entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                        total += st.st_size
+        except OSError:
+            return 0
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def clear(self):
+        """Remove every cached entry and the index"""
+        self.evict(0)
+        self._index = {}
+        try:
+            os.remove(self.index_path)
+        except OSError:
+            pass
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache instance; EDI_PARSER_CACHE=0 disables caching"""
+    global _default_cache
+    if os.environ.get('EDI_PARSER_CACHE', '1') == '0':
+        return None
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
+
+
+class SessionCache:
+    """In-memory LRU of parsed results shared by the parser windows of one session
+
+    Entries are keyed by (path, size, mtime, file type), so a changed file is
+    never served stale; looking an entry up costs one ``os.stat`` and no read.
+    ``extras`` keeps derived objects such as the delivery record store next to
+    the parsed state. The total footprint is bounded by ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_mb = os.environ.get('EDI_PARSER_SESSION_CACHE_MB')
+            max_bytes = int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_SESSION_MAX_BYTES
+        self.max_bytes = max_bytes
+        # key -> (state, extras, size)
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key_for(filepath, file_type):
+        path, size, mtime_ns = ParseCache.file_identity(filepath)
+        return path, size, mtime_ns, file_type
+
+    def get(self, filepath, file_type):
+        """Return (state, extras) of an unchanged file, or None"""
+        try:
+            key = self.key_for(filepath, file_type)
+        except OSError:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    def put(self, filepath, file_type, state, extras):
+        """Store a parsed result (again) and evict least recently used entries"""
+        try:
+            key = self.key_for(filepath, file_type)
+        except OSError:
+            return
+        self._entries[key] = (state, extras, deep_sizeof((state, extras)))
+        self._entries.move_to_end(key)
+        self.evict()
+
+    def cached_file_type(self, filepath):
+        """File type of an unchanged file held in the session, or None"""
+        try:
+            path, size, mtime_ns = ParseCache.file_identity(filepath)
+        except OSError:
+            return None
+        for key in reversed(self._entries):
+            if key[:3] == (path, size, mtime_ns):
+                return key[3]
+        return None
+
+    def footprint(self):
+        """Total approximate size of the cached results in bytes"""
+        return sum(entry[2] for entry in self._entries.values())
+
+    def entries(self):
+        """(path, file type, size in bytes) from most to least recently used"""
+        return [(key[0], key[3], entry[2]) for key, entry in reversed(self._entries.items())]
+
+    def evict(self, max_bytes=None):
+        """Drop least recently used entries until the footprint fits into max_bytes"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        total = self.footprint()
+        removed = 0
+        while self._entries and total > limit:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry[2]
+            removed += 1
+        return removed
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_session_cache = None
+
+
+def session_cache():
+    """In-memory cache shared by all parser windows of this process"""
+    global _session_cache
+    if _session_cache is None:
+        _session_cache = SessionCache()
+    return _session_cache
@@ -0,0 +1,204 @@
+"""Delivery date parsing and calendar bucketing shared by the parsers and exporters
+
+Dates are handled as proleptic Gregorian ordinals (``date.toordinal()``). ISO
+year, ISO week and month of every day in the forecast horizon are precomputed
+once into a lookup table, so per-row week numbers are a list index and whole
+arrays of dates are bucketed with a single ``numpy.take``. The parsers and
+workbook exports convert EDI dates (DTM format codes 101, 102, 203) and
+'DD.MM.YYYY' texts only through the cached functions here.
+"""
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+
+# Rozsah předpočítané tabulky (horizont odvolávek)
+FIRST_YEAR = 2000
+LAST_YEAR = 2099
+
+# Ordinal 1.1.1970 pro převod na numpy datetime64[D]
+_EPOCH = date(1970, 1, 1).toordinal()
+# Řadicí klíč řádků bez data, za všemi platnými daty
+NO_DATE_ORDINAL = date.max.toordinal() + 1
+
+
+@lru_cache(maxsize=8192)
+def parse_date_ordinal(date_str):
+    """Convert 'DD.MM.YYYY' (optionally with time) or 'YYYYMMDD' to a date ordinal"""
+    if not date_str:
+        return None
+    try:
+        date_part = date_str.split(' ')[0]
+        if '.' in date_part:
+            day, month, year = date_part.split('.')
+            year = int(year)
+            # Handle 2-digit year
+            if year < 100:
+                year += 2000
+            return date(year, int(month), int(day)).toordinal()
+        if len(date_part) == 8 and date_part.isdigit():
+            return date(int(date_part[:4]), int(date_part[4:6]), int(date_part[6:])).toordinal()
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return None
+
+
+@lru_cache(maxsize=8192)
+def edi_date_ordinal(text, format_code='102'):
+    """Date ordinal of an EDI date: 101 YYMMDD, 102 CCYYMMDD, 203 CCYYMMDDHHMM[SS]; None if invalid"""
+    if not text or not text.isdigit():
+        return None
+    if format_code == '101' and len(text) == 6:
+        text = '20' + text
+    elif format_code == '203' and 12 <= len(text) <= 14:
+        text = text[:8]
+    elif format_code != '102' or len(text) != 8:
+        return None
+    try:
+        return date(int(text[:4]), int(text[4:6]), int(text[6:])).toordinal()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def format_ordinal(ordinal):
+    """'DD.MM.YYYY' of a date ordinal, or '' for a missing date"""
+    if not ordinal or ordinal <= 0:
+        return ''
+    day = date.fromordinal(ordinal)
+    return f"{day.day:02d}.{day.month:02d}.{day.year:04d}"
+
+
+def edi_date_text(text, format_code='102'):
+    """'DD.MM.YYYY' of an EDI date (see edi_date_ordinal), or None if invalid"""
+    ordinal = edi_date_ordinal(text, format_code)
+    return format_ordinal(ordinal) if ordinal else None
+
+
+def edi_datetime_text(text):
+    """'DD.MM.YYYY HH:MM' of an UNB date/time 'YYMMDD:HHMM', or None if invalid"""
+    date_part, _, time_part = text.partition(':')
+    ordinal = edi_date_ordinal(date_part, '101')
+    if not ordinal or len(time_part) != 4 or not time_part.isdigit():
+        return None
+    if int(time_part[:2]) > 23 or int(time_part[2:]) > 59:
+        return None
+    return f"{format_ordinal(ordinal)} {time_part[:2]}:{time_part[2:]}"
+
+
+@lru_cache(maxsize=8192)
+def ordinal_date(ordinal):
+    """date of a date ordinal (shared object for workbook cells)"""
+    return date.fromordinal(ordinal)
+
+
+@lru_cache(maxsize=8192)
+def ordinal_datetime(ordinal):
+    """Midnight datetime of a date ordinal (shared object for workbook cells)"""
+    return datetime.fromordinal(ordinal)
+
+
+def iso_calendar(ordinals):
+    """Vectorized ISO year, ISO week and month of an array of date ordinals"""
+    days = np.asarray(ordinals, dtype=np.int64) - _EPOCH
+    # ISO week belongs to the year of its Thursday (ordinal 1 is a Monday)
+    thursday = days - (days + _EPOCH - 1) % 7 + 3
+    iso_year = thursday.astype('datetime64[D]').astype('datetime64[Y]')
+    year_start = iso_year.astype('datetime64[D]').astype(np.int64)
+    iso_week = (thursday - year_start) // 7 + 1
+    month = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+    return (iso_year.astype(np.int64) + 1970).astype(np.int16), iso_week.astype(np.int8), month.astype(np.int8)
+
+
+class CalendarTable:
+    """Precomputed ordinal -> (ISO year, ISO week, month) lookup for a range of days"""
+
+    def __init__(self, first_ordinal, last_ordinal):
+        self.first = first_ordinal
+        self.last = last_ordinal
+        ordinals = np.arange(first_ordinal, last_ordinal + 1, dtype=np.int64)
+        self.iso_year, self.iso_week, self.month = iso_calendar(ordinals)
+        # Pondělí ISO týdne každého dne (ordinal 1 je pondělí)
+        self.monday = ordinals - (ordinals - 1) % 7
+        # Python lists for per-row lookups; indexing a list beats indexing an ndarray
+        self._weeks = self.iso_week.tolist()
+        self._year_weeks = list(zip(self.iso_year.tolist(), self._weeks))
+
+    def week(self, ordinal):
+        if self.first <= ordinal <= self.last:
+            return self._weeks[ordinal - self.first]
+        return date.fromordinal(ordinal).isocalendar()[1]
+
+    def year_week(self, ordinal):
+        if self.first <= ordinal <= self.last:
+            return self._year_weeks[ordinal - self.first]
+        return tuple(date.fromordinal(ordinal).isocalendar()[:2])
+
+    def contains(self, ordinals):
+        """Mask of the ordinals inside the table range"""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        return (ordinals >= self.first) & (ordinals <= self.last)
+
+    def week_start(self, ordinals):
+        """Monday ordinal of the ISO week of each date; 0 for dates outside the table"""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        inside = self.contains(ordinals)
+        mondays = np.zeros(len(ordinals), dtype=np.int64)
+        mondays[inside] = np.take(self.monday, ordinals[inside] - self.first)
+        return mondays
+
+    def bucket(self, ordinals):
+        """ISO year, ISO week and month arrays for an array of ordinals; invalid dates give 0"""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        index = ordinals - self.first
+        inside = (index >= 0) & (ordinals <= self.last)
+        iso_year = np.zeros(len(ordinals), dtype=np.int16)
+        iso_week = np.zeros(len(ordinals), dtype=np.int8)
+        month = np.zeros(len(ordinals), dtype=np.int8)
+        iso_year[inside] = np.take(self.iso_year, index[inside])
+        iso_week[inside] = np.take(self.iso_week, index[inside])
+        month[inside] = np.take(self.month, index[inside])
+        # Dates beyond the horizon are rare; compute them directly
+        outside = ~inside & (ordinals > 0)
+        if outside.any():
+            iso_year[outside], iso_week[outside], month[outside] = iso_calendar(ordinals[outside])
+        return iso_year, iso_week, month
+
+
+_table = None
+
+
+def calendar_table():
+    """Shared table covering FIRST_YEAR..LAST_YEAR, built on first use"""
+    global _table
+    if _table is None:
+        _table = CalendarTable(date(FIRST_YEAR, 1, 1).toordinal(), date(LAST_YEAR, 12, 31).toordinal())
+    return _table
+
+
+def iso_week(ordinal):
+    """ISO week number of a date ordinal, or '' for a missing date"""
+    return calendar_table().week(ordinal) if ordinal and ordinal > 0 else ''
+
+
+def iso_year_week(ordinal):
+    """(ISO year, ISO week) of a date ordinal, or (0, 0) for a missing date"""
+    return calendar_table().year_week(ordinal) if ordinal and ordinal > 0 else (0, 0)
+
+
+def week_of(date_str):
+    """ISO week number of a date string, or '' if the date cannot be parsed"""
+    return iso_week(parse_date_ordinal(date_str))
+
+
+def bucket(ordinals):
+    """ISO year, ISO week and month arrays for an array of date ordinals"""
+    return calendar_table().bucket(ordinals)
+
+
+def to_datetime64(ordinals):
+    """datetime64[D] array of date ordinals; 0 (missing date) becomes NaT"""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    days = (ordinals - _EPOCH).astype('datetime64[D]')
+    days[ordinals <= 0] = np.datetime64('NaT')
+    return days
@@ -0,0 +1,48 @@
+"""Character set of an interchange from its UNB syntax identifier
+
+UNOA/UNOB/UNOC are ISO-8859-1 compatible, UNOD..UNOF are further ISO-8859
+parts and UNOW/UNOY are UTF-8. Values are decoded one at a time by the dialect
+engine; segments and separators stay ``bytes``. Some senders declare UNOC but
+write UTF-8, so for single-byte charsets a value that is valid UTF-8 is read
+as UTF-8 (Latin-1 text with accents is practically never valid UTF-8).
+"""
+import re
+from functools import partial
+
+SYNTAX_CHARSETS = {
+    'UNOA': 'iso-8859-1',
+    'UNOB': 'iso-8859-1',
+    'UNOC': 'iso-8859-1',
+    'UNOD': 'iso-8859-2',
+    'UNOE': 'iso-8859-5',
+    'UNOF': 'iso-8859-7',
+    'UNOW': 'utf-8',
+    'UNOY': 'utf-8',
+}
+# UNB je do několika set bajtů od začátku (po UNA a případném BOM)
+UNB_SEARCH_BYTES = 1024
+SYNTAX_IDENTIFIER = re.compile(rb"UNB\+([A-Z]{4})")
+
+
+def syntax_identifier(data):
+    """Syntax identifier (UNOC, ...) from the UNB segment, or None"""
+    match = SYNTAX_IDENTIFIER.search(data[:UNB_SEARCH_BYTES])
+    return match.group(1).decode('ascii') if match else None
+
+
+def detect_charset(data, default='utf-8'):
+    """Python codec for the interchange, from UNB or the default"""
+    return SYNTAX_CHARSETS.get(syntax_identifier(data), default)
+
+
+def make_decoder(charset, errors='replace'):
+    """Function bytes -> str for element values of an interchange in charset"""
+    if charset == 'utf-8':
+        return partial(bytes.decode, encoding='utf-8', errors=errors)
+
+    def decode(value):
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            return value.decode(charset, errors)
+    return decode
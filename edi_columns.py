@@ -0,0 +1,119 @@
+"""Columnar NumPy view of parsed delivery records, with an optional pandas DataFrame
+
+    columns = parser.columns()
+    columns.dates, columns.quantities            # int32 ordinals, float64
+    columns.part_codes, columns.parts            # part code of every row, distinct parts
+    frame = parser.to_pandas()                   # needs pandas
+
+Records are already dictionary-encoded while parsing (edi_dialect), so a
+column is converted once per distinct value and spread to the rows with one
+``numpy.take`` over the row codes. Text columns stay encoded: a list of
+distinct values and an int32 code per row (-1 where the row has no value),
+which ``to_pandas`` turns into Categoricals without touching the records.
+"""
+import numpy as np
+
+from edi_calendar import parse_date_ordinal, to_datetime64
+
+# Textové sloupce bez náhradní hodnoty: (hodnoty, kódy, sloupec záznamu)
+CODED_COLUMNS = (
+    ('parts', 'part_codes', 'Položka'),
+    ('scc', 'scc_codes', 'SCC'),
+    ('types', 'type_codes', 'Typ'),
+    ('units', 'unit_codes', 'Jednotka'),
+)
+
+
+def column_codes(parser, column):
+    """(distinct values, int32 code per record) of a record column; -1 where a record has no value"""
+    values, codes = parser.column_codes(column)
+    return values, np.array(codes, dtype=np.int32)
+
+
+def _quantity(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class DeliveryColumns:
+    """Delivery records of one parse result as parallel NumPy arrays
+
+    ``dates`` are date ordinals of the parser's ``date_field`` (0 where the
+    date is missing or invalid) and ``quantities`` are floats (NaN where not a
+    number). Parts, releases, SCC, types and units are dictionary-encoded as
+    a list of distinct values (``parts``, ``releases``, ``scc``, ``types``,
+    ``units``) and an int32 code per row (``part_codes``, ``release_codes``,
+    ``scc_codes``, ``type_codes``, ``unit_codes``). The part is the one every
+    record carries (-1 where a projection left it out); rows without a release
+    take the message number from the header, as ``parser.release_number``.
+    """
+
+    def __init__(self, parser):
+        self.records = parser.delivery_schedules
+        self.count = len(self.records)
+        self.file_type = parser.file_type
+        self.releases, self.release_codes = self._coded(parser, 'Release', parser.header_info.get('Číslo zprávy', ''))
+        for values_name, codes_name, column in CODED_COLUMNS:
+            values, codes = column_codes(parser, column)
+            setattr(self, values_name, values)
+            setattr(self, codes_name, codes)
+        self.dates = self._mapped(parser, parser.date_field, lambda value: parse_date_ordinal(value) or 0,
+                                  np.int32, 0)
+        self.quantities = self._mapped(parser, 'Množství', _quantity, np.float64, np.nan)
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def _coded(parser, column, fallback):
+        """Codes of a column where rows without a value take the fallback (header value)"""
+        values, codes = column_codes(parser, column)
+        if not fallback:
+            return values, codes
+        values = list(values)
+        try:
+            fallback_code = values.index(fallback)
+        except ValueError:
+            fallback_code = len(values)
+            values.append(fallback)
+        # Kód -1 (chybějící) i prázdná hodnota ukazují na náhradní hodnotu z hlavičky
+        remap = np.arange(len(values) + 1, dtype=np.int32)
+        remap[-1] = fallback_code
+        for code, value in enumerate(values):
+            if value == '':
+                remap[code] = fallback_code
+        return values, remap.take(codes)
+
+    @staticmethod
+    def _mapped(parser, column, convert, dtype, missing):
+        """Column converted once per distinct value and spread over the rows"""
+        values, codes = column_codes(parser, column)
+        # Poslední prvek je hodnota pro kód -1
+        lookup = np.array([convert(value) for value in values] + [missing], dtype=dtype)
+        return lookup.take(codes)
+
+    def to_pandas(self):
+        """pandas DataFrame of the columns (Categorical text columns, datetime64 dates)
+
+        pandas is an optional dependency, imported only here.
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("Pro to_pandas() je potřeba pandas (pip install pandas)") from None
+
+        def categorical(values, codes):
+            # Categorical vyžaduje jedinečné kategorie; hodnoty slovníku jedinečné jsou
+            return pd.Categorical.from_codes(codes, categories=pd.Index(values, dtype=object))
+
+        return pd.DataFrame({
+            'Položka': categorical(self.parts, self.part_codes),
+            'Datum': to_datetime64(self.dates),
+            'Množství': self.quantities,
+            'SCC': categorical(self.scc, self.scc_codes),
+            'Typ': categorical(self.types, self.type_codes),
+            'Jednotka': categorical(self.units, self.unit_codes),
+            'Release': categorical(self.releases, self.release_codes),
+        })
@@ -0,0 +1,213 @@
+from contextlib import nullcontext
+
+import edi_cache
+from edi_charset import detect_charset, make_decoder
+from edi_columns import DeliveryColumns
+from edi_dialect import build_dictionaries
+from edi_input import EDIInput, open_input
+from edi_profile import new_profile, profiling_mode
+
+
+class EDIParserCore:
+    """Headless parsing state shared by the dialect parsers
+
+    Subclasses declare their grammar as ``dialect`` (see edi_dialect) and
+    implement ``build_workbook()``; the Tk windows inherit from their dialect
+    core and only add the UI.
+    """
+
+    file_type = None
+    # Kódování souboru bez syntaktického identifikátoru v UNB a chování při chybných bajtech
+    encoding = 'utf-8'
+    encoding_errors = 'replace'
+    # Atributy, které tvoří výsledek parsování (a ukládají se do cache)
+    state_fields = ('header_info', 'partner_info', 'delivery_schedules')
+    # Pole s datem dodávky v záznamech dodávek
+    date_field = 'Datum od'
+    # Deklarovaná gramatika zpráv (edi_dialect.Dialect)
+    dialect = None
+
+    def __init__(self):
+        self.filepath = None
+        self.header_info = {}
+        self.partner_info = {}
+        self.delivery_schedules = []
+        # Slovníky hodnot sloupců záznamů (edi_dialect.ValueDictionary), viz dictionaries()
+        self.value_dictionaries = None
+        # Znaková sada posledního parsování (edi_charset)
+        self.charset = None
+        # Objekty odvozené z výsledku (např. úložiště řádků tabulky), drží se v cache relace
+        self.session_extras = {}
+        # Filtr a projekce záznamů při parsování (edi_dialect.Selection), None = vše
+        self.selection = None
+        # Profilování parsování (edi_profile): None, 'time' nebo 'memory'
+        self.profiling = profiling_mode()
+        self.profile = None
+
+    def report_error(self, message):
+        """Report a non-fatal parsing problem (the GUI shows a message box instead)"""
+        print(message)
+
+    def part_number(self, delivery):
+        """Part of a delivery; every dialect stamps it on the record (Minebea/TRWKOB from its LIN)"""
+        return delivery.get('Položka', '')
+
+    def release_number(self, delivery):
+        """Release of a delivery, or the message number when rows carry none"""
+        return delivery.get('Release') or self.header_info.get('Číslo zprávy', '')
+
+    def release_date(self):
+        """Document date of the release ('DD.MM.YYYY'), falling back to the interchange date"""
+        return self.header_info.get('Datum dokumentu') or self.header_info.get('Datum/Čas', '')
+
+    def profiled(self, phase):
+        """Context manager measuring a pipeline phase when profiling is on"""
+        return self.profile.phase(phase) if self.profile is not None else nullcontext()
+
+    @staticmethod
+    def _tokenize(data):
+        if isinstance(data, EDIInput):
+            return data.segments()
+        return [segment.strip() for segment in data.strip().split(b"'") if segment.strip()]
+
+    def split_segments(self, data):
+        """Stripped, non-empty segments of raw content (bytes or edi_input.EDIInput)
+
+        An EDIInput yields its segments lazily, one chunk at a time. A memory
+        profile keeps that stream and times the tokenizer inside it; a time
+        profile collects the segments into a list so that tokenizing is timed
+        on its own.
+        """
+        if self.profile is None:
+            return self._tokenize(data)
+        if self.profile.streams_segments:
+            return self.profile.segments(self._tokenize(data))
+        with self.profile.phase('tokenize'):
+            segments = list(self._tokenize(data))
+        return self.profile.segments(segments)
+
+    def parse_data(self, data, charset=None):
+        """Parse raw EDI DELFOR content with the declared dialect
+
+        ``data`` is bytes, a memoryview or an edi_input.EDIInput. The charset
+        comes from the UNB syntax identifier unless given; only the element
+        values that are stored get decoded. With ``self.selection`` only the
+        selected records and fields are built.
+        """
+        if isinstance(data, EDIInput):
+            head = data.head()
+        else:
+            if not isinstance(data, bytes):
+                data = bytes(data)
+            head = data
+        self.header_info = {}
+        self.partner_info = {}
+        self.delivery_schedules = []
+        # Odvozené objekty patří k předchozímu výsledku
+        self.session_extras = {}
+        self.charset = charset or detect_charset(head, self.encoding)
+        run = self.dialect.run(self, self.split_segments(data), make_decoder(self.charset, self.encoding_errors))
+        self.value_dictionaries = run.dictionaries
+
+    def parse_edi_file(self, content):
+        """Parse already decoded EDI DELFOR text"""
+        self.parse_data(content.encode('utf-8'), 'utf-8')
+
+    def status_text(self):
+        """Status bar text: profile summary, or just the row count"""
+        if self.profile is not None:
+            return self.profile.status_text()
+        return f"Řádků: {len(self.delivery_schedules):,}"
+
+    def get_state(self):
+        """Parsed result as a plain dict"""
+        return {name: getattr(self, name) for name in self.state_fields}
+
+    def set_state(self, state):
+        """Restore a parsed result produced by get_state"""
+        for name in self.state_fields:
+            setattr(self, name, state[name])
+        self.value_dictionaries = None
+
+    def dictionaries(self):
+        """{column: ValueDictionary} of the delivery records
+
+        Filled while parsing; a result restored from a cache gets them rebuilt
+        (and its values interned) on first use.
+        """
+        if self.value_dictionaries is None:
+            self.value_dictionaries = build_dictionaries(self.delivery_schedules)
+        return self.value_dictionaries
+
+    def column_codes(self, column):
+        """(distinct values, code of every delivery record) of a column; -1 where it is missing"""
+        dictionary = self.dictionaries().get(column)
+        if dictionary is None:
+            return [], [-1] * len(self.delivery_schedules)
+        return dictionary.values, dictionary.encode(self.delivery_schedules, column)
+
+    def columns(self):
+        """Columnar NumPy view of the delivery records (edi_columns.DeliveryColumns)
+
+        Built on first use and kept with the result in the session cache.
+        """
+        columns = self.session_extras.get('delivery_columns')
+        if columns is None or columns.records is not self.delivery_schedules:
+            columns = self.session_extras['delivery_columns'] = DeliveryColumns(self)
+        return columns
+
+    def to_pandas(self):
+        """Delivery records as a pandas DataFrame built from the columnar view (needs pandas)"""
+        return self.columns().to_pandas()
+
+    def parse_bytes(self, data):
+        """Parse raw file content (bytes, memoryview or EDIInput) and return the resulting state"""
+        if self.profile is None:
+            self.parse_data(data)
+            return self.get_state()
+        with self.profile.phase('parse'):
+            self.parse_data(data)
+        self.profile.finish_parse(self)
+        return self.get_state()
+
+    def load_path(self, filepath, use_cache=True, source=None):
+        """Parse a file, reusing the on-disk cache of parsed results when possible
+
+        A profiled load always parses the file so that every phase is measured;
+        a load with a selection parses it too, and its partial result is not cached.
+        ``source`` is an already opened edi_input.EDIInput of the file, left open.
+        """
+        self.filepath = filepath
+        self.session_extras = {}
+        self.profile = new_profile(self.profiling)
+        cache = (edi_cache.default_cache()
+                 if use_cache and self.profile is None and self.selection is None else None)
+        if cache is None:
+            if source is not None:
+                self.parse_bytes(source)
+                return
+            with self.profiled('read'):
+                source = open_input(filepath)
+            with source:
+                self.parse_bytes(source)
+            return
+        state = cache.get_or_parse(filepath, self.file_type,
+                                   edi_cache.parser_version(type(self)), self.parse_bytes, source)
+        self.set_state(state)
+
+    def restore_from_session(self, filepath):
+        """Take the result from the in-memory session cache; True on a hit"""
+        cached = edi_cache.session_cache().get(filepath, self.file_type)
+        if cached is None:
+            return False
+        state, self.session_extras = cached
+        self.filepath = filepath
+        self.profile = None
+        self.set_state(state)
+        return True
+
+    def remember_in_session(self):
+        """Store the current result (and its extras) in the session cache"""
+        if self.filepath:
+            edi_cache.session_cache().put(self.filepath, self.file_type,
+                                          self.get_state(), self.session_extras)
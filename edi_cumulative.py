@@ -0,0 +1,187 @@
+"""Reconciliation of Cummins cumulative quantities (QTY+3) with the deliveries
+
+    python edi_cumulative.py SOUBOR.edi [...] [--no-cache]
+
+Cummins reports a cumulative figure ('Kumulativní') next to the delivery
+quantities (QTY+1, 'Dodávka'). The figure includes everything received before
+the schedule horizon, which the file does not state separately, so a single
+report cannot be checked. The earliest report of a part, dated by the DTM+2
+that follows it, is taken as the stated prior cumulative (the baseline): the
+cumulative quantity as of that date, deliveries on the date included. Every
+later report of the part must equal the baseline plus the deliveries dated
+after the baseline date up to and including its own date. Parts whose only
+report is the baseline are "not verifiable" and are listed as such, not
+counted as reconciled.
+
+Running sums are computed for all parts at once with NumPy: rows are sorted
+by a combined (part, date) key, summed with ``cumsum`` and rebased at each
+part boundary.
+"""
+import argparse
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from edi_calendar import format_ordinal, parse_date_ordinal
+
+DELIVERY_TYPE = 'Dodávka'
+CUMULATIVE_TYPE = 'Kumulativní'
+# Bity vyhrazené pro ordinal data v kombinovaném klíči (položka, datum)
+DATE_BITS = 22
+
+# Stav hlášení: výchozí stav položky, souhlasí, nesouhlasí
+BASELINE = 'baseline'
+RECONCILED = 'ok'
+MISMATCH = 'mismatch'
+
+CumulativeCheck = namedtuple('CumulativeCheck',
+                             'part ordinal reported expected baseline baseline_ordinal difference status')
+
+
+def _quantity(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _columns(rows, part_codes, date_field):
+    """Combined (part, date) keys and quantities of rows; rows without a valid date are dropped"""
+    ordinals = {}
+    keys = []
+    quantities = []
+    for row in rows:
+        date_str = row.get(date_field, '')
+        ordinal = ordinals.get(date_str)
+        if ordinal is None:
+            ordinal = ordinals[date_str] = parse_date_ordinal(date_str) or 0
+        if not ordinal:
+            continue
+        code = part_codes.setdefault(row.get('Položka', ''), len(part_codes))
+        keys.append((code << DATE_BITS) | ordinal)
+        quantities.append(_quantity(row.get('Množství')))
+    return np.array(keys, dtype=np.int64), np.array(quantities, dtype=np.int64)
+
+
+def _starts(groups):
+    """Mask of the first element of each run of equal values"""
+    return np.r_[True, groups[1:] != groups[:-1]] if len(groups) else np.zeros(0, dtype=bool)
+
+
+class CumulativeReconciliation:
+    """Per-part running delivery totals checked against the reported cumulative figures
+
+    ``expected`` of a report is the baseline plus the deliveries after the
+    baseline date up to the report date; the baseline report itself is not a
+    check (``checked`` is False). ``unverifiable_parts`` have no report besides
+    their baseline.
+    """
+
+    def __init__(self, parser):
+        deliveries = []
+        reports = []
+        for row in parser.delivery_schedules:
+            row_type = row.get('Typ')
+            if row_type == DELIVERY_TYPE:
+                deliveries.append(row)
+            elif row_type == CUMULATIVE_TYPE:
+                reports.append(row)
+        part_codes = {}
+        delivery_keys, delivery_qty = _columns(deliveries, part_codes, parser.date_field)
+        report_keys, reported = _columns(reports, part_codes, parser.date_field)
+        self.parts = np.array(list(part_codes), dtype=object)
+
+        # Running totals per part: global cumsum rebased at each part's first row
+        order = np.argsort(delivery_keys, kind='stable')
+        delivery_keys = delivery_keys[order]
+        running = np.cumsum(delivery_qty[order])
+        delivery_parts = delivery_keys >> DATE_BITS
+        part_start = _starts(delivery_parts)
+        before_part = np.r_[0, running[:-1]][part_start]
+        running = running - before_part[np.cumsum(part_start) - 1]
+
+        # The part's running delivery total on the date of each report
+        order = np.argsort(report_keys, kind='stable')
+        report_keys = report_keys[order]
+        reported = reported[order]
+        report_parts = report_keys >> DATE_BITS
+        last = np.searchsorted(delivery_keys, report_keys, side='right') - 1
+        valid = last >= 0
+        valid[valid] = delivery_parts[last[valid]] == report_parts[valid]
+        running_at = np.zeros(len(report_keys), dtype=np.int64)
+        running_at[valid] = running[last[valid]]
+
+        # Baseline = the part's earliest report; later reports add the deliveries since its date
+        first = _starts(report_parts)
+        first_index = np.maximum.accumulate(np.where(first, np.arange(len(first)), 0))
+        self.report_parts = report_parts
+        self.report_ordinals = report_keys & ((1 << DATE_BITS) - 1)
+        self.reported = reported
+        self.baseline = reported[first_index]
+        self.baseline_ordinals = self.report_ordinals[first_index]
+        self.expected = self.baseline + running_at - running_at[first_index]
+        self.difference = reported - self.expected
+        self.checked = ~first
+        self.mismatch = self.checked & (self.difference != 0)
+        report_counts = np.bincount(report_parts, minlength=len(self.parts))
+        self.unverifiable_parts = list(self.parts[report_counts == 1])
+
+    def __len__(self):
+        return len(self.reported)
+
+    def checked_count(self):
+        """Number of reports compared against an expected value (baselines excluded)"""
+        return int(np.count_nonzero(self.checked))
+
+    def mismatch_count(self):
+        return int(np.count_nonzero(self.mismatch))
+
+    def checks(self, mismatches_only=False):
+        """Reports as CumulativeCheck tuples, ordered by part and date"""
+        indices = np.flatnonzero(self.mismatch) if mismatches_only else range(len(self.reported))
+        return [CumulativeCheck(self.parts[self.report_parts[i]], int(self.report_ordinals[i]),
+                                int(self.reported[i]), int(self.expected[i]),
+                                int(self.baseline[i]), int(self.baseline_ordinals[i]), int(self.difference[i]),
+                                MISMATCH if self.mismatch[i] else RECONCILED if self.checked[i] else BASELINE)
+                for i in indices]
+
+    def summary_text(self, limit=20):
+        """Text for the statistics tab"""
+        text = "=== KONTROLA KUMULATIVNÍCH MNOŽSTVÍ ===\n"
+        text += (f"Hlášení: {len(self)}, kontrolovaných proti výchozímu stavu: {self.checked_count()}, "
+                 f"nesouhlasí: {self.mismatch_count()}\n")
+        if self.unverifiable_parts:
+            # Jediné hlášení položky je jen výchozí stav, nemá se s čím porovnat
+            text += f"Neověřitelné položky (jen výchozí stav): {len(self.unverifiable_parts)}\n"
+        for check in self.checks(mismatches_only=True)[:limit]:
+            text += (f"{check.part} {format_ordinal(check.ordinal)}: hlášeno {check.reported:,}, "
+                     f"očekáváno {check.expected:,} = {check.baseline:,} k {format_ordinal(check.baseline_ordinal)} "
+                     f"+ dodávky ({check.difference:+,})\n")
+        if limit is None:
+            for part in self.unverifiable_parts:
+                text += f"{part}: neověřitelné\n"
+        return text
+
+
+def main(argv=None):
+    # edi_api imports the parser modules, which use this module
+    import edi_api
+
+    arg_parser = argparse.ArgumentParser(description="Kontrola kumulativních množství Cummins (QTY+3)")
+    arg_parser.add_argument('files', nargs='+', help="EDI soubory Cummins")
+    arg_parser.add_argument('--no-cache', action='store_true', help="nepoužívat cache výsledků")
+    args = arg_parser.parse_args(argv)
+
+    mismatches = 0
+    for filepath in args.files:
+        parser = edi_api.parse_file(filepath, file_type='cummins', use_cache=not args.no_cache)
+        reconciliation = CumulativeReconciliation(parser)
+        mismatches += reconciliation.mismatch_count()
+        print(f"--- {filepath}")
+        print(reconciliation.summary_text(limit=None), end='')
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import tkinter as tk
+from tkinter import ttk
+
+from edi_records import DeliveryStore
+
+
+class DeliveryViewMixin:
+    """Sortable and filterable delivery Treeview shared by the parser windows
+
+    The parser sets ``delivery_columns`` as ``(name, field, kind)`` tuples (see
+    ``DeliveryStore``) and ``default_sort_column`` in its ``setup_delivery_tab``,
+    and calls ``setup_delivery_filter`` and ``bind_delivery_headings`` from there.
+    """
+
+    delivery_columns = ()
+    default_sort_column = None
+
+    def setup_delivery_filter(self, parent):
+        """Filtrovací řádek nad tabulkou dodávek"""
+        self.delivery_store = None
+        self.sort_column = None
+        self.sort_descending = False
+        self._filter_job = None
+
+        filter_frame = ttk.Frame(parent)
+        filter_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(filter_frame, text="Filtr:").pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_var = tk.StringVar()
+        filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var, width=40)
+        filter_entry.pack(side=tk.LEFT)
+        ttk.Button(filter_frame, text="Zrušit filtr",
+                   command=lambda: self.filter_var.set('')).pack(side=tk.LEFT, padx=(5, 0))
+        self.delivery_count_label = ttk.Label(filter_frame, text="")
+        self.delivery_count_label.pack(side=tk.RIGHT)
+        self.filter_var.trace_add('write', self._schedule_filter)
+
+    def bind_delivery_headings(self):
+        """Make every column heading of the delivery tree clickable"""
+        for name, _, _ in self.delivery_columns:
+            self.delivery_tree.heading(name, text=name,
+                                       command=lambda col=name: self.sort_by_column(col))
+
+    def populate_delivery_tree(self, deliveries):
+        """Build the record store and insert every row once, keyed by its index"""
+        # A result restored from the session cache brings its record store along
+        store = self.session_extras.get('delivery_store')
+        if store is None:
+            store = DeliveryStore(deliveries, self.delivery_columns)
+            self.session_extras['delivery_store'] = store
+        self.delivery_store = store
+        self.sort_column = self.default_sort_column
+        self.sort_descending = False
+
+        self.delivery_tree.delete(*self.delivery_tree.get_children())
+        for idx, row in enumerate(self.delivery_store.rows):
+            self.delivery_tree.insert('', tk.END, iid=str(idx), values=row)
+        self.refresh_delivery_view()
+
+    def sort_by_column(self, column):
+        """Sort by column; clicking the same heading again reverses the order"""
+        if self.delivery_store is None:
+            return
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.refresh_delivery_view()
+
+    def _schedule_filter(self, *args):
+        # Debounce typing so large tables are not re-filtered on every key press
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(200, self.refresh_delivery_view)
+
+    def refresh_delivery_view(self):
+        """Re-attach the tree rows in the current sort order and filter"""
+        self._filter_job = None
+        store = self.delivery_store
+        if store is None:
+            return
+        indices = store.view(self.sort_column, self.sort_descending, self.filter_var.get())
+        # One Tcl call replaces the visible rows; filtered-out rows stay detached
+        self.delivery_tree.set_children('', *[str(i) for i in indices])
+
+        for name, _, _ in self.delivery_columns:
+            arrow = ''
+            if name == self.sort_column:
+                arrow = ' ▼' if self.sort_descending else ' ▲'
+            self.delivery_tree.heading(name, text=name + arrow)
+        self.delivery_count_label.configure(text=f"Zobrazeno {len(indices)} z {len(store)}")
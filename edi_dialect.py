@@ -0,0 +1,517 @@
+"""Declarative DELFOR dialects and the segment loop shared by all parsers
+
+A dialect is declared as data: which element (and component) of which segment
+goes into which header field, which NAD roles fill which partner fields, and
+one repeating segment group that yields a delivery record. Segments are keyed
+by tag ('BGM') or by tag and qualifier ('QTY+113', 'DTM+63'). The declaration
+is compiled into a dispatch table for each run; ``Dialect.run`` then walks the
+segment list a single time. Within a group the member segments may come in any order;
+the group ends at the next trigger, at a repeated member or at any other
+segment, and its record is kept when all required fields were found. Fields
+declared as group stamps (the part of the current LIN) are copied into every
+record started after their segment.
+
+The loop works on raw ``bytes`` segments: tags, qualifiers and separators are
+compared as bytes and only the element values stored in a field are decoded
+(with the run's ``decode``, see edi_charset). Converter arguments are decoded
+only when the converter is actually called.
+
+Record values are dictionary-encoded: each field caches its value by the raw
+element bytes, and each record column has a ValueDictionary that interns its
+values. Rows share one string per distinct part, date, unit or SCC, and the
+dictionaries give small integer codes for grouping and sorting.
+
+Segments that need procedural handling (Cummins) are declared as hooks: core
+methods called as ``method(run, parts)`` with decoded ``str`` parts, with
+``run`` carrying their state.
+
+A run can carry a Selection (record filter and field projection). Segments of
+a line item whose part is not selected, or of a schedule whose SCC is not
+selected, are skipped before they are split or decoded; unprojected fields
+are not compiled and hooks or parties that only feed them are left out of the
+dispatch table.
+"""
+import datetime
+from collections import namedtuple
+from operator import itemgetter
+
+from edi_calendar import parse_date_ordinal
+
+# Prvek (element) segmentu, případně složka (component) nebo n-tice složek;
+# convert je název metody jádra, které se hodnoty předají jako argumenty
+Field = namedtuple('Field', 'name element component convert', defaults=(None, None))
+# Segment se zpracuje jen při min_elements prvcích a min_components složkách prvku 1
+Segment = namedtuple('Segment', 'key fields min_elements min_components constants',
+                     defaults=((), 0, 0, None))
+Party = namedtuple('Party', 'role field header_field', defaults=(None,))
+# stamps: pole záznamu převzatá z posledního segmentu daného klíče, n-tice (klíč, Field)
+Group = namedtuple('Group', 'trigger members required stamps', defaults=((),))
+
+HEADER, PARTY, TRIGGER, MEMBER, HOOK = range(5)
+
+# Společné deklarace
+UNB = Segment('UNB', (Field('Odesílatel', 2),
+                      Field('Příjemce_kód', 3),
+                      Field('Datum/Čas', 4, None, 'parse_edi_datetime')), min_elements=5)
+BGM = Segment('BGM', (Field('Číslo zprávy', 2),), min_elements=3)
+
+# Minebea a TRWKOB: plánované množství v bloku QTY+113, SCC, DTM+63 (do), DTM+64 (od)
+PLANNED_HEADER = (
+    UNB,
+    BGM,
+    Segment('LIN', (Field('Číslo položky', 3),), min_elements=4),
+    Segment('PIA', (Field('Kód produktu', 2),), min_elements=3),
+)
+PLANNED_GROUP = Group(
+    trigger=Segment('QTY+113', (Field('Množství', 1, 1), Field('Jednotka', 1, 2)),
+                    min_elements=2, min_components=3, constants={'Typ': 'Plánované množství'}),
+    members=(
+        Segment('SCC', (Field('SCC', 1),), min_elements=2),
+        Segment('DTM+63', (Field('Datum do', 1, (1, 2), 'parse_date'),), min_elements=2, min_components=3),
+        Segment('DTM+64', (Field('Datum od', 1, (1, 2), 'parse_date'),), min_elements=2, min_components=3),
+    ),
+    required=('Množství', 'Datum od'),
+    # Každý záznam nese položku své LIN, ne poslední LIN souboru
+    stamps=(('LIN', Field('Položka', 3, 0)),),
+)
+PLANNED_PARTIES = (
+    Party('BY', 'Kupující'),
+    Party('SE', 'Prodávající', 'Příjemce'),
+    Party('CN', 'Dodací adresa'),
+)
+
+
+class ValueDictionary:
+    """Distinct values of one record column, each with a small integer code
+
+    ``intern`` returns the stored object for a value seen before, so records
+    share one string per distinct value.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def intern(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            self._codes[value] = len(self.values)
+            self.values.append(value)
+            return value
+        return self.values[code]
+
+    def code(self, value, default=-1):
+        return self._codes.get(value, default)
+
+    def encode(self, records, column):
+        """Code of the column value of every record; -1 where a record has no value"""
+        codes = self._codes.get
+        return [codes(record.get(column), -1) for record in records]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self._codes
+
+
+def build_dictionaries(records):
+    """Per-column dictionaries of existing records (e.g. restored from the cache), interning their values"""
+    dictionaries = {}
+    for record in records:
+        for column, value in record.items():
+            dictionary = dictionaries.get(column)
+            if dictionary is None:
+                dictionary = dictionaries[column] = ValueDictionary()
+            record[column] = dictionary.intern(value)
+    return dictionaries
+
+
+def _date_ordinal(value):
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    ordinal = parse_date_ordinal(value)
+    if ordinal is None:
+        raise ValueError(f"Neplatné datum: {value} (DD.MM.YYYY)")
+    return ordinal
+
+
+class Selection:
+    """Record filter and field projection pushed down into a parse run
+
+    ``scc`` are SCC codes as written in the file ('1', '4', '10'), ``since``
+    and ``until`` bound the delivery date (inclusive; date ordinals,
+    ``datetime.date`` or 'DD.MM.YYYY'), ``parts`` are part numbers and
+    ``fields`` the record columns to keep. A projected result has only the
+    header segments' fields: partner addresses are not built.
+    """
+
+    def __init__(self, scc=None, since=None, until=None, parts=None, fields=None):
+        self.scc = frozenset(scc) if scc else None
+        self.since = _date_ordinal(since)
+        self.until = _date_ordinal(until)
+        self.parts = frozenset(part.strip() for part in parts) if parts else None
+        self.fields = tuple(fields) if fields else None
+
+    @property
+    def dated(self):
+        return self.since is not None or self.until is not None
+
+    def accepts_part(self, part):
+        # LIN bez kvalifikátoru: '7571422:IN' se porovnává i jako '7571422'
+        return self.parts is None or part in self.parts or part.split(':', 1)[0] in self.parts
+
+    def accepts_scc(self, code):
+        return self.scc is None or code in self.scc
+
+    def accepts_date(self, value):
+        if not self.dated:
+            return True
+        ordinal = parse_date_ordinal(value)
+        return (ordinal is not None and (self.since is None or ordinal >= self.since)
+                and (self.until is None or ordinal <= self.until))
+
+    def needs(self, *fields):
+        """True when any of the fields is projected (always without a projection)"""
+        return self.fields is None or any(field in self.fields for field in fields)
+
+    def project(self, record):
+        return {name: record[name] for name in self.fields if name in record}
+
+    def __repr__(self):
+        return (f"Selection(scc={sorted(self.scc) if self.scc else None}, since={self.since}, "
+                f"until={self.until}, parts={sorted(self.parts) if self.parts else None}, fields={self.fields})")
+
+
+class ParseRun:
+    """State of one run over a file; hooks keep their own attributes here
+
+    ``convert`` memoizes converter calls for the run, so repeated dates are
+    decoded and parsed once per file. ``dictionaries`` holds a ValueDictionary
+    per record column; record values are interned in them.
+
+    With a ``selection``, ``skip`` holds the segment keys the loop ignores
+    (set by ``select_line`` and ``select_schedule``) and ``emit`` applies the
+    projection to records added by hooks.
+    """
+
+    def __init__(self, core, decode, selection=None, line_keys=(), schedule_keys=()):
+        self.core = core
+        self.decode = decode
+        self.dictionaries = {}
+        self._converted = {}
+        self.selection = selection
+        # Pole razítkovaná do dalších záznamů skupiny (Group.stamps)
+        self.stamp = {}
+        self.skip = set()
+        self._line_keys = frozenset(key.encode('ascii') for key in line_keys)
+        self._schedule_keys = frozenset(key.encode('ascii') for key in schedule_keys)
+        if selection is None or selection.fields is None:
+            self.emit = core.delivery_schedules.append
+        else:
+            append, project = core.delivery_schedules.append, selection.project
+            self.emit = lambda record: append(project(record))
+
+    def convert(self, name, *args):
+        key = (name,) + args
+        try:
+            return self._converted[key]
+        except KeyError:
+            decode = self.decode
+            values = [decode(arg) if isinstance(arg, bytes) else arg for arg in args]
+            value = self._converted[key] = getattr(self.core, name)(*values)
+            return value
+
+    def dictionary(self, column):
+        dictionary = self.dictionaries.get(column)
+        if dictionary is None:
+            dictionary = self.dictionaries[column] = ValueDictionary()
+        return dictionary
+
+    def intern(self, column, value):
+        return self.dictionary(column).intern(value)
+
+    def select_line(self, part):
+        """Start a line item: its segments are skipped unless the part is selected"""
+        if self.selection is not None:
+            self.skip.clear()
+            if not self.selection.accepts_part(part):
+                self.skip.update(self._line_keys)
+
+    def select_schedule(self, scc):
+        """Start an SCC schedule: its quantities and dates are skipped unless the SCC is selected"""
+        if self.selection is not None:
+            self.skip.difference_update(self._schedule_keys)
+            if not self.selection.accepts_scc(scc):
+                self.skip.update(self._schedule_keys)
+
+    def accepts_date(self, value):
+        return self.selection is None or self.selection.accepts_date(value)
+
+
+def _compile_field(field, run, dictionary=None):
+    """Function parts -> value of one declared field
+
+    Values are cached by the raw element bytes for the run, so a repeated
+    element is split, decoded and converted once and every record gets the
+    same object; with a dictionary the value is interned in it as well.
+    """
+    element, component, converter = field.element, field.component, field.convert
+    decode, convert = run.decode, run.convert
+    if component is None:
+        def compute(raw):
+            return convert(converter, raw) if converter else decode(raw)
+    else:
+        indexes = component if isinstance(component, tuple) else (component,)
+        width = max(indexes) + 1
+        pick = itemgetter(*indexes)
+
+        def compute(raw):
+            components = raw.split(b':')
+            if len(components) < width:
+                components += [b''] * (width - len(components))
+            if converter:
+                args = pick(components)
+                return convert(converter, *args) if len(indexes) > 1 else convert(converter, args)
+            if len(indexes) > 1:
+                return tuple(map(decode, pick(components)))
+            return decode(pick(components))
+
+    intern = dictionary.intern if dictionary is not None else None
+    cache = {}
+
+    def get(parts):
+        raw = parts[element] if element < len(parts) else b''
+        value = cache.get(raw)
+        if value is None:
+            value = compute(raw)
+            if intern is not None:
+                value = intern(value)
+            cache[raw] = value
+        return value
+    return get
+
+
+def _compile_segment(rule, run, record_fields=False, needed=None):
+    """Function filling a target dict from the parts of a matching segment
+
+    With ``needed`` only those fields (and constants) are filled.
+    """
+    getters = tuple((field.name, _compile_field(field, run, run.dictionary(field.name) if record_fields else None))
+                    for field in rule.fields if needed is None or field.name in needed)
+    min_elements = rule.min_elements
+    min_components = rule.min_components
+    constants = rule.constants
+    if constants and needed is not None:
+        constants = {name: value for name, value in constants.items() if name in needed}
+    if constants and record_fields:
+        constants = {name: run.intern(name, value) for name, value in constants.items()}
+
+    def apply(parts, target):
+        if len(parts) < min_elements:
+            return
+        if min_components and parts[1].count(b':') + 1 < min_components:
+            return
+        for name, get in getters:
+            target[name] = get(parts)
+        if constants:
+            target.update(constants)
+
+    return apply
+
+
+def _compile_stamp(field, run, header_handler=None):
+    """Header handler that also keeps the field in ``run.stamp`` for the records that follow"""
+    get = _compile_field(field, run, run.dictionary(field.name))
+    stamp = run.stamp
+    name = field.name
+
+    def apply(parts, header):
+        if header_handler is not None:
+            header_handler(parts, header)
+        stamp[name] = get(parts)
+
+    return apply
+
+
+def _compile_party(party, run, code_fallback, match_recipient_code):
+    """Function storing a NAD segment of one role as a partner (and header) field"""
+    decode = run.decode
+
+    def apply(parts, header, partners):
+        if len(parts) < 3:
+            return
+        code = decode(parts[2])
+        name = decode(parts[4]) if len(parts) > 4 else ''
+        if code_fallback and not name:
+            name = code
+        address = ', '.join(decode(part) for part in parts[5:] if part)
+        partners[party.field] = f"{name}, {address}" if address else name
+        if party.header_field and (not match_recipient_code or code == header.get('Příjemce_kód', '')):
+            header[party.header_field] = name
+
+    return apply
+
+
+class Dialect:
+    """Declared grammar of one customer's DELFOR messages
+
+    ``party_code_fallback`` uses the NAD party code when the name is empty;
+    ``match_recipient_code`` fills the header recipient only from the NAD
+    whose code matches the UNB recipient. ``start`` and ``finish`` name core
+    methods called with the run before and after the segment loop.
+
+    For selections: ``part_field`` is the record field (a group stamp) holding
+    the part of the current line item; ``line_keys`` and ``schedule_keys`` are the segments
+    skipped for an unselected line item or SCC (by default the group);
+    ``projected_hooks`` maps a hook key to the record fields it alone feeds,
+    so a projection without them drops the hook.
+    """
+
+    def __init__(self, name, header=(), group=None, parties=(), hooks=None,
+                 party_code_fallback=False, match_recipient_code=False, start=None, finish=None,
+                 part_field=None, line_keys=None, schedule_keys=(), projected_hooks=None):
+        self.name = name
+        self.header = tuple(header)
+        self.group = group
+        self.parties = tuple(parties)
+        self.hooks = dict(hooks or {})
+        self.party_code_fallback = party_code_fallback
+        self.match_recipient_code = match_recipient_code
+        self.start = start
+        self.finish = finish
+        self.part_field = part_field
+        if line_keys is None:
+            line_keys = (group.trigger.key,) + tuple(rule.key for rule in group.members) if group else ()
+        self.line_keys = tuple(line_keys)
+        self.schedule_keys = tuple(schedule_keys)
+        self.projected_hooks = dict(projected_hooks or {})
+
+    def needed_fields(self, selection, date_field):
+        """Record fields to build for a selection: projected, required and filtered ones (None = all)"""
+        if selection is None or selection.fields is None:
+            return None
+        needed = set(selection.fields)
+        if self.group is not None:
+            needed.update(self.group.required)
+        if selection.scc is not None:
+            needed.add('SCC')
+        if selection.dated:
+            needed.add(date_field)
+        return needed
+
+    def compile(self, run):
+        """Dispatch table {segment key (bytes): (action, payload)} bound to a run, and the set of qualified tags
+
+        Handlers keep per-run value caches, so the table is built for every run.
+        """
+        selection = run.selection
+        needed = self.needed_fields(selection, run.core.date_field)
+        table = {}
+        for rule in self.header:
+            table[rule.key] = (HEADER, _compile_segment(rule, run))
+        if self.group is not None:
+            for key, field in self.group.stamps:
+                table[key] = (HEADER, _compile_stamp(field, run, table.get(key, (HEADER, None))[1]))
+        if needed is None:
+            for party in self.parties:
+                table[f"NAD+{party.role}"] = (PARTY, _compile_party(
+                    party, run, self.party_code_fallback, self.match_recipient_code))
+        if self.group is not None:
+            # Členy bez potřebných polí zůstávají v tabulce, jinak by ukončily skupinu
+            table[self.group.trigger.key] = (TRIGGER, _compile_segment(self.group.trigger, run, True, needed))
+            for rule in self.group.members:
+                table[rule.key] = (MEMBER, _compile_segment(rule, run, True, needed))
+        for key, method in self.hooks.items():
+            fields = self.projected_hooks.get(key)
+            if fields is not None and selection is not None and not selection.needs(*fields):
+                continue
+            table[key] = (HOOK, method)
+        table = {key.encode('ascii'): entry for key, entry in table.items()}
+        return table, frozenset(key[:3] for key in table if len(key) > 3)
+
+    def run(self, core, segments, decode):
+        """Fill core.header_info, partner_info and delivery_schedules from bytes segments
+
+        ``decode`` turns a kept element value (bytes) into str.
+        """
+        selection = core.selection
+        run = ParseRun(core, decode, selection, self.line_keys, self.schedule_keys)
+        table, qualified = self.compile(run)
+        header = core.header_info
+        partners = core.partner_info
+        hooks = {method: getattr(core, method) for method in self.hooks.values()}
+        required = self.group.required if self.group is not None else ()
+        emit = self._group_emit(run, core.date_field)
+        skip = run.skip
+        stamp = run.stamp
+        part_keys = frozenset()
+        if selection is not None and selection.parts is not None and self.part_field and self.group:
+            part_keys = frozenset(key.encode('ascii') for key, field in self.group.stamps
+                                  if field.name == self.part_field)
+        if self.start:
+            getattr(core, self.start)(run)
+
+        record = None
+        seen = set()
+        for segment in segments:
+            tag = segment[:3]
+            parts = None
+            key = tag
+            if tag in qualified:
+                parts = segment.split(b'+')
+                if len(parts) > 1:
+                    key = tag + b'+' + parts[1].split(b':', 1)[0]
+                    if key not in table:
+                        key = tag
+            entry = None if skip and key in skip else table.get(key)
+
+            if record is not None:
+                if entry is not None and entry[0] == MEMBER and key not in seen:
+                    seen.add(key)
+                    entry[1](parts or segment.split(b'+'), record)
+                    continue
+                # Konec skupiny: záznam se uloží, jen pokud má povinná pole
+                if all(name in record for name in required):
+                    emit(record)
+                record = None
+            if entry is None:
+                continue
+
+            action, handler = entry
+            if action == HOOK:
+                hooks[handler](run, decode(segment).split('+'))
+                continue
+            if parts is None:
+                parts = segment.split(b'+')
+            if action == HEADER:
+                handler(parts, header)
+                if key in part_keys:
+                    run.select_line(stamp.get(self.part_field, ''))
+            elif action == PARTY:
+                handler(parts, header, partners)
+            elif action == TRIGGER:
+                record = stamp.copy()
+                seen.clear()
+                handler(parts, record)
+
+        if record is not None and all(name in record for name in required):
+            emit(record)
+        if self.finish:
+            getattr(core, self.finish)(run)
+        return run
+
+    @staticmethod
+    def _group_emit(run, date_field):
+        """Function storing a finished group record, checking SCC and date of a selection first"""
+        selection = run.selection
+        if selection is None or (selection.scc is None and not selection.dated):
+            return run.emit
+        accepts_scc, accepts_date, emit = selection.accepts_scc, selection.accepts_date, run.emit
+
+        def keep(record):
+            if accepts_scc(record.get('SCC', '')) and accepts_date(record.get(date_field, '')):
+                emit(record)
+        return keep
@@ -0,0 +1,301 @@
+"""Release-to-release comparison of two parsed DELFOR schedules
+
+    python edi_diff.py STARÝ.edi NOVÝ.edi [--xlsx VÝSTUP.xlsx] [--csv VÝSTUP.csv]
+"""
+import argparse
+import csv
+import sys
+import tkinter as tk
+from collections import namedtuple
+from datetime import datetime
+from operator import itemgetter
+from tkinter import ttk, filedialog, messagebox
+
+import numpy as np
+import openpyxl
+
+import edi_api
+from edi_calendar import bucket, format_ordinal, iso_week, ordinal_date, parse_date_ordinal
+
+# Řádky, které nejsou poptávkou (kumulativní a min/max hodnoty), se neporovnávají
+EXCLUDED_TYPES = {'Kumulativní', 'Maximální', 'Minimální'}
+CHANGE_LABELS = {
+    'added': 'Nový',
+    'removed': 'Odebraný',
+    'changed': 'Změna množství',
+}
+NO_DATE = -1
+DIFF_HEADERS = ["Položka", "Datum", "Týden", "SCC", "Změna", "Původní množství", "Nové množství", "Rozdíl"]
+WEEK_HEADERS = ["Rok", "Týden", "Původní množství", "Nové množství", "Rozdíl"]
+
+DiffRow = namedtuple('DiffRow', 'part ordinal scc change old_qty new_qty delta')
+WeekDelta = namedtuple('WeekDelta', 'year week old_qty new_qty delta')
+
+
+def _quantity(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        try:
+            return float(str(value).strip().strip("'"))
+        except (ValueError, TypeError):
+            return 0
+
+
+def schedule_index(parser):
+    """Hash index (part, date ordinal, SCC) -> summed quantity, plus totals per date ordinal"""
+    date_field = parser.date_field
+    ordinals = {}
+    index = {}
+    index_get = index.get
+    for delivery in parser.delivery_schedules:
+        get = delivery.get
+        if get('Typ') in EXCLUDED_TYPES:
+            continue
+        date_str = get(date_field, '')
+        try:
+            ordinal = ordinals[date_str]
+        except KeyError:
+            ordinal = parse_date_ordinal(date_str)
+            ordinal = ordinals[date_str] = NO_DATE if ordinal is None else ordinal
+        qty = get('Množství')
+        try:
+            qty = int(qty)
+        except (ValueError, TypeError):
+            qty = _quantity(qty)
+        key = (get('Položka', ''), ordinal, get('SCC', ''))
+        index[key] = index_get(key, 0) + qty
+    return index
+
+
+class ScheduleDiff:
+    """Added, removed and quantity-changed rows between two releases
+
+    Both results are hash-indexed on (part, delivery date, SCC) and joined in
+    O(n); quantities of duplicate keys are summed.
+    """
+
+    def __init__(self, old, new):
+        if old.file_type != new.file_type:
+            raise ValueError(f"Nelze porovnat různé typy souborů: {old.file_type} a {new.file_type}")
+        self.old = old
+        self.new = new
+        self.file_type = new.file_type
+        old_index = schedule_index(old)
+        new_index = schedule_index(new)
+
+        rows = []
+        append = rows.append
+        new_get = new_index.get
+        for key, old_qty in old_index.items():
+            new_qty = new_get(key)
+            if new_qty is None:
+                append(DiffRow(key[0], key[1], key[2], 'removed', old_qty, 0, -old_qty))
+            elif new_qty != old_qty:
+                append(DiffRow(key[0], key[1], key[2], 'changed', old_qty, new_qty, new_qty - old_qty))
+        for key in new_index.keys() - old_index.keys():
+            new_qty = new_index[key]
+            append(DiffRow(key[0], key[1], key[2], 'added', 0, new_qty, new_qty))
+        # Flat (part, date, SCC) key; cheaper than comparing nested tuples
+        rows.sort(key=itemgetter(0, 1, 2))
+        self.rows = rows
+        self.weekly = self._weekly_totals(old_index, new_index)
+
+    @staticmethod
+    def _weekly_totals(old_index, new_index):
+        totals = {}
+        for position, index in ((0, old_index), (1, new_index)):
+            # Sum per date first; there are far fewer dates than rows
+            per_date = {}
+            per_date_get = per_date.get
+            for key, qty in index.items():
+                ordinal = key[1]
+                per_date[ordinal] = per_date_get(ordinal, 0) + qty
+            # Bucket all dates into ISO weeks at once
+            iso_years, iso_weeks, _ = bucket(np.fromiter(per_date, dtype=np.int64, count=len(per_date)))
+            for week, qty in zip(zip(iso_years.tolist(), iso_weeks.tolist()), per_date.values()):
+                sums = totals.get(week)
+                if sums is None:
+                    sums = totals[week] = [0, 0]
+                sums[position] += qty
+        return [WeekDelta(year, week, old_qty, new_qty, new_qty - old_qty)
+                for (year, week), (old_qty, new_qty) in sorted(totals.items())]
+
+    def counts(self):
+        """Number of rows per change type"""
+        result = {change: 0 for change in CHANGE_LABELS}
+        for row in self.rows:
+            result[row.change] += 1
+        return result
+
+    def scc_label(self, scc):
+        return self.new.get_scc_description(scc)
+
+    @staticmethod
+    def week_of(ordinal):
+        return iso_week(ordinal)
+
+    def display_rows(self):
+        """Rows as tuples of display values (Položka, Datum, Týden, SCC, Změna, ...)"""
+        return [(row.part, format_ordinal(row.ordinal), self.week_of(row.ordinal),
+                 self.scc_label(row.scc), CHANGE_LABELS[row.change],
+                 row.old_qty, row.new_qty, row.delta) for row in self.rows]
+
+    def summary_text(self):
+        counts = self.counts()
+        return (f"Nové: {counts['added']}, odebrané: {counts['removed']}, "
+                f"změněné: {counts['changed']}, "
+                f"rozdíl celkem: {sum(week.delta for week in self.weekly):,}")
+
+    def to_csv(self, path, weekly_path=None):
+        """Write the changed rows (and optionally the weekly deltas) as CSV for Excel"""
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(DIFF_HEADERS)
+            writer.writerows(self.display_rows())
+        if weekly_path:
+            with open(weekly_path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(WEEK_HEADERS)
+                writer.writerows(self.weekly)
+
+    def build_workbook(self):
+        """Workbook with the changed rows and the weekly deltas (write-only for speed)"""
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Změny")
+        ws.append(DIFF_HEADERS)
+        for row in self.rows:
+            ws.append([
+                row.part,
+                None if row.ordinal == NO_DATE else ordinal_date(row.ordinal),
+                self.week_of(row.ordinal),
+                self.scc_label(row.scc),
+                CHANGE_LABELS[row.change],
+                row.old_qty,
+                row.new_qty,
+                row.delta,
+            ])
+        ws_weeks = wb.create_sheet("Týdny")
+        ws_weeks.append(WEEK_HEADERS)
+        for week in self.weekly:
+            ws_weeks.append(list(week))
+        return wb
+
+
+def diff_results(old, new):
+    """Compare two parsed results of the same dialect"""
+    return ScheduleDiff(old, new)
+
+
+def diff_files(old_path, new_path, use_cache=True):
+    """Parse two files and compare them"""
+    return ScheduleDiff(edi_api.parse_file(old_path, use_cache=use_cache),
+                        edi_api.parse_file(new_path, use_cache=use_cache))
+
+
+class EDIDiffWindow:
+    """Okno s porovnáním dvou verzí plánu dodávek"""
+
+    def __init__(self, master, schedule_diff):
+        self.diff = schedule_diff
+        self.window = tk.Toplevel(master)
+        self.window.title(f"Porovnání verzí - {schedule_diff.file_type}")
+        self.window.geometry("1000x700")
+        self.setup_ui()
+
+    def setup_ui(self):
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Button(btn_frame, text="📊 Export do Excelu", command=self.export_to_excel,
+                   style='Excel.TButton').pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="Export do CSV", command=self.export_to_csv).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(btn_frame, text=self.diff.summary_text()).pack(side=tk.RIGHT)
+
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        changes_frame = ttk.Frame(notebook)
+        notebook.add(changes_frame, text="Změny")
+        weeks_frame = ttk.Frame(notebook)
+        notebook.add(weeks_frame, text="Týdny")
+
+        self.changes_tree = self._make_tree(changes_frame, DIFF_HEADERS)
+        for values in self.diff.display_rows():
+            self.changes_tree.insert('', tk.END, values=values)
+        weeks_tree = self._make_tree(weeks_frame, WEEK_HEADERS)
+        for week in self.diff.weekly:
+            weeks_tree.insert('', tk.END, values=tuple(week))
+
+    def _make_tree(self, parent, columns):
+        tree_frame = ttk.Frame(parent)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=15)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        v_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=v_scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        return tree
+
+    def export_to_excel(self):
+        filename = f"porovnani_{self.diff.file_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        filepath = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            initialfile=filename
+        )
+        if not filepath:
+            return
+        try:
+            self.diff.build_workbook().save(filepath)
+            messagebox.showinfo("Hotovo", f"Porovnání bylo exportováno do souboru:\n{filepath}", parent=self.window)
+        except Exception as e:
+            messagebox.showerror("Chyba", f"Při exportu došlo k chybě: {str(e)}", parent=self.window)
+
+    def export_to_csv(self):
+        filename = f"porovnani_{self.diff.file_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        filepath = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            initialfile=filename
+        )
+        if not filepath:
+            return
+        try:
+            weekly_path = filepath[:-4] + "_tydny.csv" if filepath.lower().endswith('.csv') else filepath + "_tydny.csv"
+            self.diff.to_csv(filepath, weekly_path)
+            messagebox.showinfo("Hotovo", f"Porovnání bylo exportováno do souboru:\n{filepath}", parent=self.window)
+        except Exception as e:
+            messagebox.showerror("Chyba", f"Při exportu došlo k chybě: {str(e)}", parent=self.window)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Porovnání dvou verzí DELFOR")
+    arg_parser.add_argument('old', help="starší soubor")
+    arg_parser.add_argument('new', help="novější soubor")
+    arg_parser.add_argument('--xlsx', help="export změn do Excelu")
+    arg_parser.add_argument('--csv', help="export změn do CSV (týdny do *_tydny.csv)")
+    arg_parser.add_argument('--no-cache', action='store_true', help="nepoužívat cache výsledků")
+    args = arg_parser.parse_args(argv)
+
+    schedule_diff = diff_files(args.old, args.new, use_cache=not args.no_cache)
+    print(schedule_diff.summary_text())
+    for week in schedule_diff.weekly:
+        if week.delta:
+            print(f"{week.year}-W{week.week:02d}: {week.old_qty:,} -> {week.new_qty:,} ({week.delta:+,})")
+    if args.xlsx:
+        schedule_diff.build_workbook().save(args.xlsx)
+    if args.csv:
+        base = args.csv[:-4] if args.csv.lower().endswith('.csv') else args.csv
+        schedule_diff.to_csv(args.csv, base + "_tydny.csv")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
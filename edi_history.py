@@ -0,0 +1,212 @@
+"""Optional SQLite history of parsed DELFOR releases
+
+    python edi_history.py import SOUBOR.edi [...] [--db CESTA]
+    python edi_history.py query --partner cummins --part 1234567 [--months 6] [--db CESTA]
+
+Every imported file becomes one row in ``files`` and its deliveries are bulk
+inserted into ``deliveries`` with ``executemany`` inside a single transaction.
+Re-importing the same content replaces the earlier rows, so the watcher and
+the batch CLI can record files repeatedly without duplicates.
+
+The data version is kept in ``PRAGMA user_version``, stamped when the
+database is created.
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import time
+
+import edi_api
+import edi_cache
+from edi_calendar import format_ordinal, parse_date_ordinal
+from edi_input import open_input
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    source_hash TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    partner TEXT NOT NULL,
+    sender TEXT,
+    message_number TEXT,
+    release_ordinal INTEGER,
+    rows INTEGER NOT NULL,
+    imported_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    partner TEXT NOT NULL,
+    part TEXT NOT NULL,
+    date_ordinal INTEGER,
+    quantity REAL,
+    scc TEXT,
+    type TEXT,
+    release TEXT
+);
+CREATE INDEX IF NOT EXISTS deliveries_partner_part_date ON deliveries (partner, part, date_ordinal);
+CREATE INDEX IF NOT EXISTS deliveries_file ON deliveries (file_id);
+CREATE INDEX IF NOT EXISTS files_partner_release ON files (partner, release_ordinal);
+"""
+
+# Přibližná délka měsíce pro dotazy typu "posledních N měsíců"
+DAYS_PER_MONTH = 30.44
+# Verze dat (PRAGMA user_version)
+DATA_VERSION = 1
+
+
+def default_history_path():
+    """Database path from EDI_PARSER_HISTORY_DB or next to the parsed-result cache"""
+    configured = os.environ.get('EDI_PARSER_HISTORY_DB')
+    if configured:
+        return configured
+    return os.path.join(os.path.dirname(edi_cache.default_cache_dir()), 'edi_history.sqlite')
+
+
+def _quantity(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class HistoryStore:
+    """Append-only store of delivery schedules across releases"""
+
+    def __init__(self, path=None):
+        self.path = path or default_history_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+        if not self.connection.execute('PRAGMA user_version').fetchone()[0]:
+            self.connection.execute(f'PRAGMA user_version = {DATA_VERSION}')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def delivery_rows(self, parser, file_id):
+        """Rows for the deliveries table; Max/Min stock levels are not demand"""
+        partner = parser.file_type
+        date_field = parser.date_field
+        part_number = parser.part_number
+        release_number = parser.release_number
+        date_ordinals = {}
+        rows = []
+        for delivery in parser.delivery_schedules:
+            if delivery.get('Typ') in ('Maximální', 'Minimální'):
+                continue
+            date_str = delivery.get(date_field, '')
+            ordinal = date_ordinals.get(date_str)
+            if ordinal is None and date_str not in date_ordinals:
+                ordinal = date_ordinals[date_str] = parse_date_ordinal(date_str)
+            rows.append((file_id, partner, part_number(delivery), ordinal,
+                         _quantity(delivery.get('Množství')), delivery.get('SCC', ''),
+                         delivery.get('Typ', ''), release_number(delivery)))
+        return rows
+
+    def record(self, parser, source_hash):
+        """Store one parsed file in a single transaction; returns the number of deliveries"""
+        release_ordinal = parse_date_ordinal(parser.release_date())
+        with self.connection:
+            self.connection.execute('DELETE FROM files WHERE source_hash = ?', (source_hash,))
+            cursor = self.connection.execute(
+                'INSERT INTO files (source_hash, path, partner, sender, message_number, '
+                'release_ordinal, rows, imported_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?)',
+                (source_hash, os.path.abspath(parser.filepath or ''), parser.file_type,
+                 parser.header_info.get('Odesílatel', ''), parser.header_info.get('Číslo zprávy', ''),
+                 release_ordinal, datetime.datetime.now().isoformat(timespec='seconds')))
+            file_id = cursor.lastrowid
+            rows = self.delivery_rows(parser, file_id)
+            self.connection.executemany('INSERT INTO deliveries VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.connection.execute('UPDATE files SET rows = ? WHERE id = ?', (len(rows), file_id))
+        return len(rows)
+
+    def import_file(self, filepath, use_cache=True):
+        """Parse a file and record it; returns (parser, number of deliveries)"""
+        with open_input(filepath) as source:
+            source_hash = source.content_hash()
+        parser = edi_api.parse_file(filepath, use_cache=use_cache)
+        return parser, self.record(parser, source_hash)
+
+    def latest_release(self, partner):
+        row = self.connection.execute(
+            'SELECT MAX(release_ordinal) FROM files WHERE partner = ?', (partner,)).fetchone()
+        return row[0]
+
+    def demand(self, partner, part, months=None, since_ordinal=None):
+        """Deliveries of one part across releases
+
+        ``months`` limits the result to releases issued within that many months
+        of the partner's latest release. Rows are (release date ordinal,
+        message number, delivery date ordinal, quantity, SCC, type), ordered by
+        release and delivery date.
+        """
+        if months is not None and since_ordinal is None:
+            latest = self.latest_release(partner)
+            if latest is not None:
+                since_ordinal = latest - int(months * DAYS_PER_MONTH)
+        sql = ('SELECT f.release_ordinal, f.message_number, d.date_ordinal, d.quantity, d.scc, d.type '
+               'FROM deliveries d JOIN files f ON f.id = d.file_id '
+               'WHERE d.partner = ? AND d.part = ?')
+        params = [partner, part]
+        if since_ordinal is not None:
+            sql += ' AND f.release_ordinal >= ?'
+            params.append(since_ordinal)
+        sql += ' ORDER BY f.release_ordinal, d.date_ordinal'
+        return self.connection.execute(sql, params).fetchall()
+
+    def parts(self, partner):
+        return [row[0] for row in self.connection.execute(
+            'SELECT DISTINCT part FROM deliveries WHERE partner = ? ORDER BY part', (partner,))]
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Historie EDI DELFOR v SQLite")
+    arg_parser.add_argument('--db', help="cesta k databázi historie")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="uložit soubory do historie")
+    import_parser.add_argument('files', nargs='+')
+    import_parser.add_argument('--no-cache', action='store_true', help="nepoužívat cache výsledků")
+    query_parser = commands.add_parser('query', help="poptávka po položce napříč releasy")
+    query_parser.add_argument('--partner', required=True, choices=sorted(edi_api.PARSER_CORES))
+    query_parser.add_argument('--part', required=True)
+    query_parser.add_argument('--months', type=float, help="jen releasy za posledních N měsíců")
+    args = arg_parser.parse_args(argv)
+
+    failures = 0
+    with HistoryStore(args.db) as store:
+        if args.command == 'import':
+            for filepath in args.files:
+                start = time.perf_counter()
+                try:
+                    parser, count = store.import_file(filepath, use_cache=not args.no_cache)
+                except Exception as e:
+                    failures += 1
+                    print(f"{filepath}: CHYBA {e}", file=sys.stderr)
+                    continue
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                print(f"{filepath}: {parser.file_type}, {count} dodávek uloženo, {elapsed_ms:.1f} ms")
+        else:
+            start = time.perf_counter()
+            rows = store.demand(args.partner, args.part, months=args.months)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for release_ordinal, message_number, date_ordinal, quantity, scc, delivery_type in rows:
+                print(f"{format_ordinal(release_ordinal)}\t{message_number}\t{format_ordinal(date_ordinal)}\t"
+                      f"{quantity if quantity is not None else ''}\t{scc}\t{delivery_type}")
+            print(f"{len(rows)} řádků, {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
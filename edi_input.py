@@ -0,0 +1,163 @@
+"""Input layer for interchange files: memory maps, plain reads and chunked streams
+
+Small files are read in one go. Regular files of ``MMAP_THRESHOLD`` bytes and
+more are memory-mapped read-only, so their pages come from the OS page cache
+and are not copied into the process. Pipes, file objects and compressed files
+(.gz, .bz2, .xz) are read in ``CHUNK_BYTES`` blocks. Segments are produced
+from fixed-size chunks (``EDIInput.segments``), so parsing keeps one chunk of
+the input resident instead of the whole file.
+"""
+import bz2
+import gzip
+import hashlib
+import lzma
+import mmap
+import os
+import stat
+from itertools import chain
+
+# Soubory od této velikosti se mapují do paměti, menší se načtou najednou
+MMAP_THRESHOLD = 32 * 1024 * 1024
+CHUNK_BYTES = 4 * 1024 * 1024
+# Začátek vstupu pro detekci znakové sady a typu (UNA, UNB)
+HEAD_BYTES = 4096
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+
+class EDIInput:
+    """Raw content of one input: bytes, a read-only memory map or a chunked stream
+
+    ``buffer`` is the random-access content (bytes or mmap) or None for a
+    stream. A stream opened from a path (compressed file) is reopened for each
+    pass; a pipe or file object can be read only once (``reopenable`` False).
+    """
+
+    def __init__(self, buffer=None, stream=None, opener=None, name=None):
+        self.buffer = buffer
+        self.name = name
+        self._stream = stream
+        self._opener = opener
+        # První blok jednorázového proudu přečtený kvůli head()
+        self._pending = None
+        self._content_hash = None
+
+    @property
+    def reopenable(self):
+        return self.buffer is not None or self._opener is not None
+
+    @property
+    def mapped(self):
+        return isinstance(self.buffer, mmap.mmap)
+
+    def head(self):
+        """First HEAD_BYTES bytes of the content"""
+        if self.buffer is not None:
+            return self.buffer[:HEAD_BYTES]
+        if self._opener is not None:
+            with self._opener() as stream:
+                return stream.read(HEAD_BYTES)
+        if self._pending is None:
+            self._pending = self._stream.read(CHUNK_BYTES)
+        return self._pending[:HEAD_BYTES]
+
+    def chunks(self):
+        """Content as consecutive bytes blocks of about CHUNK_BYTES"""
+        if self.buffer is not None:
+            if isinstance(self.buffer, bytes) and len(self.buffer) <= CHUNK_BYTES:
+                yield self.buffer
+                return
+            for start in range(0, len(self.buffer), CHUNK_BYTES):
+                yield self.buffer[start:start + CHUNK_BYTES]
+            return
+        if self._opener is not None:
+            with self._opener() as stream:
+                yield from iter(lambda: stream.read(CHUNK_BYTES), b'')
+            return
+        if self._pending is not None:
+            chunk, self._pending = self._pending, None
+            if chunk:
+                yield chunk
+        yield from iter(lambda: self._stream.read(CHUNK_BYTES), b'')
+
+    def segments(self):
+        """Iterator of stripped, non-empty segments (bytes), split chunk by chunk"""
+        return chain.from_iterable(self._chunk_segments())
+
+    def _chunk_segments(self):
+        rest = b''
+        for chunk in self.chunks():
+            pieces = (rest + chunk if rest else chunk).split(b"'")
+            # Poslední kus může pokračovat v dalším bloku
+            rest = pieces.pop()
+            yield [segment.strip() for segment in pieces if segment.strip()]
+        rest = rest.strip()
+        if rest:
+            yield [rest]
+
+    def read(self):
+        """Whole content as bytes-like (the buffer itself when there is one)"""
+        if self.buffer is not None:
+            return self.buffer
+        return b''.join(self.chunks())
+
+    def content_hash(self):
+        """blake2b digest of the content, as used by the caches and the history"""
+        if self._content_hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            if self.buffer is not None:
+                digest.update(self.buffer)
+            else:
+                for chunk in self.chunks():
+                    digest.update(chunk)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def close(self):
+        if self.mapped:
+            self.buffer.close()
+        self.buffer = None
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_input(source, mmap_threshold=None):
+    """EDIInput for a path or a binary file object
+
+    Compressed files are recognised by their extension, pipes and other
+    non-regular files by stat.
+    """
+    if not isinstance(source, (str, bytes, os.PathLike)):
+        return EDIInput(stream=source, name=getattr(source, 'name', None))
+    path = os.fspath(source)
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(path)[1].lower())
+    if opener is not None:
+        return EDIInput(opener=lambda: opener(path, 'rb'), name=path)
+
+    threshold = MMAP_THRESHOLD if mmap_threshold is None else mmap_threshold
+    f = open(path, 'rb')
+    try:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            return EDIInput(stream=f, name=path)
+        if st.st_size < max(threshold, 1):
+            return EDIInput(f.read(), name=path)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except BaseException:
+        f.close()
+        raise
+    # Mapování platí i po zavření souboru
+    f.close()
+    if hasattr(buffer, 'madvise'):
+        buffer.madvise(mmap.MADV_SEQUENTIAL)
+    return EDIInput(buffer, name=path)
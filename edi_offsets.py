@@ -0,0 +1,319 @@
+"""Offset index of an interchange for parsing single messages or parts
+
+    python edi_offsets.py SOUBOR.edi                      (přehled zpráv a položek)
+    python edi_offsets.py SOUBOR.edi --message 37
+    python edi_offsets.py SOUBOR.edi --part 5301234
+
+One scan over the raw bytes records where each message (UNH..UNT) and each
+line item (LIN up to the next LIN or UNT) starts and ends, and the part number
+of every LIN. The index is stored next to the parsed-result cache under the
+content hash of the file, so later lookups cost one stat. ``parse_message``
+and ``parse_part`` then read only the envelope head, the message head and the
+requested ranges (through the memory map for large files) and parse those.
+
+A purchase order (RFF+ON) carries over to the following line items until the
+next one, also across messages (Cummins). The index therefore keeps, for
+each LIN, the last RFF+ON before it, and the ranges replay that segment
+right after the LIN so that a line parsed on its own gets the same order as
+in a full parse.
+"""
+import argparse
+import os
+import pickle
+import re
+import sys
+import time
+import zlib
+from array import array
+
+import edi_api
+import edi_cache
+import edi_registry
+from edi_input import CHUNK_BYTES, open_input
+from edi_validate import starts_segment
+
+# Zvýšit při změně formátu uloženého indexu
+INDEX_FORMAT_VERSION = 2
+# Hledá se jen značka; že stojí na začátku segmentu, ověří starts_segment
+SEGMENT = re.compile(rb"(UNH|UNT|LIN|RFF)\+([^']*)")
+# Odkaz na objednávku, který platí i pro další položky
+ORDER_REFERENCE = b'ON:'
+
+
+def line_part(element_data):
+    """Part number of a LIN: the item with qualifier IN, else the first item code"""
+    elements = element_data.split(b'+')
+    first = None
+    for element in elements[2:]:
+        components = element.split(b':')
+        if len(components) >= 2 and components[1] == b'IN':
+            return components[0].decode('utf-8', 'replace')
+        if first is None and components[0]:
+            first = components[0]
+    return (first or b'').decode('utf-8', 'replace')
+
+
+class OffsetIndex:
+    """Byte ranges of the messages and line items of one interchange
+
+    Messages and lines are kept as parallel ``array('q')`` columns; the lines
+    of message ``i`` are ``message_lines[i]:message_lines[i + 1]``.
+    ``line_heads`` is where the LIN segment of a line ends, and ``order_starts``
+    and ``order_ends`` give the last RFF+ON before the line (-1 without one).
+    """
+
+    def __init__(self, size, head_end, message_refs, message_starts, message_ends, message_lines,
+                 line_starts, line_ends, line_parts, line_heads, order_starts, order_ends):
+        self.size = size
+        self.head_end = head_end
+        self.message_refs = message_refs
+        self.message_starts = message_starts
+        self.message_ends = message_ends
+        self.message_lines = message_lines
+        self.line_starts = line_starts
+        self.line_ends = line_ends
+        self.line_parts = line_parts
+        self.line_heads = line_heads
+        self.order_starts = order_starts
+        self.order_ends = order_ends
+        self._part_lines = None
+
+    @property
+    def message_count(self):
+        return len(self.message_starts)
+
+    def part_lines(self):
+        """{part number: [line indexes]}"""
+        if self._part_lines is None:
+            self._part_lines = {}
+            for index, part in enumerate(self.line_parts):
+                self._part_lines.setdefault(part, []).append(index)
+        return self._part_lines
+
+    def parts(self):
+        return list(self.part_lines())
+
+    def _message_of_line(self, line):
+        # message_lines je neklesající, stačí půlení intervalu
+        low, high = 0, self.message_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.message_lines[middle + 1] <= line:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _message_head(self, message):
+        """Range of a message up to its first LIN (its header segments)"""
+        first_line = self.message_lines[message]
+        end = (self.line_starts[first_line] if first_line < self.message_lines[message + 1]
+               else self.message_ends[message])
+        return self.message_starts[message], end
+
+    def _line_ranges(self, line, end):
+        """Ranges of a line up to ``end``, with the carried RFF+ON replayed after its LIN"""
+        start = self.line_starts[line]
+        if self.order_starts[line] < 0:
+            return [(start, end)]
+        head = self.line_heads[line]
+        return [(start, head), (self.order_starts[line], self.order_ends[line]), (head, end)]
+
+    def message_ranges(self, number):
+        """Byte ranges to parse for message ``number`` (1-based)"""
+        if not 1 <= number <= self.message_count:
+            raise ValueError(f"Zpráva {number} neexistuje (soubor má {self.message_count} zpráv)")
+        message = number - 1
+        first_line = self.message_lines[message]
+        if first_line == self.message_lines[message + 1]:
+            return [(0, self.head_end), (self.message_starts[message], self.message_ends[message])]
+        return ([(0, self.head_end), (self.message_starts[message], self.line_starts[first_line])]
+                + self._line_ranges(first_line, self.message_ends[message]))
+
+    def part_ranges(self, part):
+        """Byte ranges to parse for all line items of a part (with their message heads)"""
+        lines = self.part_lines().get(part.split(':')[0].strip())
+        if not lines:
+            raise ValueError(f"Položka {part} v souboru není")
+        ranges = [(0, self.head_end)]
+        last_message = None
+        for line in lines:
+            message = self._message_of_line(line)
+            if message != last_message:
+                ranges.append(self._message_head(message))
+                last_message = message
+            ranges += self._line_ranges(line, self.line_ends[line])
+        return ranges
+
+    def to_bytes(self):
+        return zlib.compress(pickle.dumps((INDEX_FORMAT_VERSION, self.__dict__ | {'_part_lines': None}),
+                                          protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        version, fields = pickle.loads(zlib.decompress(blob))
+        if version != INDEX_FORMAT_VERSION:
+            raise ValueError("Jiná verze indexu")
+        index = cls.__new__(cls)
+        index.__dict__.update(fields)
+        return index
+
+
+def build_index(data):
+    """Scan raw interchange data (bytes or mmap) into an OffsetIndex"""
+    message_refs = []
+    message_starts, message_ends, message_lines = array('q'), array('q'), array('q', [0])
+    line_starts, line_ends = array('q'), array('q')
+    line_parts = []
+    line_heads, order_starts, order_ends = array('q'), array('q'), array('q')
+    order = (-1, -1)
+    head_end = None
+    in_message = False
+    for match in SEGMENT.finditer(data):
+        if not starts_segment(data, match.start()):
+            continue
+        tag = match.group(1)
+        start = match.start(1)
+        if tag == b'LIN':
+            if not in_message:
+                continue
+            if len(line_starts) > message_lines[-1]:
+                line_ends.append(start)
+            line_starts.append(start)
+            line_parts.append(line_part(match.group(2)))
+            line_heads.append(min(match.end() + 1, len(data)))
+            order_starts.append(order[0])
+            order_ends.append(order[1])
+        elif tag == b'RFF':
+            # Objednávka se počítá až po první položce, stejně jako v parseru
+            if line_starts and match.group(2).startswith(ORDER_REFERENCE):
+                order = (start, min(match.end() + 1, len(data)))
+        elif tag == b'UNH':
+            if head_end is None:
+                head_end = start
+            elements = match.group(2).split(b'+')
+            message_refs.append(elements[0].decode('ascii', 'replace'))
+            message_starts.append(start)
+            in_message = True
+        elif in_message:
+            # UNT uzavírá poslední LIN i zprávu (včetně svého terminátoru)
+            if len(line_starts) > message_lines[-1]:
+                line_ends.append(start)
+            message_ends.append(min(match.end() + 1, len(data)))
+            message_lines.append(len(line_starts))
+            in_message = False
+    if in_message:
+        # Zkrácený soubor: poslední zpráva sahá do konce
+        if len(line_starts) > message_lines[-1]:
+            line_ends.append(len(data))
+        message_ends.append(len(data))
+        message_lines.append(len(line_starts))
+    return OffsetIndex(len(data), head_end or 0, message_refs, message_starts, message_ends,
+                       message_lines, line_starts, line_ends, line_parts, line_heads, order_starts, order_ends)
+
+
+def _index_path(cache, content_hash):
+    return os.path.join(cache.directory, f"{content_hash}_offsets{INDEX_FORMAT_VERSION}.idx")
+
+
+def offset_index(filepath, use_cache=True):
+    """OffsetIndex of a file, read from next to the parse cache or built by one scan and stored"""
+    cache = edi_cache.default_cache() if use_cache else None
+    content_hash = cache.known_hash(filepath) if cache is not None else None
+    if content_hash is not None:
+        index = _read_index(_index_path(cache, content_hash))
+        if index is not None:
+            return index
+    with open_input(filepath) as source:
+        if cache is not None and content_hash is None:
+            content_hash = source.content_hash()
+            cache.record_hash(filepath, content_hash)
+            index = _read_index(_index_path(cache, content_hash))
+            if index is not None:
+                return index
+        index = build_index(source.read())
+    if cache is not None:
+        cache.write_file(_index_path(cache, content_hash), index.to_bytes())
+    return index
+
+
+def _read_index(path):
+    try:
+        with open(path, 'rb') as f:
+            return OffsetIndex.from_bytes(f.read())
+    except (OSError, ValueError, EOFError, zlib.error, pickle.UnpicklingError, TypeError):
+        return None
+
+
+def parse_ranges(filepath, ranges, file_type=None, use_cache=True):
+    """Parse only the given byte ranges of a file; returns the dialect core
+
+    Without ``file_type`` the type recorded by the session or on-disk cache is
+    used, else it is detected over the first block of the whole file: the
+    ranges alone may miss the segments that name the partner.
+    """
+    if file_type is None and use_cache:
+        for cache in (edi_cache.session_cache(), edi_cache.default_cache()):
+            file_type = cache.cached_file_type(filepath) if cache is not None else None
+            if file_type:
+                break
+    with open_input(filepath) as source:
+        buffer = source.read()
+        if file_type is None:
+            file_type = edi_registry.registry().detect_chunks(filepath, [buffer[:CHUNK_BYTES]])
+        data = b''.join(buffer[start:end] for start, end in ranges)
+    if file_type not in edi_api.PARSER_CORES:
+        raise ValueError(f"Nepodporovaný typ souboru: {filepath}")
+    parser = edi_api.PARSER_CORES[file_type]()
+    parser.filepath = filepath
+    parser.parse_bytes(data)
+    return parser
+
+
+def parse_message(filepath, number, file_type=None, use_cache=True):
+    """Parse only message ``number`` (1-based) of an interchange"""
+    return parse_ranges(filepath, offset_index(filepath, use_cache).message_ranges(number), file_type, use_cache)
+
+
+def parse_part(filepath, part, file_type=None, use_cache=True):
+    """Parse only the line items of one part (in every message that has it)"""
+    return parse_ranges(filepath, offset_index(filepath, use_cache).part_ranges(part), file_type, use_cache)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Index zpráv a položek EDI souboru")
+    arg_parser.add_argument('file', help="EDI soubor")
+    group = arg_parser.add_mutually_exclusive_group()
+    group.add_argument('--message', type=int, metavar='N', help="zparsovat jen zprávu N (od 1)")
+    group.add_argument('--part', help="zparsovat jen položku")
+    arg_parser.add_argument('--no-cache', action='store_true', help="index neukládat ani nečíst z cache")
+    args = arg_parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = offset_index(args.file, not args.no_cache)
+    indexed = time.perf_counter()
+    if args.message is None and args.part is None:
+        print(f"{args.file}: {index.message_count} zpráv, {len(index.line_parts)} položek (LIN), "
+              f"{len(index.part_lines())} různých, index {(indexed - start) * 1000:.1f} ms")
+        for message in range(index.message_count):
+            lines = index.line_parts[index.message_lines[message]:index.message_lines[message + 1]]
+            print(f"  {message + 1:5} {index.message_refs[message]:<14} "
+                  f"{index.message_starts[message]:>12}-{index.message_ends[message]:<12} {', '.join(lines)}")
+        return 0
+    try:
+        if args.message is not None:
+            parser = parse_message(args.file, args.message, use_cache=not args.no_cache)
+        else:
+            parser = parse_part(args.file, args.part, use_cache=not args.no_cache)
+    except ValueError as e:
+        print(f"CHYBA: {e}", file=sys.stderr)
+        return 1
+    print(f"{parser.file_type}, {len(parser.delivery_schedules)} dodávek, "
+          f"index {(indexed - start) * 1000:.1f} ms, parsování {(time.perf_counter() - indexed) * 1000:.1f} ms")
+    for delivery in parser.delivery_schedules:
+        print("  " + "; ".join(f"{name}={value}" for name, value in delivery.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,12 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
-from edi_parser_cummins import EDIDelforCumminsParser
-from edi_parser_trwkob import EDITrwkobParser
-from edi_parser_minebea import EDIDelforParser as EDIDelforMinebeaParser
+import edi_api
+import edi_cache
+import edi_diff
+import edi_offsets
+import edi_registry
+import edi_validate
 
 class EDIUnifiedParser:
     def __init__(self):
@@ -22,6 +25,15 @@ class EDIUnifiedParser:
         btn_frame.pack(fill=tk.X, pady=(0, 10))
         
         ttk.Button(btn_frame, text="Načíst EDI soubor", command=self.load_file).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="Porovnat verze", command=self.compare_files).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(btn_frame, text="Položka ze souboru", command=self.show_part).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Cache naposledy otevřených souborů (sdílená všemi parsery)
+        ttk.Button(btn_frame, text="Vyprázdnit cache", command=self.clear_session_cache).pack(side=tk.RIGHT)
+        ttk.Button(btn_frame, text="Obsah cache", command=self.show_session_cache).pack(side=tk.RIGHT, padx=(0, 5))
+        self.cache_label = ttk.Label(btn_frame, text="")
+        self.cache_label.pack(side=tk.RIGHT, padx=(0, 10))
+        self.update_cache_label()
         
         self.info_text = tk.Text(main_frame, wrap=tk.WORD, font=('Courier', 10))
         scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.info_text.yview)
@@ -41,78 +53,124 @@ class EDIUnifiedParser:
             return
 
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-            
             # Detect file type based on both filename and content
-            file_type = self.detect_file_type(filepath, content)
-            
-            def run_parser(parser_func):
-                try:
-                    return parser_func(filepath)
-                except Exception as e:
-                    messagebox.showerror("Chyba", f"Chyba při spouštění parseru: {str(e)}")
+            # (a file already in the parse cache is not read again)
+            file_type = edi_api.detect_file(filepath)
+
+            # Poškozenou obálku (zkrácený soubor, nesedící UNT/UNZ) hlásíme před parsováním;
+            # soubor, jehož výsledek už je v cache, se znovu nekontroluje
+            if not edi_api.has_cached_result(filepath, file_type):
+                validation = edi_validate.validate_file(filepath)
+                if not validation.valid and not messagebox.askyesno(
+                        "Neplatný soubor",
+                        f"Soubor má poškozenou strukturu:\n{validation.message}\n\nPřesto otevřít?"):
                     return False
             
             success = False
-            if file_type == "cummins":
-                success = run_parser(self.run_cummins_parser)
-            elif file_type == "trwkob":
-                success = run_parser(self.run_trwkob_parser)
-            elif file_type == "minebea":
-                success = run_parser(self.run_minebea_parser)
+            if file_type in edi_registry.registry():
+                success = self.run_parser(file_type, filepath)
             else:
                 messagebox.showerror("Chyba", "Nepodporovaný typ souboru")
                 
+            self.update_cache_label()
             return success
                 
         except Exception as e:
             messagebox.showerror("Chyba", f"Chyba při načítání souboru: {str(e)}")
             return False
 
+    def compare_files(self):
+        """Compare two releases of the same customer's DELFOR"""
+        initial_dir = r"M:\APLIKACE\Edirex\INArchiv"
+        paths = []
+        for title in ("Vyberte starší EDI soubor", "Vyberte novější EDI soubor"):
+            filepath = filedialog.askopenfilename(
+                title=title,
+                initialdir=initial_dir if os.path.exists(initial_dir) else ".",
+                filetypes=[("EDI files", "*.edi"), ("All files", "*.*")]
+            )
+            if not filepath:
+                return
+            paths.append(filepath)
+
+        try:
+            schedule_diff = edi_diff.diff_files(*paths)
+        except Exception as e:
+            messagebox.showerror("Chyba", f"Chyba při porovnání souborů: {str(e)}")
+            return
+        edi_diff.EDIDiffWindow(self.root, schedule_diff)
+        self.update_cache_label()
+
+    def show_part(self):
+        """Parse only one part or message of a (large) file through its offset index"""
+        initial_dir = r"M:\APLIKACE\Edirex\INArchiv"
+        filepath = filedialog.askopenfilename(
+            title="Vyberte EDI soubor",
+            initialdir=initial_dir if os.path.exists(initial_dir) else ".",
+            filetypes=[("EDI files", "*.edi"), ("All files", "*.*")]
+        )
+        if not filepath:
+            return
+        try:
+            index = edi_offsets.offset_index(filepath)
+        except Exception as e:
+            messagebox.showerror("Chyba", f"Chyba při indexování souboru: {str(e)}")
+            return
+        query = simpledialog.askstring(
+            "Položka nebo zpráva",
+            f"Soubor má {index.message_count} zpráv a {len(index.part_lines())} různých položek.\n"
+            "Zadejte číslo položky, nebo #číslo zprávy:",
+            parent=self.root)
+        if not query:
+            return
+        try:
+            if query.strip().startswith('#'):
+                parser = edi_offsets.parse_message(filepath, int(query.strip()[1:]))
+            else:
+                parser = edi_offsets.parse_part(filepath, query.strip())
+        except ValueError as e:
+            messagebox.showerror("Chyba", str(e))
+            return
+        content = f"=== {os.path.basename(filepath)}: {query.strip()} ===\n"
+        content += f"Typ: {parser.file_type}, dodávek: {len(parser.delivery_schedules)}\n\n"
+        for delivery in parser.delivery_schedules:
+            content += "; ".join(f"{name}: {value}" for name, value in delivery.items()) + "\n"
+        self.info_text.delete(1.0, tk.END)
+        self.info_text.insert(1.0, content)
+
+    def update_cache_label(self):
+        """Show the number of cached results and their memory footprint"""
+        if not self.root.winfo_exists():
+            return
+        cache = edi_cache.session_cache()
+        self.cache_label.configure(
+            text=f"Cache: {len(cache)} souborů, {cache.footprint() / (1024 * 1024):.1f} MB")
+
+    def show_session_cache(self):
+        """List the cached results in the info panel"""
+        cache = edi_cache.session_cache()
+        content = "=== CACHE NAPOSLEDY OTEVŘENÝCH SOUBORŮ ===\n"
+        content += f"Celkem: {cache.footprint() / (1024 * 1024):.1f} MB z {cache.max_bytes / (1024 * 1024):.0f} MB\n\n"
+        for path, file_type, size in cache.entries():
+            content += f"{size / (1024 * 1024):8.2f} MB  {file_type:<8} {path}\n"
+        self.info_text.delete(1.0, tk.END)
+        self.info_text.insert(1.0, content)
+        self.update_cache_label()
+
+    def clear_session_cache(self):
+        """Drop all cached results from memory"""
+        edi_cache.session_cache().clear()
+        self.update_cache_label()
+        self.info_text.delete(1.0, tk.END)
+
     def detect_file_type(self, filepath, content):
-        # Look for patterns in both filename and content
-        filename = os.path.basename(filepath).upper()
-        content_upper = content.upper()
-        
-        # Check for Cummins patterns (both in filename and content)
-        cummins_patterns = [
-            "CUMMINS", "CMI", "CMI-", "CMI_",
-            "DELFOR_CUMMINS", "CUMMINS_DELFOR"
-        ]
-        if any(pattern in filename for pattern in cummins_patterns) or \
-           any(pattern in content_upper for pattern in cummins_patterns):
-            return "cummins"
-            
-        # Check for Minebea patterns
-        minebea_patterns = [
-            "MINEBEA", "MINOL", "MINEBEA-MINOL", "MBM",
-            "DELFOR_MINEBEA", "MINEBEA_DELFOR"
-        ]
-        if any(pattern in filename for pattern in minebea_patterns) or \
-           any(pattern in content_upper for pattern in minebea_patterns):
-            return "minebea"
-            
-        # Check for Trwkob patterns
-        trwkob_patterns = [
-            "TRWKOB", "TRW-KOB", "TRW_KOB", "KOBALT",
-            "DELFOR_TRWKOB", "TRWKOB_DELFOR"
-        ]
-        if any(pattern in filename for pattern in trwkob_patterns) or \
-           any(pattern in content_upper for pattern in trwkob_patterns):
-            return "trwkob"
-            
-        # If no specific pattern found, try to detect by file structure
-        if content.startswith("UNB") or content.startswith("UNA"):
-            # This is a standard EDI file structure
-            return "minebea"  # Default to Minebea as fallback
-            
-        return None
+        return edi_api.detect_file_type(filepath, content)
 
-    def run_cummins_parser(self, filepath):
+    def run_parser(self, file_type, filepath):
+        """Open a file in the window of its dialect (the parser module is imported on first use)"""
         try:
             # Create parser instance with Tk() root window
-            parser = EDIDelforCumminsParser()
+            parser = edi_registry.registry().window_class(file_type)()
             
             # Load the file
             success = parser.load_file(filepath)
@@ -124,7 +182,7 @@ class EDIUnifiedParser:
             return False
                 
         except Exception as e:
-            messagebox.showerror("Chyba", f"Chyba při načítání souboru: {str(e)}")
+            messagebox.showerror("Chyba", f"Chyba při spouštění parseru: {str(e)}")
             return False
 
     def on_parser_close(self, parser):
@@ -143,42 +201,6 @@ class EDIUnifiedParser:
             if hasattr(self, 'root') and self.root.winfo_exists():
                 self.root.deiconify()
 
-    def run_trwkob_parser(self, filepath):
-        try:
-            # Create parser instance - don't set main_window to avoid circular references
-            parser = EDITrwkobParser()
-            
-            # Load the file
-            success = parser.load_file(filepath)
-            
-            if success:
-                # Start the parser's main loop
-                parser.root.mainloop()
-                return True
-            return False
-                
-        except Exception as e:
-            messagebox.showerror("Chyba", f"Chyba při načítání souboru: {str(e)}")
-            return False
-
-    def run_minebea_parser(self, filepath):
-        try:
-            # Create parser instance with Tk() root window
-            parser = EDIDelforMinebeaParser()
-            
-            # Load the file
-            success = parser.load_file(filepath)
-            
-            if success:
-                # Start the parser's main loop
-                parser.root.mainloop()
-                return True
-            return False
-                
-        except Exception as e:
-            messagebox.showerror("Chyba", f"Chyba při načítání souboru: {str(e)}")
-            return False
-
 def main():
     app = EDIUnifiedParser()
     app.root.mainloop()
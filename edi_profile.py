@@ -0,0 +1,305 @@
+"""Opt-in profiling of the parse pipeline
+
+Enabled per parser (``parse_file(..., profile=True)``, ``edi_api.py --profile``)
+or for every window with ``EDI_PARSER_PROFILE=1``. ``profile='memory'``
+(``--memory``, ``EDI_PARSER_PROFILE=memory``) measures tracemalloc peak and
+retained bytes per stage instead of time. When disabled the parsers
+keep plain segment lists and no timer is started, so there is no per-segment
+cost. When enabled, segments are served through ``ProfiledSegments``, which
+charges the time between moving from one segment to the next to the tag of
+the segment being handled.
+"""
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PHASES = ('read', 'tokenize', 'handle', 'display', 'export')
+# Popisky fází pro výpis paměťového profilu
+STAGE_LABELS = {
+    'read': 'čtení',
+    'tokenize': 'segmentace',
+    'handle': 'sestavení záznamů',
+    'display': 'naplnění tabulky',
+    'export': 'sestavení sešitu',
+}
+# Počet míst alokace vypsaných u každé fáze
+TOP_SITES = 5
+# Alokace samotného měření a importů se do míst alokace nepočítají
+SITE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+
+def profiling_mode():
+    """Profiling requested by EDI_PARSER_PROFILE: None, 'time' or 'memory'"""
+    value = os.environ.get('EDI_PARSER_PROFILE', '0').strip().lower()
+    if value in ('', '0'):
+        return None
+    return 'memory' if value == 'memory' else 'time'
+
+
+def new_profile(mode):
+    """Profile object for a mode, or None when profiling is off"""
+    if not mode:
+        return None
+    return MemoryProfile() if mode == 'memory' else ParseProfile()
+
+
+class ParseProfile:
+    """Time per phase plus segment counts and time per segment tag of one file"""
+
+    # Segmenty se pro měření času po značkách sbírají do seznamu
+    streams_segments = False
+
+    def __init__(self):
+        self.phase_seconds = {}
+        self.segment_counts = {}
+        self.segment_seconds = {}
+        self.rows = 0
+        self._segments = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def segments(self, segments):
+        """Wrap a segment list so that the parse loop is timed per tag"""
+        self._segments = ProfiledSegments(segments, self)
+        return self._segments
+
+    def add_segment(self, tag, seconds):
+        self.segment_counts[tag] = self.segment_counts.get(tag, 0) + 1
+        self.segment_seconds[tag] = self.segment_seconds.get(tag, 0.0) + seconds
+
+    def finish_parse(self, parser):
+        """Close the segment timing; 'handle' is the parse time spent outside tokenizing"""
+        if self._segments is not None:
+            self._segments.flush()
+            self._segments = None
+        parse = self.phase_seconds.pop('parse', 0.0)
+        self.phase_seconds['handle'] = max(parse - self.phase_seconds.get('tokenize', 0.0), 0.0)
+        self.rows = len(parser.delivery_schedules)
+
+    def segment_count(self):
+        return sum(self.segment_counts.values())
+
+    def parse_seconds(self):
+        return sum(self.phase_seconds.get(name, 0.0) for name in ('read', 'tokenize', 'handle'))
+
+    def to_dict(self):
+        return {
+            'phases_ms': {name: self.phase_seconds[name] * 1000 for name in PHASES if name in self.phase_seconds},
+            'segments': {tag: {'count': self.segment_counts[tag], 'ms': self.segment_seconds[tag] * 1000}
+                         for tag in sorted(self.segment_seconds, key=self.segment_seconds.get, reverse=True)},
+            'segment_count': self.segment_count(),
+            'rows': self.rows,
+        }
+
+    def status_text(self):
+        """One line for the status bar"""
+        text = (f"Parsování {self.parse_seconds() * 1000:.1f} ms, "
+                f"segmentů {self.segment_count():,}, řádků {self.rows:,}")
+        for name, label in (('display', 'zobrazení'), ('export', 'export')):
+            if name in self.phase_seconds:
+                text += f", {label} {self.phase_seconds[name] * 1000:.1f} ms"
+        return text
+
+    def summary_text(self):
+        lines = ["Fáze:"]
+        for name in PHASES:
+            if name in self.phase_seconds:
+                lines.append(f"  {name:10} {self.phase_seconds[name] * 1000:10.2f} ms")
+        lines.append(f"Segmenty ({self.segment_count():,}):")
+        for tag in sorted(self.segment_seconds, key=self.segment_seconds.get, reverse=True):
+            lines.append(f"  {tag:10} {self.segment_counts[tag]:10,} × {self.segment_seconds[tag] * 1000:10.2f} ms")
+        return "\n".join(lines)
+
+
+class ProfiledSegments(list):
+    """Segment list that times the parse loop per segment tag
+
+    The dialect engine (edi_dialect.Dialect.run) iterates the segments once
+    and dispatches each one on its tag to a header, party, group or hook
+    handler, so the time until the next segment is requested is the cost of
+    that segment's handler. Indexed access is charged the same way.
+    """
+
+    def __init__(self, segments, profile):
+        super().__init__(segments)
+        self.profile = profile
+        self._index = -1
+        self._tag = None
+        self._start = 0.0
+
+    def _enter(self, index):
+        if index == self._index:
+            return
+        now = time.perf_counter()
+        if self._tag is not None:
+            self.profile.add_segment(self._tag, now - self._start)
+        self._index = index
+        self._tag = list.__getitem__(self, index)[:3].decode('ascii', 'replace')
+        self._start = now
+
+    def flush(self):
+        if self._tag is not None:
+            self.profile.add_segment(self._tag, time.perf_counter() - self._start)
+            self._tag = None
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            self._enter(index if index >= 0 else len(self) + index)
+        return list.__getitem__(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            self._enter(index)
+            yield list.__getitem__(self, index)
+        # Work after the loop belongs to no segment
+        self.flush()
+
+
+class StageMemory:
+    """Peak and retained traced bytes of one stage plus its top allocation sites"""
+
+    def __init__(self):
+        self.peak = 0
+        self.retained = 0
+        self.sites = []
+
+
+class MemoryProfile:
+    """tracemalloc accounting per pipeline stage of one file
+
+    Stages may nest (parsing contains tokenizing), so every open stage keeps
+    the highest traced size seen while it was open; ``reset_peak`` is only
+    called after the open stages have taken the peak so far. Snapshots taken
+    around each stage give the allocation sites of its retained memory.
+
+    Segments stay a lazy stream as in an unprofiled run, so the peak of record
+    building is the real one and includes tokenizing; the time spent inside
+    the tokenizer is measured while the segments pass through (``segments``).
+
+    Tracing runs only while a stage is open: the outermost stage starts
+    tracemalloc if it is not already running and stops it again when it ends,
+    so the rest of the session runs untraced. Tracing started elsewhere (for
+    example ``python -X tracemalloc``) is left running.
+    """
+
+    streams_segments = True
+
+    def __init__(self):
+        # True while tracemalloc runs because this profile started it
+        self._started_tracing = False
+        self.stages = {}
+        self.rows = 0
+        self.segment_total = 0
+        self.tokenize_seconds = 0.0
+        # Otevřené fáze: [název, velikost na začátku, nejvyšší velikost, snímek]
+        self._open = []
+
+    def _track_peak(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for stage in self._open:
+            stage[2] = max(stage[2], peak)
+
+    def _start_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        """Stop tracemalloc if this profile started it"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name):
+        if not self._open:
+            self._start_tracing()
+        self._track_peak()
+        snapshot = tracemalloc.take_snapshot().filter_traces(SITE_FILTERS)
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        stage = [name, current, current, snapshot]
+        self._open.append(stage)
+        try:
+            yield
+        finally:
+            self._track_peak()
+            self._open.remove(stage)
+            after = tracemalloc.take_snapshot().filter_traces(SITE_FILTERS)
+            current = tracemalloc.get_traced_memory()[0]
+            result = self.stages.setdefault(name, StageMemory())
+            result.peak = max(result.peak, stage[2] - stage[1])
+            result.retained += current - stage[1]
+            result.sites = [diff for diff in after.compare_to(stage[3], 'lineno') if diff.size_diff > 0][:TOP_SITES]
+            if not self._open:
+                self.stop()
+
+    def segments(self, segments):
+        """Pass the tokenizer's segments through lazily, counting them and timing the tokenizer"""
+        self.segment_total = 0
+        self.tokenize_seconds = 0.0
+        return self._timed_segments(iter(segments))
+
+    def _timed_segments(self, segments):
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            segment = next(segments, None)
+            self.tokenize_seconds += clock() - start
+            if segment is None:
+                return
+            self.segment_total += 1
+            yield segment
+
+    def finish_parse(self, parser):
+        # Segmenty se zpracovávají proudově, takže parsování je sestavení záznamů včetně segmentace
+        if 'parse' in self.stages:
+            self.stages['handle'] = self.stages.pop('parse')
+        self.rows = len(parser.delivery_schedules)
+
+    def peak(self):
+        return max((stage.peak for stage in self.stages.values()), default=0)
+
+    def to_dict(self):
+        return {
+            'stages': {name: {'peak_bytes': stage.peak, 'retained_bytes': stage.retained,
+                              'sites': [f"{site.traceback[0].filename}:{site.traceback[0].lineno} "
+                                        f"+{site.size_diff} B" for site in stage.sites]}
+                       for name, stage in self.stages.items()},
+            'segment_count': self.segment_total,
+            'tokenize_ms': self.tokenize_seconds * 1000,
+            'rows': self.rows,
+        }
+
+    def status_text(self):
+        return (f"Paměť: špička {self.peak() / 1e6:.1f} MB, "
+                f"segmentů {self.segment_total:,}, řádků {self.rows:,}")
+
+    def summary_text(self):
+        lines = []
+        for name in PHASES:
+            stage = self.stages.get(name)
+            if stage is None:
+                continue
+            lines.append(f"{STAGE_LABELS[name]}: špička {stage.peak / 1e6:.2f} MB, "
+                         f"zůstává {stage.retained / 1e6:.2f} MB")
+            for site in stage.sites:
+                frame = site.traceback[0]
+                lines.append(f"    {os.path.basename(frame.filename)}:{frame.lineno}  "
+                             f"+{site.size_diff / 1e6:.2f} MB ({site.count_diff:+,} bloků)")
+        if self.segment_total:
+            lines.append(f"{STAGE_LABELS['tokenize']}: {self.segment_total:,} segmentů za "
+                         f"{self.tokenize_seconds * 1000:.1f} ms (proudově, paměť v sestavení záznamů)")
+        return "\n".join(lines)
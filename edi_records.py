@@ -0,0 +1,134 @@
+from edi_calendar import parse_date_ordinal
+
+# Pořadí SCC horizontů pro řazení (Backlog -> Firm -> Forecast)
+SCC_RANK = {
+    '10': 0, 'Backlog': 0,
+    '1': 1, 'Firm': 1, 'Fix': 1,
+    '4': 2, 'Forecast': 2,
+}
+
+_MISSING = (1, '')
+
+
+def _text_key(value):
+    if value is None or value == '':
+        return _MISSING
+    return (0, str(value).casefold())
+
+
+def _number_key(value):
+    if isinstance(value, (int, float)):
+        return (0, value)
+    text = str(value).strip().strip("'")
+    try:
+        return (0, int(text))
+    except ValueError:
+        try:
+            return (0, float(text))
+        except ValueError:
+            return _MISSING
+
+
+def _date_key(value):
+    ordinal = parse_date_ordinal(value)
+    return _MISSING if ordinal is None else (0, ordinal)
+
+
+def _scc_key(value):
+    rank = SCC_RANK.get(value)
+    if rank is None:
+        return _text_key(value) if value else _MISSING
+    return (0, '%03d' % rank)
+
+
+KEY_FUNCTIONS = {
+    'text': _text_key,
+    'number': _number_key,
+    'date': _date_key,
+    'scc': _scc_key,
+}
+
+
+class DeliveryStore:
+    """Delivery rows with typed per-column sort keys and cached orderings
+
+    ``columns`` is a sequence of ``(name, field, kind)`` where ``field`` is either
+    a key of the delivery dict or a callable taking the delivery, and ``kind`` is
+    one of ``KEY_FUNCTIONS``. Sort keys and orderings are computed once per column
+    and reused, so re-sorting is a lookup of a stored permutation.
+    """
+
+    def __init__(self, records, columns):
+        self.records = list(records)
+        self.columns = [name for name, _, _ in columns]
+        self.kinds = {name: kind for name, _, kind in columns}
+        getters = []
+        for _, field, _ in columns:
+            if callable(field):
+                getters.append(field)
+            else:
+                getters.append(lambda record, field=field: record.get(field, ''))
+        self.rows = [tuple(getter(record) for getter in getters) for record in self.records]
+        self._keys = {}
+        self._orders = {}
+        self._search_text = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column_index(self, column):
+        return self.columns.index(column)
+
+    def sort_keys(self, column):
+        """Typed sort keys of a column, computed on first use"""
+        keys = self._keys.get(column)
+        if keys is None:
+            idx = self.column_index(column)
+            key_func = KEY_FUNCTIONS[self.kinds[column]]
+            # Sloupce mají málo různých hodnot (sdílené řetězce, viz edi_dialect); klíč jednou na hodnotu
+            memo = {}
+            keys = []
+            for row in self.rows:
+                value = row[idx]
+                key = memo.get(value)
+                if key is None:
+                    key = memo[value] = key_func(value)
+                keys.append(key)
+            self._keys[column] = keys
+        return keys
+
+    def order(self, column, descending=False):
+        """Row indices sorted by column; the ascending permutation is cached"""
+        ordering = self._orders.get(column)
+        if ordering is None:
+            keys = self.sort_keys(column)
+            ordering = sorted(range(len(keys)), key=keys.__getitem__)
+            self._orders[column] = ordering
+        if descending:
+            return ordering[::-1]
+        return ordering
+
+    def prebuild(self, columns=None):
+        """Build orderings for the given (or all) columns ahead of time"""
+        for column in columns or self.columns:
+            self.order(column)
+
+    def matches(self, text):
+        """Set of row indices whose values contain the filter text"""
+        if self._search_text is None:
+            self._search_text = [
+                '\t'.join(str(value) for value in row).casefold() for row in self.rows
+            ]
+        needle = text.strip().casefold()
+        return {i for i, haystack in enumerate(self._search_text) if needle in haystack}
+
+    def view(self, column=None, descending=False, text=''):
+        """Row indices to display for the given sort column and filter text"""
+        if column:
+            indices = self.order(column, descending)
+        else:
+            indices = range(len(self.rows))
+        if text and text.strip():
+            selected = self.matches(text)
+            return [i for i in indices if i in selected]
+        return list(indices)
@@ -0,0 +1,220 @@
+"""Registry of DELFOR dialects: metadata up front, parser code on first use
+
+Each dialect is described by a ``DialectInfo``: its name, the modules and
+classes of its headless core and its window, the filename and content
+signatures used for detection and the delivery date column of its exports.
+Detection only looks at this metadata; a dialect's parser module is imported
+the first time one of its files is parsed or opened, so adding partners does
+not add start-up imports.
+
+Besides the built-in dialects, plugins are read from:
+
+- ``*.json`` manifests in the directory named by ``EDI_PARSER_PLUGIN_DIR``
+  (the fields of ``DialectInfo``; ``module`` is imported from that directory),
+- entry points in the ``edi_parser.dialects`` group, each pointing to a dict
+  of the same fields in a lightweight module.
+"""
+import importlib
+import json
+import os
+import sys
+from collections import namedtuple
+from collections.abc import Mapping
+from itertools import chain
+
+ENTRY_POINT_GROUP = 'edi_parser.dialects'
+
+DialectInfo = namedtuple(
+    'DialectInfo',
+    'name label module core window filename_patterns content_patterns date_field fallback plugin_dir',
+    defaults=((), (), 'Datum od', False, None),
+)
+
+# Vestavěné dialekty; pořadí je pořadí detekce
+BUILTIN_DIALECTS = (
+    DialectInfo(
+        'cummins', 'Cummins', 'edi_parser_cummins', 'EDIDelforCumminsCore', 'EDIDelforCumminsParser',
+        filename_patterns=("CUMMINS", "CMI", "CMI-", "CMI_", "DELFOR_CUMMINS", "CUMMINS_DELFOR"),
+        content_patterns=("CUMMINS", "CMI", "CMI-", "CMI_", "DELFOR_CUMMINS", "CUMMINS_DELFOR"),
+        date_field='Datum',
+    ),
+    DialectInfo(
+        'minebea', 'Minebea', 'edi_parser_minebea', 'EDIDelforMinebeaCore', 'EDIDelforParser',
+        filename_patterns=("MINEBEA", "MINOL", "MINEBEA-MINOL", "MBM", "DELFOR_MINEBEA", "MINEBEA_DELFOR"),
+        content_patterns=("MINEBEA", "MINOL", "MINEBEA-MINOL", "MBM", "DELFOR_MINEBEA", "MINEBEA_DELFOR"),
+        # Standardní EDI bez známého partnera se otevře jako Minebea
+        fallback=True,
+    ),
+    DialectInfo(
+        'trwkob', 'TRWKOB', 'edi_parser_trwkob', 'EDITrwkobCore', 'EDITrwkobParser',
+        filename_patterns=("TRWKOB", "TRW-KOB", "TRW_KOB", "KOBALT", "DELFOR_TRWKOB", "TRWKOB_DELFOR"),
+        content_patterns=("TRWKOB", "TRW-KOB", "TRW_KOB", "KOBALT", "DELFOR_TRWKOB", "TRWKOB_DELFOR"),
+    ),
+)
+
+
+def dialect_info(fields, plugin_dir=None):
+    """DialectInfo from a manifest dict (lists become tuples)"""
+    fields = dict(fields)
+    for name in ('filename_patterns', 'content_patterns'):
+        fields[name] = tuple(pattern.upper() for pattern in fields.get(name, ()))
+    if plugin_dir is not None:
+        fields['plugin_dir'] = plugin_dir
+    return DialectInfo(**fields)
+
+
+class DialectRegistry:
+    """Dialect metadata by name, with parser classes imported on demand"""
+
+    def __init__(self, plugin_dir=None, use_entry_points=True):
+        self.plugin_dir = plugin_dir
+        self.use_entry_points = use_entry_points
+        self.errors = []
+        self._dialects = None
+        self._classes = {}
+
+    def register(self, info):
+        """Add or replace a dialect"""
+        self.dialects()[info.name] = info
+
+    def dialects(self):
+        """{name: DialectInfo} in detection order (plugins are discovered on first call)"""
+        if self._dialects is None:
+            self._dialects = {info.name: info for info in BUILTIN_DIALECTS}
+            self._load_plugin_dir()
+            if self.use_entry_points:
+                self._load_entry_points()
+        return self._dialects
+
+    def _load_plugin_dir(self):
+        if not self.plugin_dir or not os.path.isdir(self.plugin_dir):
+            return
+        for filename in sorted(os.listdir(self.plugin_dir)):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.plugin_dir, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    info = dialect_info(json.load(f), self.plugin_dir)
+            except (OSError, ValueError, TypeError) as e:
+                # Vadný manifest nesmí zablokovat ostatní dialekty
+                self.errors.append(f"{path}: {e}")
+                continue
+            self._dialects[info.name] = info
+
+    def _load_entry_points(self):
+        try:
+            from importlib.metadata import entry_points
+            found = entry_points()
+            points = (found.select(group=ENTRY_POINT_GROUP) if hasattr(found, 'select')
+                      else found.get(ENTRY_POINT_GROUP, ()))
+        except Exception as e:
+            self.errors.append(f"entry points: {e}")
+            return
+        for point in points:
+            try:
+                fields = point.load()
+                info = fields if isinstance(fields, DialectInfo) else dialect_info(fields)
+            except Exception as e:
+                self.errors.append(f"{point.name}: {e}")
+                continue
+            self._dialects[info.name] = info
+
+    def names(self):
+        return list(self.dialects())
+
+    def info(self, name):
+        return self.dialects()[name]
+
+    def __contains__(self, name):
+        return name in self.dialects()
+
+    def detect(self, filepath, content):
+        """Dialect name from the filename and content signatures, or None"""
+        return self._detect(filepath, (content,), str.upper,
+                            content.startswith("UNB") or content.startswith("UNA"))
+
+    def detect_chunks(self, filepath, chunks):
+        """detect() over raw content given as bytes chunks, without joining them"""
+        chunks = iter(chunks)
+        first = next(chunks, b'')
+        standard = first.startswith(b"UNB") or first.startswith(b"UNA")
+        return self._detect(filepath, chain((first,), chunks), bytes.upper, standard, str.encode)
+
+    def _detect(self, filepath, chunks, upper, standard, encode=None):
+        infos = list(self.dialects().values())
+        filename = os.path.basename(filepath).upper()
+        # The first dialect matched by name wins unless the content names an earlier one
+        best = next((index for index, info in enumerate(infos)
+                     if any(pattern in filename for pattern in info.filename_patterns)), len(infos))
+        patterns = [[encode(pattern) if encode else pattern for pattern in info.content_patterns]
+                    for info in infos]
+        overlap = max((len(pattern) for group in patterns for pattern in group), default=1) - 1
+        tail = upper(encode('') if encode else '')
+        for chunk in chunks:
+            if best == 0:
+                break
+            # Vzor může ležet přes hranici bloků
+            window = tail + upper(chunk)
+            for index in range(best):
+                if any(pattern in window for pattern in patterns[index]):
+                    best = index
+                    break
+            tail = window[-overlap:] if overlap else window[:0]
+        if best < len(infos):
+            return infos[best].name
+        # Without a known partner, a standard EDI file goes to the fallback dialect
+        if standard:
+            return next((info.name for info in infos if info.fallback), None)
+        return None
+
+    def _load_class(self, name, attribute):
+        key = (name, attribute)
+        cls = self._classes.get(key)
+        if cls is None:
+            info = self.info(name)
+            if info.plugin_dir and info.plugin_dir not in sys.path:
+                sys.path.append(info.plugin_dir)
+            module = importlib.import_module(info.module)
+            cls = self._classes[key] = getattr(module, getattr(info, attribute))
+        return cls
+
+    def core_class(self, name):
+        """Headless parser core of a dialect (imports its module on first use)"""
+        return self._load_class(name, 'core')
+
+    def window_class(self, name):
+        """Tk parser window of a dialect (imports its module on first use)"""
+        return self._load_class(name, 'window')
+
+
+class CoreMapping(Mapping):
+    """Read-only {name: core class} view that imports a core only when it is looked up"""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __getitem__(self, name):
+        if name not in self.registry:
+            raise KeyError(name)
+        return self.registry.core_class(name)
+
+    def __iter__(self):
+        return iter(self.registry.names())
+
+    def __len__(self):
+        return len(self.registry.names())
+
+    def __contains__(self, name):
+        return name in self.registry
+
+
+_registry = None
+
+
+def registry():
+    """Process-wide registry using EDI_PARSER_PLUGIN_DIR and installed entry points"""
+    global _registry
+    if _registry is None:
+        _registry = DialectRegistry(os.environ.get('EDI_PARSER_PLUGIN_DIR'))
+    return _registry
@@ -0,0 +1,311 @@
+"""Local HTTP parse service backed by a pre-warmed worker process pool
+
+    python edi_server.py [--host 127.0.0.1] [--port 8765] [--workers 4] [--max-inflight 16]
+
+    POST /parse?format=json|csv|xlsx[&type=cummins][&name=SOUBOR.edi]   (tělo = EDI soubor)
+    GET  /metrics                                                       (JSON)
+    GET  /health
+
+Workers import the parsers and build the calendar table once when the pool
+starts, and a warm-up parse runs in each of them, so a request pays only for
+parsing and rendering. Requests beyond ``--max-inflight`` are answered with
+503 at once instead of queueing. Each response carries a ``Server-Timing``
+header (queue, parse, render, total); ``/metrics`` aggregates the same
+timings per output format. Standard library only.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import edi_api
+from edi_calendar import calendar_table
+from edi_validate import EDIValidationError, check_bytes
+
+FORMATS = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# Největší přijaté tělo požadavku
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+# Minimální platná výměna pro zahřátí workerů
+WARMUP_EDI = (b"UNA:+.? 'UNB+UNOC:3+MINEBEA:ZZ+SUP:ZZ+240101:1000+1'UNH+1+DELFOR:D:97A:UN'"
+              b"BGM+241+1+9'LIN+1++1:IN'QTY+113:1:PCE'SCC+1'DTM+63:20240107:102'"
+              b"DTM+64:20240101:102'UNT+8+1'UNZ+1+1'")
+
+
+def _warm_worker():
+    """Pool initializer: import every parser and build the shared tables"""
+    for name in edi_api.PARSER_CORES:
+        edi_api.PARSER_CORES[name]
+    calendar_table()
+
+
+def _warmup_job():
+    return render(WARMUP_EDI, 'warmup.edi', 'minebea', 'json')[2]['rows']
+
+
+def _csv_body(parser):
+    columns = ['Položka']
+    for delivery in parser.delivery_schedules:
+        for name in delivery:
+            if name not in columns:
+                columns.append(name)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(columns)
+    for delivery in parser.delivery_schedules:
+        writer.writerow([delivery.get(name, '') for name in columns])
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+def render(data, name, file_type, output_format):
+    """Worker job: parse a payload and render it; returns (content type, body, timings)"""
+    start = time.perf_counter()
+    check_bytes(data)
+    if file_type is None:
+        file_type = edi_api.detect_bytes(name, data)
+    if file_type not in edi_api.PARSER_CORES:
+        raise ValueError(f"Nepodporovaný typ souboru: {name}")
+    parser = edi_api.PARSER_CORES[file_type]()
+    parser.filepath = name
+    parser.parse_bytes(data)
+    parsed = time.perf_counter()
+
+    if output_format == 'json':
+        body = json.dumps({
+            'file_type': file_type,
+            'header_info': parser.header_info,
+            'partner_info': parser.partner_info,
+            'deliveries': parser.delivery_schedules,
+        }, ensure_ascii=False).encode('utf-8')
+    elif output_format == 'csv':
+        body = _csv_body(parser)
+    else:
+        buffer = io.BytesIO()
+        parser.build_workbook().save(buffer)
+        body = buffer.getvalue()
+    done = time.perf_counter()
+    return FORMATS[output_format], body, {
+        'file_type': file_type,
+        'rows': len(parser.delivery_schedules),
+        'parse': parsed - start,
+        'render': done - parsed,
+    }
+
+
+class RequestMetrics:
+    """Request counts and timing totals per output format (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.inflight = 0
+        self.rejected = 0
+        self.formats = {}
+
+    def enter(self):
+        with self._lock:
+            self.inflight += 1
+
+    def leave(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record(self, output_format, ok, timings):
+        with self._lock:
+            entry = self.formats.setdefault(output_format, {
+                'requests': 0, 'errors': 0, 'bytes_in': 0, 'rows': 0,
+                'seconds': {'queue': 0.0, 'parse': 0.0, 'render': 0.0, 'total': 0.0},
+                'max_total': 0.0,
+            })
+            entry['requests'] += 1
+            entry['errors'] += 0 if ok else 1
+            entry['bytes_in'] += timings.get('bytes_in', 0)
+            entry['rows'] += timings.get('rows', 0)
+            for phase in entry['seconds']:
+                entry['seconds'][phase] += timings.get(phase, 0.0)
+            entry['max_total'] = max(entry['max_total'], timings.get('total', 0.0))
+
+    def snapshot(self):
+        with self._lock:
+            formats = {}
+            for output_format, entry in self.formats.items():
+                count = entry['requests'] or 1
+                formats[output_format] = dict(entry, seconds=dict(entry['seconds']), mean_ms={
+                    phase: seconds * 1000 / count for phase, seconds in entry['seconds'].items()})
+            return {
+                'uptime_s': time.time() - self.started,
+                'inflight': self.inflight,
+                'rejected': self.rejected,
+                'formats': formats,
+            }
+
+
+class ParseService:
+    """Worker pool, in-flight limit and metrics shared by the request handlers"""
+
+    def __init__(self, workers=None, max_inflight=16):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self.slots = threading.BoundedSemaphore(max_inflight)
+        self.metrics = RequestMetrics()
+
+    def warm_up(self):
+        """Start every worker and run one parse in it before accepting requests"""
+        futures = [self.pool.submit(_warmup_job) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def try_acquire(self):
+        if not self.slots.acquire(blocking=False):
+            self.metrics.reject()
+            return False
+        self.metrics.enter()
+        return True
+
+    def release(self):
+        self.metrics.leave()
+        self.slots.release()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class ParseRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'EDIParseService/1.0'
+    service = None
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, FORMATS['json'], json.dumps(payload, ensure_ascii=False).encode('utf-8'), headers)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/metrics':
+            self._send_json(200, self.service.metrics.snapshot())
+        elif path == '/health':
+            self._send_json(200, {'status': 'ok', 'workers': self.service.workers})
+        else:
+            self._send_json(404, {'error': 'Neznámá cesta'})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/parse':
+            self._send_json(404, {'error': 'Neznámá cesta'})
+            return
+        query = parse_qs(url.query)
+        output_format = query.get('format', ['json'])[0]
+        file_type = query.get('type', [None])[0]
+        name = query.get('name', ['payload.edi'])[0]
+        if output_format not in FORMATS:
+            self._send_json(400, {'error': f"Nepodporovaný formát: {output_format}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self._send_json(411, {'error': 'Chybí Content-Length'})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {'error': 'Soubor je příliš velký'})
+            return
+        if not self.service.try_acquire():
+            self._send_json(503, {'error': 'Služba je přetížená'}, {'Retry-After': '1'})
+            return
+
+        start = time.perf_counter()
+        timings = {'bytes_in': length}
+        ok = False
+        try:
+            data = self.rfile.read(length)
+            submitted = time.perf_counter()
+            future = self.service.pool.submit(render, data, name, file_type, output_format)
+            try:
+                content_type, body, worker_timings = future.result()
+            except EDIValidationError as e:
+                self._send_json(422, {'error': str(e)})
+                return
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+                return
+            timings.update(worker_timings)
+            timings['total'] = time.perf_counter() - start
+            # Čekání ve frontě a přenos mezi procesy
+            timings['queue'] = max(time.perf_counter() - submitted - timings['parse'] - timings['render'], 0.0)
+            ok = True
+            server_timing = ', '.join(f"{phase};dur={timings[phase] * 1000:.1f}"
+                                      for phase in ('queue', 'parse', 'render', 'total'))
+            self._send(200, content_type, body, {
+                'Server-Timing': server_timing,
+                'X-EDI-File-Type': timings['file_type'],
+                'X-EDI-Rows': str(timings['rows']),
+            })
+        finally:
+            timings.setdefault('total', time.perf_counter() - start)
+            self.service.metrics.record(output_format, ok, timings)
+            self.service.release()
+
+    def log_message(self, format, *args):
+        # Přístupový log jen s --verbose
+        if getattr(self.server, 'verbose', False):
+            super().log_message(format, *args)
+
+
+def serve(host='127.0.0.1', port=8765, workers=None, max_inflight=16, verbose=False):
+    """Start the pool, warm it up and serve until interrupted"""
+    service = ParseService(workers, max_inflight)
+    start = time.perf_counter()
+    service.warm_up()
+    handler = type('Handler', (ParseRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.verbose = verbose
+    print(f"EDI parse service na http://{host}:{server.server_address[1]} "
+          f"({service.workers} workerů zahřáto za {time.perf_counter() - start:.2f} s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Lokální HTTP služba pro parsování EDI DELFOR")
+    arg_parser.add_argument('--host', default='127.0.0.1', help="adresa pro naslouchání")
+    arg_parser.add_argument('--port', type=int, default=8765, help="port")
+    arg_parser.add_argument('--workers', type=int, help="počet pracovních procesů (výchozí počet CPU)")
+    arg_parser.add_argument('--max-inflight', type=int, default=16,
+                            help="nejvýše souběžně zpracovávaných požadavků, další dostanou 503")
+    arg_parser.add_argument('--verbose', action='store_true', help="vypisovat přístupový log")
+    args = arg_parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.max_inflight, args.verbose)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class LazyTabsMixin:
+    """Render notebook tabs on first selection instead of all at once
+
+    The parser registers a render method per tab frame with ``setup_lazy_tabs``.
+    ``invalidate_tabs`` marks every tab stale when the data changes and renders
+    only the visible one; the others are rendered on ``<<NotebookTabChanged>>``.
+    Rendering counts as the 'display' phase of the parse profile, after which
+    the window's status bar is refreshed.
+    """
+
+    def setup_lazy_tabs(self, renderers):
+        """renderers: sequence of (tab frame, render method)"""
+        self.tab_renderers = {str(frame): render for frame, render in renderers}
+        self.stale_tabs = set()
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+
+    def invalidate_tabs(self):
+        """Mark all tabs stale and render the currently selected one"""
+        self.stale_tabs = set(self.tab_renderers)
+        self.render_selected_tab()
+
+    def on_tab_changed(self, event=None):
+        self.render_selected_tab()
+
+    def render_selected_tab(self):
+        tab = self.notebook.select()
+        if tab in self.stale_tabs:
+            self.stale_tabs.discard(tab)
+            with self.profiled('display'):
+                self.tab_renderers[tab]()
+            self.update_status()
+
+    def update_status(self):
+        status_label = getattr(self, 'status_label', None)
+        if status_label is not None:
+            status_label.config(text=self.status_text())
+
+    def add_profile_button(self, parent):
+        """'Diagnostika' button showing the profile of the loaded file (only when profiling)"""
+        if self.profiling:
+            ttk.Button(parent, text="Diagnostika", command=self.show_profile).pack(side=tk.LEFT, padx=(5, 0))
+
+    def show_profile(self):
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostika načtení")
+        window.geometry("700x500")
+        text = tk.Text(window, wrap=tk.NONE, font=('Courier', 10))
+        text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        if self.profile is None:
+            text.insert(1.0, "Soubor byl načten z cache, profil není k dispozici.")
+        else:
+            text.insert(1.0, f"{self.status_text()}\n\n{self.profile.summary_text()}")
+        text.config(state=tk.DISABLED)
@@ -0,0 +1,202 @@
+"""Structural pre-validation of EDIFACT interchanges
+
+    python edi_validate.py SOUBOR.edi [...]
+
+Checks the envelope of a file before it is parsed: UNB/UNZ and UNH/UNT (and
+UNG/UNE) pairing, the segment count in UNT, the message or group count in UNZ
+and matching control references. Only the envelope segments are looked at,
+found with one regular expression over the raw bytes, and segment counts are
+taken with ``bytes.count``, so the check runs at close to read speed. It stops
+at the first fatal error. Large files are checked over their memory map
+(edi_input), without reading them into memory.
+"""
+import re
+import sys
+import time
+from collections import namedtuple
+
+from edi_input import open_input
+
+ValidationResult = namedtuple('ValidationResult', 'valid message segment messages')
+
+# Hledá se jen značka; že stojí na začátku segmentu, ověří starts_segment
+ENVELOPE = re.compile(rb"(UN[BGHTEZ])(\+[^']*)?")
+HEADER = re.compile(rb"UNB(\+[^']*)")
+TERMINATOR = b"'"
+ESCAPED_TERMINATOR = b"?'"
+UNA_LENGTH = 9
+# Mezera, BOM a UNA před UNB se hledají jen v začátku souboru
+HEAD_BYTES = 4096
+# Terminátory se počítají po blocích, aby se zpráva v mapě souboru nekopírovala celá
+COUNT_CHUNK = 4 * 1024 * 1024
+
+
+class EDIValidationError(ValueError):
+    """File rejected by the structural pre-validation"""
+
+
+def _elements(segment_data):
+    # Control references are simple elements; drop any component qualifiers
+    return [element.split(b':')[0].decode('ascii', 'replace') for element in segment_data.split(b'+')]
+
+
+def starts_segment(data, position):
+    """True when only whitespace separates position from the previous terminator"""
+    preceding = data[max(position - 8, 0):position].rstrip(b'\r\n\t ')
+    return preceding.endswith(TERMINATOR) and not preceding.endswith(ESCAPED_TERMINATOR)
+
+
+def _segments_between(data, start, end):
+    """Number of segment terminators in data[start:end], ignoring escaped ones"""
+    if isinstance(data, bytes):
+        return data.count(TERMINATOR, start, end) - data.count(ESCAPED_TERMINATOR, start, end)
+    count = 0
+    for chunk_start in range(start, end, COUNT_CHUNK):
+        chunk_end = min(chunk_start + COUNT_CHUNK, end)
+        # Jeden bajt navíc, aby se započetlo i '?' na konci bloku
+        chunk = data[chunk_start:min(chunk_end + 1, end)]
+        count += chunk.count(TERMINATOR, 0, chunk_end - chunk_start) - chunk.count(ESCAPED_TERMINATOR)
+    return count
+
+
+def validate_bytes(data):
+    """Validate the envelope of raw interchange data (bytes or mmap); returns ValidationResult"""
+    def fail(message, segment=None):
+        return ValidationResult(False, message, segment, messages)
+
+    messages = 0
+    head = data[:HEAD_BYTES]
+    body = head.lstrip(b'\xef\xbb\xbf\r\n\t ')
+    if not body:
+        return fail("Soubor je prázdný")
+    offset = len(head) - len(body)
+    if body.startswith(b'UNA'):
+        if len(body) < UNA_LENGTH:
+            return fail("Neúplný segment UNA", 'UNA')
+        if body[UNA_LENGTH - 1:UNA_LENGTH] != TERMINATOR or body[4:5] != b'+':
+            return fail("Nepodporované oddělovače v UNA", 'UNA')
+        offset = len(head) - len(body[UNA_LENGTH:].lstrip(b'\r\n\t '))
+    header = HEADER.match(data, offset)
+    if header is None:
+        return fail("Výměna nezačíná segmentem UNB", 'UNB')
+    elements = _elements(header.group(1))
+    if len(elements) < 6:
+        return fail("UNB bez řídicí reference", 'UNB')
+    unb_ref = elements[5]
+
+    unz_end = None
+    groups = 0
+    group_ref = None
+    group_messages = 0
+    message_ref = None
+    message_start = None
+    for match in ENVELOPE.finditer(data, header.end()):
+        if not starts_segment(data, match.start()):
+            continue
+        tag = match.group(1).decode('ascii')
+        elements = _elements(match.group(2) or b'')
+        if unz_end is not None:
+            return fail("Data za koncem výměny (UNZ)", tag)
+        if tag == 'UNH':
+            if message_ref is not None:
+                return fail(f"Zpráva {message_ref} nemá UNT před další UNH", tag)
+            if len(elements) < 2 or not elements[1]:
+                return fail("UNH bez referenční značky", tag)
+            message_ref = elements[1]
+            message_start = match.start(1)
+        elif tag == 'UNT':
+            if message_ref is None:
+                return fail("UNT bez odpovídající UNH", tag)
+            if len(elements) < 3:
+                return fail(f"Neúplný UNT zprávy {message_ref}", tag)
+            if elements[2] != message_ref:
+                return fail(f"UNT reference {elements[2]} neodpovídá UNH {message_ref}", tag)
+            counted = _segments_between(data, message_start, match.start(1)) + 1
+            if elements[1] != str(counted):
+                return fail(f"UNT zprávy {message_ref} uvádí {elements[1]} segmentů, skutečně {counted}", tag)
+            message_ref = None
+            messages += 1
+            group_messages += 1
+        elif tag == 'UNG':
+            if message_ref is not None or group_ref is not None:
+                return fail("UNG uvnitř zprávy nebo skupiny", tag)
+            group_ref = elements[5] if len(elements) > 5 else ''
+            group_messages = 0
+        elif tag == 'UNE':
+            if group_ref is None or message_ref is not None:
+                return fail("UNE bez odpovídající UNG", tag)
+            if len(elements) < 3 or elements[1] != str(group_messages) or elements[2] != group_ref:
+                return fail(f"UNE neodpovídá skupině {group_ref} ({group_messages} zpráv)", tag)
+            group_ref = None
+            groups += 1
+        elif tag == 'UNZ':
+            if message_ref is not None:
+                return fail(f"Zpráva {message_ref} nemá UNT (soubor je zkrácený?)", tag)
+            if group_ref is not None:
+                return fail(f"Skupina {group_ref} nemá UNE", tag)
+            expected = groups if groups else messages
+            if len(elements) < 3 or elements[1] != str(expected):
+                return fail(f"UNZ uvádí {elements[1] if len(elements) > 1 else '?'} zpráv, "
+                            f"skutečně {expected}", tag)
+            if elements[2] != unb_ref:
+                return fail(f"UNZ reference {elements[2]} neodpovídá UNB {unb_ref}", tag)
+            unz_end = match.end()
+        else:
+            return fail(f"Neočekávaný segment {tag}", tag)
+
+    if unz_end is None:
+        if message_ref is not None:
+            return fail(f"Zpráva {message_ref} nemá UNT (soubor je zkrácený?)", 'UNT')
+        return fail("Chybí segment UNZ (soubor je zkrácený?)", 'UNZ')
+    if data[unz_end:].strip(b"'\r\n\t "):
+        return fail("Data za koncem výměny (UNZ)", 'UNZ')
+    if not messages:
+        return fail("Výměna neobsahuje žádnou zprávu")
+    return ValidationResult(True, '', None, messages)
+
+
+def validate_file(filepath):
+    """Validate a file; returns ValidationResult
+
+    Compressed files and pipes have no random access and are read into memory.
+    """
+    with open_input(filepath) as source:
+        return validate_bytes(source.read())
+
+
+def check_bytes(data):
+    """Raise EDIValidationError when data fails the structural checks"""
+    result = validate_bytes(data)
+    if not result.valid:
+        raise EDIValidationError(result.message)
+    return result
+
+
+def check_file(filepath):
+    """Raise EDIValidationError when a file fails the structural checks"""
+    with open_input(filepath) as source:
+        return check_bytes(source.read())
+
+
+def main(argv=None):
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Strukturální kontrola EDI souborů")
+    arg_parser.add_argument('files', nargs='+', help="EDI soubory")
+    args = arg_parser.parse_args(argv)
+
+    invalid = 0
+    for filepath in args.files:
+        start = time.perf_counter()
+        result = validate_file(filepath)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if result.valid:
+            print(f"{filepath}: OK, {result.messages} zpráv, {elapsed_ms:.1f} ms")
+        else:
+            invalid += 1
+            print(f"{filepath}: NEPLATNÝ - {result.message}, {elapsed_ms:.1f} ms")
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
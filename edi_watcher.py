@@ -0,0 +1,282 @@
+"""Hot-folder watcher that parses and exports new or changed EDI files
+
+    python edi_watcher.py [ADRESÁŘ] --export VÝSTUP [--interval 30] [--once] [--history [DB]] [--archive [DB]]
+
+Every scan lists the folder with ``os.scandir`` and compares each file's
+(inode, size, mtime) with a manifest of already processed files, so unchanged
+files are never opened again. New or changed files are processed only after
+they have stopped growing for ``--settle`` seconds. Each file is read once:
+the same input is hashed, validated and parsed. During a scan the manifest
+is saved every MANIFEST_SAVE_FILES files or MANIFEST_SAVE_SECONDS seconds,
+and once more when the scan ends, so an interrupted first scan of a large
+archive does not start over.
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import sys
+import time
+
+import edi_api
+import edi_archive
+import edi_history
+from edi_input import open_input
+from edi_validate import EDIValidationError
+
+DEFAULT_ARCHIVE_DIR = r"M:\APLIKACE\Edirex\INArchiv"
+MANIFEST_NAME = '.edi_watcher_manifest.json'
+# Manifest se během skenu ukládá po dávkách: po tolika souborech nebo sekundách
+MANIFEST_SAVE_FILES = 200
+MANIFEST_SAVE_SECONDS = 10.0
+
+log = logging.getLogger('edi_watcher')
+
+
+class ScanStats:
+    """Counters of one scan, used for the throughput log"""
+
+    def __init__(self):
+        self.entries = 0
+        self.unchanged = 0
+        self.pending = 0
+        self.processed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.invalid = 0
+        self.bytes = 0
+        self.rows = 0
+        self.scan_seconds = 0.0
+        self.process_seconds = 0.0
+
+    def summary(self):
+        seconds = self.process_seconds or 1e-9
+        return (f"scan {self.entries} souborů za {self.scan_seconds:.2f} s, "
+                f"beze změny {self.unchanged}, čeká {self.pending}, "
+                f"zpracováno {self.processed} (přeskočeno {self.skipped}, neplatné {self.invalid}, chyby {self.failed}), "
+                f"{self.bytes / 1e6:.2f} MB a {self.rows} řádků za {self.process_seconds:.2f} s "
+                f"= {self.bytes / 1e6 / seconds:.2f} MB/s, {self.rows / seconds:.0f} řádků/s")
+
+
+class FolderWatcher:
+    """Incremental processing of a hot folder backed by a JSON manifest"""
+
+    def __init__(self, folder, export_dir=None, manifest_path=None, pattern='*',
+                 settle_seconds=5.0, use_cache=True, history=None, archive=None):
+        self.folder = folder
+        self.export_dir = export_dir
+        self.manifest_path = manifest_path or os.path.join(export_dir or folder, MANIFEST_NAME)
+        self.pattern = pattern
+        self.settle_seconds = settle_seconds
+        self.use_cache = use_cache
+        # Volitelná historie releasů (edi_history.HistoryStore)
+        self.history = history
+        # Volitelný index archivu (edi_archive.ArchiveIndex)
+        self.archive = archive
+        # name -> {'inode', 'size', 'mtime_ns', 'hash', 'status', 'file_type', 'rows'}
+        self.manifest = self._load_manifest()
+        # name -> (size, mtime_ns) seen on the previous scan, for files still being written
+        self.pending = {}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _identity(st):
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _is_unchanged(self, name, st):
+        record = self.manifest.get(name)
+        return (record is not None
+                and (record['inode'], record['size'], record['mtime_ns']) == self._identity(st))
+
+    def _is_settled(self, name, st, now):
+        """True once a file has kept its size and mtime for settle_seconds"""
+        current = (st.st_size, st.st_mtime_ns)
+        previous = self.pending.get(name)
+        self.pending[name] = current
+        if now - st.st_mtime_ns / 1e9 < self.settle_seconds:
+            return False
+        # A file seen for the first time with an old mtime is ready as well
+        # (copies with preserved timestamps get them once the data is written);
+        # scan() stats it once more right before reading it.
+        return previous is None or previous == current
+
+    def scan(self):
+        """Process all new or changed files once; returns ScanStats"""
+        stats = ScanStats()
+        start = time.perf_counter()
+        now = time.time()
+        ready = []
+        seen = set()
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith('.') or not fnmatch.fnmatch(name, self.pattern):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                stats.entries += 1
+                seen.add(name)
+                if self._is_unchanged(name, st):
+                    stats.unchanged += 1
+                    continue
+                if not self._is_settled(name, st, now):
+                    stats.pending += 1
+                    continue
+                ready.append((name, entry.path, st))
+        # Forget pending state of files that disappeared before settling
+        for name in list(self.pending):
+            if name not in seen:
+                del self.pending[name]
+        stats.scan_seconds = time.perf_counter() - start
+
+        process_start = time.perf_counter()
+        unsaved = 0
+        saved_at = process_start
+        try:
+            for name, path, st in sorted(ready, key=lambda item: item[2].st_mtime_ns):
+                try:
+                    current = os.stat(path)
+                except OSError:
+                    continue
+                if self._identity(current) != self._identity(st):
+                    # Změnil se od výpisu složky; počká na další sken
+                    self.pending[name] = (current.st_size, current.st_mtime_ns)
+                    stats.pending += 1
+                    continue
+                self.process_file(name, path, st, stats)
+                unsaved += 1
+                # Celý manifest se přepisuje, proto jen po dávkách, ne po každém souboru
+                if unsaved >= MANIFEST_SAVE_FILES or time.perf_counter() - saved_at >= MANIFEST_SAVE_SECONDS:
+                    self.save_manifest()
+                    unsaved = 0
+                    saved_at = time.perf_counter()
+        finally:
+            if unsaved:
+                self.save_manifest()
+        stats.process_seconds = time.perf_counter() - process_start
+        return stats
+
+    def process_file(self, name, path, st, stats):
+        """Detect, parse and export one file and record it in the manifest"""
+        self.pending.pop(name, None)
+        record = {
+            'inode': st.st_ino,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'hash': None,
+            'status': 'error',
+            'file_type': None,
+            'rows': 0,
+        }
+        file_start = time.perf_counter()
+        try:
+            # Jedno otevření souboru pro hash, kontrolu, parsování i index archivu
+            with open_input(path) as source:
+                record['hash'] = source.content_hash()
+                previous = self.manifest.get(name)
+                if previous and previous.get('hash') == record['hash'] and previous.get('status') == 'ok':
+                    # Touched or moved without a content change; nothing to re-export
+                    record.update(status='ok', file_type=previous.get('file_type'),
+                                  rows=previous.get('rows', 0))
+                    stats.skipped += 1
+                    return
+                parser = edi_api.parse_file(path, use_cache=self.use_cache, source=source)
+                if self.archive is not None:
+                    self.archive.index_file(path, source)
+            output = edi_api.export_file(parser, self.export_dir) if self.export_dir else None
+            if self.history is not None:
+                self.history.record(parser, record['hash'])
+            record.update(status='ok', file_type=parser.file_type,
+                          rows=len(parser.delivery_schedules))
+            stats.processed += 1
+            stats.bytes += st.st_size
+            stats.rows += record['rows']
+            log.info("%s: %s, %d řádků, %.1f ms%s", name, parser.file_type, record['rows'],
+                     (time.perf_counter() - file_start) * 1000, f" -> {output}" if output else "")
+        except EDIValidationError as e:
+            # Broken envelope: not parsed; retried only after the file changes
+            record['status'] = 'invalid'
+            stats.invalid += 1
+            log.warning("%s: neplatná struktura: %s", name, e)
+        except Exception as e:
+            # Failed files stay in the manifest so they are retried only after a change
+            stats.failed += 1
+            log.error("%s: chyba zpracování: %s", name, e)
+        finally:
+            self.manifest[name] = record
+
+    def run(self, interval=30.0, once=False):
+        """Scan repeatedly until interrupted"""
+        while True:
+            stats = self.scan()
+            if stats.processed or stats.failed or stats.invalid or stats.pending or once:
+                log.info(stats.summary())
+            if once and not stats.pending:
+                return stats
+            time.sleep(interval if not stats.pending else min(interval, self.settle_seconds))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Sledování složky s EDI soubory")
+    arg_parser.add_argument('folder', nargs='?', default=DEFAULT_ARCHIVE_DIR, help="sledovaná složka")
+    arg_parser.add_argument('--export', metavar='DIR', help="adresář pro export do Excelu")
+    arg_parser.add_argument('--manifest', help="cesta k manifestu zpracovaných souborů")
+    arg_parser.add_argument('--pattern', default='*', help="maska souborů (např. *.edi)")
+    arg_parser.add_argument('--interval', type=float, default=30.0, help="interval skenování v sekundách")
+    arg_parser.add_argument('--settle', type=float, default=5.0,
+                            help="jak dlouho se soubor nesmí měnit, než se zpracuje (s)")
+    arg_parser.add_argument('--once', action='store_true', help="zpracovat složku jednou a skončit")
+    arg_parser.add_argument('--log', help="soubor pro log propustnosti")
+    arg_parser.add_argument('--no-cache', action='store_true', help="nepoužívat cache výsledků")
+    arg_parser.add_argument('--history', nargs='?', const='', metavar='DB',
+                            help="ukládat dodávky do SQLite historie (bez cesty výchozí umístění)")
+    arg_parser.add_argument('--archive', nargs='?', const='', metavar='DB',
+                            help="indexovat položky, objednávky a partnery do indexu archivu "
+                                 "(bez cesty výchozí umístění)")
+    args = arg_parser.parse_args(argv)
+
+    handlers = [logging.StreamHandler()]
+    if args.log:
+        handlers.append(logging.FileHandler(args.log, encoding='utf-8'))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', handlers=handlers)
+
+    watcher = FolderWatcher(args.folder, export_dir=args.export, manifest_path=args.manifest,
+                            pattern=args.pattern, settle_seconds=args.settle,
+                            use_cache=not args.no_cache,
+                            history=edi_history.HistoryStore(args.history or None)
+                            if args.history is not None else None,
+                            archive=edi_archive.ArchiveIndex(args.archive or None)
+                            if args.archive is not None else None)
+    try:
+        watcher.run(args.interval, once=args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher.history is not None:
+            watcher.history.close()
+        if watcher.archive is not None:
+            watcher.archive.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
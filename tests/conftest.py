@@ -0,0 +1,27 @@
+"""Test setup and the interchange builders shared by the test modules"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Testy nesmí číst ani plnit uživatelskou cache výsledků
+os.environ['EDI_PARSER_CACHE'] = '0'
+
+import edi_api  # noqa: E402 (až po úpravě sys.path)
+
+
+def planned_interchange(sender, messages):
+    """Minebea/TRWKOB interchange text; messages are (part, [(quantity, SCC, YYYYMMDD)])"""
+    segments = ["UNA:+.? ", f"UNB+UNOC:3+{sender}:ZZ+SUP:ZZ+240115:1030+1"]
+    for number, (part, rows) in enumerate(messages, 1):
+        body = [f"BGM+241+M{number:03d}+9", "NAD+BY+BUY1::92++Buyer", f"LIN+1++{part}:IN", "PIA+1+XYZ:BP"]
+        for quantity, scc, day in rows:
+            body += [f"QTY+113:{quantity}:PCE", f"SCC+{scc}", f"DTM+63:{day}:102", f"DTM+64:{day}:102"]
+        segments += [f"UNH+{number}+DELFOR:D:97A:UN"] + body + [f"UNT+{len(body) + 2}+{number}"]
+    segments.append(f"UNZ+{len(messages)}+1")
+    return "'".join(segments) + "'"
+
+
+def parse(file_type, text):
+    parser = edi_api.PARSER_CORES[file_type]()
+    parser.parse_bytes(text.encode('utf-8'))
+    return parser
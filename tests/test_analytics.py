@@ -0,0 +1,16 @@
+"""The demand cube keys rows by their own part and ignores dates outside the calendar"""
+from edi_analytics import DemandSeries
+from conftest import parse, planned_interchange
+
+
+def test_cube_parts_and_outlier_dates():
+    parser = parse('minebea', planned_interchange('MINEBEA', [
+        ('AAA', [(10, 1, '20240115'), (20, 4, '20240122')]),
+        ('BBB', [(30, 1, '20240117'), (40, 4, '99991231')]),
+    ]))
+    series = DemandSeries([parser])
+    assert series.parts == ['AAA', 'BBB']
+    assert series.outside_rows == 1
+    assert series.cube.shape[2] == 2
+    assert series.waterfall('AAA').tolist() == [[10.0, 20.0]]
+    assert series.waterfall('BBB').tolist() == [[30.0, 0.0]]
@@ -0,0 +1,36 @@
+"""The parse cache index forgets files that were deleted or changed"""
+import edi_api
+import edi_cache
+from edi_cache import ParseCache
+from conftest import planned_interchange
+
+
+def test_index_drops_deleted_and_changed_files(tmp_path):
+    kept, changed, deleted = (tmp_path / name for name in ('kept.edi', 'changed.edi', 'deleted.edi'))
+    for path in (kept, changed, deleted):
+        path.write_text("UNB+UNOC:3'", encoding='utf-8')
+    cache = ParseCache(str(tmp_path / 'cache'))
+    for path in (kept, changed, deleted):
+        cache.record_hash(str(path), 'hash-' + path.name)
+    changed.write_text("UNB+UNOC:3+CHANGED'", encoding='utf-8')
+    deleted.unlink()
+
+    reloaded = ParseCache(str(tmp_path / 'cache'))
+    assert reloaded.known_hash(str(kept)) == 'hash-kept.edi'
+    assert list(reloaded._load_index()) == [str(kept)]
+
+
+def test_cached_result_is_not_validated_again(tmp_path, monkeypatch):
+    monkeypatch.setenv('EDI_PARSER_CACHE', '1')
+    monkeypatch.setenv('EDI_PARSER_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(edi_cache, '_default_cache', None)
+    path = tmp_path / 'delfor.edi'
+    path.write_text(planned_interchange('MINEBEA', [('AAA', [(10, 1, '20240115')])]), encoding='utf-8')
+    checked = []
+    check_file = edi_api.check_file
+    monkeypatch.setattr(edi_api, 'check_file', lambda filepath: checked.append(filepath) or check_file(filepath))
+
+    first = edi_api.parse_file(str(path))
+    second = edi_api.parse_file(str(path))
+    assert checked == [str(path)]
+    assert second.delivery_schedules == first.delivery_schedules
@@ -0,0 +1,21 @@
+"""EDI date conversions shared by the parsers, exports and the archive index"""
+from datetime import date
+
+from edi_calendar import edi_date_ordinal, edi_date_text, edi_datetime_text, format_ordinal
+
+
+def test_edi_date_formats():
+    ordinal = date(2024, 1, 15).toordinal()
+    assert edi_date_ordinal('20240115') == ordinal
+    assert edi_date_ordinal('240115', '101') == ordinal
+    assert edi_date_ordinal('202401151030', '203') == ordinal
+    assert edi_date_ordinal('20240115103000', '203') == ordinal
+    for text, format_code in (('20241315', '102'), ('2024011', '102'), ('2024O115', '102'), ('20240115', '718')):
+        assert edi_date_ordinal(text, format_code) is None
+    assert edi_date_text('20240105') == format_ordinal(date(2024, 1, 5).toordinal()) == '05.01.2024'
+
+
+def test_unb_datetime():
+    assert edi_datetime_text('240115:0930') == '15.01.2024 09:30'
+    assert edi_datetime_text('240115:2460') is None
+    assert edi_datetime_text('240115') is None
@@ -0,0 +1,38 @@
+"""Cumulative figures are checked against a stated baseline, never against themselves"""
+from edi_cumulative import BASELINE, MISMATCH, RECONCILED, CumulativeReconciliation
+from conftest import parse
+
+
+def cummins_interchange(weeks):
+    """One Cummins line item; weeks are (delivery quantity, reported cumulative or None, YYYYMMDD)"""
+    body = ["BGM+241+REL001+5", "DTM+137:20240115:102", "LIN+1++5301234:IN", "RFF+RE:R100", "SCC+1"]
+    for quantity, cumulative, day in weeks:
+        body.append(f"QTY+1:{quantity}")
+        if cumulative is not None:
+            body.append(f"QTY+3:{cumulative}")
+        body.append(f"DTM+2:{day}:102")
+    segments = (["UNA:+.? ", "UNB+UNOC:3+CUMMINS:ZZ+SUP:ZZ+240115:1030+1", "UNH+1+DELFOR:D:97A:UN"]
+                + body + [f"UNT+{len(body) + 2}+1", "UNZ+1+1"])
+    return "'".join(segments) + "'"
+
+
+def reconcile(weeks):
+    return CumulativeReconciliation(parse('cummins', cummins_interchange(weeks)))
+
+
+def test_later_reports_are_checked_against_the_baseline():
+    result = reconcile([(100, 1100, '20240122'), (120, None, '20240129'), (200, 1420, '20240205')])
+    assert [(check.expected, check.status) for check in result.checks()] == [
+        (1100, BASELINE), (1420, RECONCILED)]
+    assert (result.checked_count(), result.mismatch_count(), result.unverifiable_parts) == (1, 0, [])
+
+    result = reconcile([(100, 1100, '20240122'), (120, None, '20240129'), (200, 999999, '20240205')])
+    assert [check.status for check in result.checks()] == [BASELINE, MISMATCH]
+    assert result.checks(mismatches_only=True)[0].difference == 999999 - 1420
+
+
+def test_single_report_is_not_verifiable():
+    result = reconcile([(100, 999999, '20240122'), (120, None, '20240129')])
+    assert (result.checked_count(), result.mismatch_count()) == (0, 0)
+    assert result.unverifiable_parts == ['5301234']
+    assert "Neověřitelné položky" in result.summary_text()
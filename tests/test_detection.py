@@ -0,0 +1,18 @@
+"""In-memory payloads are detected from their raw bytes"""
+import edi_api
+import edi_async
+import edi_server
+from conftest import planned_interchange
+
+
+def test_payload_type_from_bytes():
+    data = planned_interchange('MINEBEA', [('AAA', [(10, 1, '20240115')])]).encode('utf-8')
+    assert edi_api.detect_bytes('upload.edi', data) == 'minebea'
+    file_type, _ = edi_async._parse_bytes_job(data, 'upload.edi', None, True)
+    assert file_type == 'minebea'
+
+
+def test_server_render_detects_the_payload():
+    data = planned_interchange('TRWKOB', [('AAA', [(10, 1, '20240115')])]).encode('utf-8')
+    content_type, body, timings = edi_server.render(data, 'upload.edi', None, 'csv')
+    assert body.decode('utf-8-sig').splitlines()[1].startswith('AAA;10;')
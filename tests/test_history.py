@@ -0,0 +1,23 @@
+"""History rows keep the part of their own LIN"""
+from edi_history import DATA_VERSION, HistoryStore
+from conftest import planned_interchange
+
+MESSAGES = [('AAA', [(10, 1, '20240115')]), ('BBB', [(30, 1, '20240115')])]
+
+
+def write_interchange(directory, name):
+    path = directory / name
+    path.write_text(planned_interchange('MINEBEA', MESSAGES), encoding='utf-8')
+    return str(path)
+
+
+def test_history_stores_part_of_each_message(tmp_path):
+    with HistoryStore(str(tmp_path / 'history.sqlite')) as store:
+        store.import_file(write_interchange(tmp_path, 'a.edi'))
+        assert store.parts('minebea') == ['AAA', 'BBB']
+        assert [row[3] for row in store.demand('minebea', 'AAA')] == [10.0]
+
+
+def test_new_store_is_stamped_with_the_data_version(tmp_path):
+    with HistoryStore(str(tmp_path / 'history.sqlite')) as store:
+        assert store.connection.execute('PRAGMA user_version').fetchone()[0] == DATA_VERSION
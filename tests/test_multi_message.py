@@ -0,0 +1,36 @@
+"""Records of multi-message interchanges carry the part of their own LIN"""
+import edi_api
+from conftest import parse, planned_interchange
+from edi_dialect import Selection
+from edi_diff import diff_results
+
+
+def test_planned_records_carry_their_part():
+    for file_type, sender in (('minebea', 'MINEBEA'), ('trwkob', 'TRWKOB')):
+        parser = parse(file_type, planned_interchange(sender, [
+            ('AAA', [(10, 1, '20240115'), (20, 4, '20240122')]),
+            ('BBB', [(30, 1, '20240115')]),
+        ]))
+        assert [(parser.part_number(d), d['Množství']) for d in parser.delivery_schedules] == [
+            ('AAA', '10'), ('AAA', '20'), ('BBB', '30')]
+
+
+def test_diff_reports_demand_moving_between_parts():
+    old = parse('minebea', planned_interchange('MINEBEA', [
+        ('AAA', [(10, 1, '20240115')]), ('BBB', [(0, 1, '20240115')])]))
+    new = parse('minebea', planned_interchange('MINEBEA', [
+        ('AAA', [(0, 1, '20240115')]), ('BBB', [(10, 1, '20240115')])]))
+    changes = {(row.part, row.old_qty, row.new_qty) for row in diff_results(old, new).rows}
+    assert changes == {('AAA', 10, 0), ('BBB', 0, 10)}
+
+
+def test_columns_take_the_part_of_each_record():
+    text = planned_interchange('MINEBEA', [('AAA', [(10, 1, '20240115')]), ('BBB', [(30, 4, '20240115')])])
+    columns = parse('minebea', text).columns()
+    assert [columns.parts[code] for code in columns.part_codes] == ['AAA', 'BBB']
+
+    # Projekce bez položky nesmí doplnit položku z hlavičky poslední zprávy
+    parser = edi_api.PARSER_CORES['minebea']()
+    parser.selection = Selection(fields=['Množství'])
+    parser.parse_bytes(text.encode('utf-8'))
+    assert parser.columns().part_codes.tolist() == [-1, -1]
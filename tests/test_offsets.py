@@ -0,0 +1,30 @@
+"""Parsing a single part or message through the offset index matches a full parse"""
+import edi_offsets
+from conftest import parse
+
+
+def cummins_plan():
+    """Cummins named only in the first message; the order of AAA carries over to BBB"""
+    segments = ["UNA:+.? ", "UNB+UNOC:3+SENDER:ZZ+SUP:ZZ+240115:1030+1",
+                "UNH+1+DELFOR:D:97A:UN", "BGM+241+M001+9", "NAD+BY+CUMMINS::92++Cummins",
+                "LIN+1++AAA:IN", "RFF+ON:PO1", "SCC+10", "QTY+1:10", "DTM+2:20240115:102", "UNT+9+1",
+                "UNH+2+DELFOR:D:97A:UN", "BGM+241+M002+9", "NAD+ST+PLANT::92++Plant",
+                "LIN+1++BBB:IN", "SCC+10", "QTY+1:20", "DTM+2:20240122:102", "UNT+8+2",
+                "UNZ+2+1"]
+    return "'".join(segments) + "'"
+
+
+def rows(parser):
+    return [dict(row) for row in parser.delivery_schedules]
+
+
+def test_part_takes_file_type_and_carried_order_from_the_whole_file(tmp_path):
+    path = tmp_path / 'plan.edi'
+    path.write_text(cummins_plan(), encoding='utf-8')
+    full = parse('cummins', cummins_plan())
+    assert [row['Objednávka'] for row in rows(full)] == ['PO1', 'PO1']
+    part = edi_offsets.parse_part(str(path), 'BBB', use_cache=False)
+    assert part.file_type == 'cummins'
+    assert rows(part) == [row for row in rows(full) if row['Položka'] == 'BBB']
+    message = edi_offsets.parse_message(str(path), 2, use_cache=False)
+    assert rows(message) == rows(part)
@@ -0,0 +1,46 @@
+"""A memory profile traces only while its stages run and keeps the segments lazy"""
+import tracemalloc
+
+import edi_api
+from conftest import parse, planned_interchange
+from edi_input import EDIInput
+from edi_profile import MemoryProfile
+
+
+def test_memory_profile_stops_the_tracing_it_started():
+    assert not tracemalloc.is_tracing()
+    profile = MemoryProfile()
+    with profile.phase('parse'):
+        with profile.phase('tokenize'):
+            data = [bytes(1000) for _ in range(100)]
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    assert profile.stages['tokenize'].retained >= 100 * 1000
+    with profile.phase('export'):
+        pass
+    assert not tracemalloc.is_tracing()
+    del data
+
+
+def test_memory_profile_leaves_foreign_tracing_running():
+    tracemalloc.start()
+    try:
+        with MemoryProfile().phase('parse'):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_memory_profile_streams_segments():
+    text = planned_interchange('MINEBEA', [('AAA', [(10, 1, '20240115'), (20, 4, '20240122')])])
+    parser = edi_api.PARSER_CORES['minebea']()
+    parser.profile = MemoryProfile()
+    segments = parser.split_segments(EDIInput(buffer=text.encode('utf-8')))
+    assert not isinstance(segments, list)
+    assert len(list(segments)) == parser.profile.segment_total == text.count("'")
+    parser.profile = MemoryProfile()
+    parser.parse_bytes(EDIInput(buffer=text.encode('utf-8')))
+    assert parser.get_state() == parse('minebea', text).get_state()
+    assert 'tokenize' not in parser.profile.stages
+    assert parser.profile.to_dict()['tokenize_ms'] >= 0
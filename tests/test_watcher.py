@@ -0,0 +1,67 @@
+"""The watcher processes settled files on its first scan and reads each file once"""
+import json
+import os
+import time
+
+import pytest
+
+import edi_api
+import edi_core
+import edi_watcher
+from edi_watcher import FolderWatcher
+from conftest import planned_interchange
+
+
+def test_first_scan_processes_settled_files(tmp_path, monkeypatch):
+    path = tmp_path / 'delfor.edi'
+    path.write_text(planned_interchange('MINEBEA', [('AAA', [(10, 1, '20240115')])]), encoding='utf-8')
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+
+    def reopened(*args, **kwargs):
+        raise AssertionError("soubor se otevírá podruhé")
+
+    # Kontrola ani parsování nesmí soubor otevírat znovu
+    monkeypatch.setattr(edi_api, 'check_file', reopened)
+    monkeypatch.setattr(edi_core, 'open_input', reopened)
+    watcher = FolderWatcher(str(tmp_path), manifest_path=str(tmp_path / 'manifest.json'), use_cache=False)
+    stats = watcher.scan()
+    assert (stats.processed, stats.pending, stats.failed) == (1, 0, 0)
+    with open(tmp_path / 'manifest.json', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['delfor.edi']['status'] == 'ok'
+    assert manifest['delfor.edi']['rows'] == 1
+
+
+def test_recent_files_wait_for_settle(tmp_path):
+    (tmp_path / 'delfor.edi').write_text(planned_interchange('MINEBEA', [('AAA', [])]), encoding='utf-8')
+    watcher = FolderWatcher(str(tmp_path), manifest_path=str(tmp_path / 'manifest.json'), use_cache=False)
+    stats = watcher.scan()
+    assert (stats.processed, stats.pending) == (0, 1)
+
+
+def test_manifest_is_saved_in_batches_and_on_interrupt(tmp_path, monkeypatch):
+    old = time.time() - 3600
+    for number in range(5):
+        path = tmp_path / f'delfor{number}.edi'
+        path.write_text(planned_interchange('MINEBEA', [(f'P{number}', [(10, 1, '20240115')])]), encoding='utf-8')
+        os.utime(path, (old + number, old + number))
+    monkeypatch.setattr(edi_watcher, 'MANIFEST_SAVE_FILES', 2)
+    watcher = FolderWatcher(str(tmp_path), manifest_path=str(tmp_path / 'manifest.json'), use_cache=False)
+    saves = []
+    save_manifest = watcher.save_manifest
+    monkeypatch.setattr(watcher, 'save_manifest', lambda: saves.append(len(watcher.manifest)) or save_manifest())
+    process_file = watcher.process_file
+
+    def interrupted(name, *args):
+        if name == 'delfor3.edi':
+            raise KeyboardInterrupt
+        process_file(name, *args)
+
+    monkeypatch.setattr(watcher, 'process_file', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        watcher.scan()
+    # Dávka po dvou souborech a zbytek při přerušení
+    assert saves == [2, 3]
+    with open(tmp_path / 'manifest.json', encoding='utf-8') as f:
+        assert sorted(json.load(f)) == ['delfor0.edi', 'delfor1.edi', 'delfor2.edi']